@@ -0,0 +1,184 @@
+from database import db
+from models import User, Enrollment, AttendanceRecord
+from sqlalchemy import select, case, type_coerce
+import numpy as np
+
+# ==========================================
+# PER-STUDENT ATTENDANCE ANALYTICS
+# ==========================================
+# A course's attendance as a students x dates matrix of int8 status codes,
+# built from one query over the records, and every per-student figure computed from it in
+# whole-array operations (no per-row Python):
+#   rate              (present + late) / (present + late + absent); excused is left out
+#   absence streaks   longest and current run of consecutive absences
+#   late streaks      longest and current run of consecutive lates
+#   score             recency-weighted: present 1, late 0.5, absent 0, recent sessions count more
+# A session with no record for a student (e.g. not yet enrolled) breaks streaks
+# and counts towards nothing.
+
+NOT_RECORDED = 0
+STATUS_CODES = {'present': 1, 'late': 2, 'excused': 3, 'absent': 4}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+# Score value of each status code (index = code); excused is not counted
+SCORE_VALUES = np.array([0.0, 1.0, 0.5, 0.0, 0.0])
+SCORE_HALF_LIFE = 10  # sessions; a session this many back counts half as much as the latest
+
+# At-risk thresholds
+AT_RISK_RATE = 0.80
+AT_RISK_SCORE = 0.75
+AT_RISK_ABSENCE_STREAK = 3
+AT_RISK_LATE_STREAK = 3
+
+
+class AttendanceMatrix:
+    """codes[i, j] is the status code of students[i] on dates[j]"""
+
+    def __init__(self, students, dates, codes):
+        self.students = students  # [(id, first_name, last_name, email)]
+        self.dates = dates
+        self.codes = codes
+
+    def __repr__(self):
+        return f'<AttendanceMatrix {len(self.students)}x{len(self.dates)}>'
+
+
+def attendance_matrix(course_id, start_date=None, end_date=None):
+    """Enrolled students x recorded dates of a course, as an int8 matrix"""
+    students = db.session.execute(
+        select(User.id, User.first_name, User.last_name, User.email)
+        .join(Enrollment, Enrollment.student_id == User.id)
+        .where(Enrollment.course_id == course_id)
+        .order_by(User.last_name, User.first_name, User.id)
+    ).all()
+
+    in_range = [AttendanceRecord.course_id == course_id]
+    if start_date:
+        in_range.append(AttendanceRecord.date >= start_date)
+    if end_date:
+        in_range.append(AttendanceRecord.date <= end_date)
+
+    # Dates as the driver returns them (text on SQLite), only used as lookup keys,
+    # so no date is parsed per record
+    raw_date = type_coerce(AttendanceRecord.date, db.String).label('raw_date')
+
+    # Columns: every date with a record
+    date_rows = db.session.execute(
+        select(AttendanceRecord.date, raw_date).where(*in_range).distinct().order_by(AttendanceRecord.date)
+    ).all()
+    dates = [day for day, _ in date_rows]
+    column_of = {raw: column for column, (_, raw) in enumerate(date_rows)}
+
+    # One query over the records; status codes are mapped by the database and
+    # a Core connection skips the ORM loader
+    rows = db.session.connection().execute(select(
+        AttendanceRecord.student_id,
+        raw_date,
+        case(STATUS_CODES, value=AttendanceRecord.status, else_=NOT_RECORDED)
+    ).where(*in_range)).all()
+
+    count = len(rows)
+    student_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    columns = np.fromiter((column_of[row[1]] for row in rows), dtype=np.int64, count=count)
+    codes = np.fromiter((row[2] for row in rows), dtype=np.int8, count=count)
+
+    # Rows: the roster (records of students no longer enrolled are dropped)
+    roster = np.array([student.id for student in students], dtype=np.int64)
+    order = np.argsort(roster)
+    positions = np.searchsorted(roster[order], student_ids).clip(max=max(len(roster) - 1, 0))
+    enrolled = roster[order][positions] == student_ids if len(roster) else np.zeros(count, dtype=bool)
+
+    matrix = np.zeros((len(roster), len(dates)), dtype=np.int8)
+    matrix[order[positions[enrolled]], columns[enrolled]] = codes[enrolled]
+
+    return AttendanceMatrix(students, dates, matrix)
+
+
+def _runs(mask):
+    """Length of the run of True ending at each column, per row"""
+    positions = np.arange(1, mask.shape[1] + 1)
+    last_break = np.maximum.accumulate(np.where(mask, 0, positions), axis=1)
+    return positions - last_break
+
+
+def attendance_metrics(codes):
+    """{metric: array over students} for an int8 status matrix"""
+    students, sessions = codes.shape
+    counts = {status: (codes == code).sum(axis=1) for status, code in STATUS_CODES.items()}
+
+    attended = counts['present'] + counts['late']
+    counted = attended + counts['absent']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = np.where(counted > 0, attended / counted, np.nan)
+
+    if sessions:
+        absence_runs = _runs(codes == STATUS_CODES['absent'])
+        late_runs = _runs(codes == STATUS_CODES['late'])
+        longest_absences = absence_runs.max(axis=1)
+        current_absences = absence_runs[:, -1]
+        longest_lates = late_runs.max(axis=1)
+        current_lates = late_runs[:, -1]
+    else:
+        longest_absences = current_absences = longest_lates = current_lates = np.zeros(students, dtype=np.int64)
+
+    # Newest session weighs 1, halving every SCORE_HALF_LIFE sessions back
+    weights = 0.5 ** (np.arange(sessions)[::-1] / SCORE_HALF_LIFE)
+    scored = (codes != NOT_RECORDED) & (codes != STATUS_CODES['excused'])
+    weighted_total = scored @ weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.where(weighted_total > 0, (SCORE_VALUES[codes] * scored) @ weights / weighted_total, np.nan)
+
+    return {
+        'sessions': (codes != NOT_RECORDED).sum(axis=1),
+        **counts,
+        'rate': rate,
+        'longest_absence_streak': longest_absences,
+        'current_absence_streak': current_absences,
+        'longest_late_streak': longest_lates,
+        'current_late_streak': current_lates,
+        'score': score,
+    }
+
+
+def at_risk_flags(metrics):
+    """{reason: boolean array over students}"""
+    with np.errstate(invalid='ignore'):
+        return {
+            f"Attendance below {AT_RISK_RATE:.0%}": metrics['rate'] < AT_RISK_RATE,
+            f"Score below {AT_RISK_SCORE:.2f}": metrics['score'] < AT_RISK_SCORE,
+            f"Absent {AT_RISK_ABSENCE_STREAK}+ sessions in a row": metrics['current_absence_streak'] >= AT_RISK_ABSENCE_STREAK,
+            f"Late {AT_RISK_LATE_STREAK}+ sessions in a row": metrics['current_late_streak'] >= AT_RISK_LATE_STREAK,
+        }
+
+
+def student_attendance_report(course_id, start_date=None, end_date=None):
+    """(rows, dates) for the at-risk report: one dict per student, at-risk first, lowest score first"""
+    matrix = attendance_matrix(course_id, start_date, end_date)
+    metrics = attendance_metrics(matrix.codes)
+    flags = at_risk_flags(metrics)
+
+    # Sort in NumPy too: at-risk first, then by score (students with no score last)
+    at_risk = np.logical_or.reduce(list(flags.values()))
+    order = np.lexsort((np.nan_to_num(metrics['score'], nan=2.0), ~at_risk))
+
+    rows = []
+    for i in order.tolist():
+        student_id, first_name, last_name, email = matrix.students[i]
+        rate, score = metrics['rate'][i], metrics['score'][i]
+        rows.append({
+            'student_id': student_id,
+            'name': f"{first_name} {last_name}",
+            'email': email,
+            'sessions': int(metrics['sessions'][i]),
+            **{status: int(metrics[status][i]) for status in STATUS_CODES},
+            'rate': None if np.isnan(rate) else float(rate),
+            'score': None if np.isnan(score) else float(score),
+            'longest_absence_streak': int(metrics['longest_absence_streak'][i]),
+            'current_absence_streak': int(metrics['current_absence_streak'][i]),
+            'longest_late_streak': int(metrics['longest_late_streak'][i]),
+            'current_late_streak': int(metrics['current_late_streak'][i]),
+            'reasons': [reason for reason, flagged in flags.items() if flagged[i]],
+            # Latest sessions, oldest first, for the inline strip
+            'recent': [STATUS_NAMES.get(int(code), 'not-recorded') for code in matrix.codes[i, -10:]],
+        })
+    return rows, matrix.dates
@@ -1,8 +1,7 @@
 from flask import Flask
-from database import db
+from database import db, configure_database, init_sqlite_pragmas
 import os
 from flask_login import LoginManager
-from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta, date
 import random
 
@@ -11,14 +10,19 @@ app = Flask(__name__)
 # APP CONFIGURATION
 app.config['SECRET_KEY'] = 'planify_secret_key'
 
+# MATERIAL DOWNLOADS: x-sendfile / x-accel hand files to the proxy (see materials.py)
+app.config['MATERIAL_SENDFILE'] = os.environ.get('MATERIAL_SENDFILE', '')
+app.config['MATERIAL_ACCEL_PREFIX'] = os.environ.get('MATERIAL_ACCEL_PREFIX', '/protected-uploads/')
+
 # -- ENSURE INSTANCE FOLDER EXISTS --
 os.makedirs(app.instance_path, exist_ok=True)
 
-# DATABASE CONNECTION
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(app.instance_path, 'planify.db')}"
+# DATABASE CONNECTION (see database.py for DATABASE_URL / PLANIFY_DB_PROFILE)
+configure_database(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+init_sqlite_pragmas(app)
 
 # FLASK-LOGIN SETUP
 login_manager = LoginManager()
@@ -27,15 +31,47 @@ login_manager.init_app(app)
 
 from models import User, Course, LessonPlan, LearningMaterial, Enrollment, AttendanceRecord, ContactMessage
 
+# REQUEST METRICS + QUERY BUDGET (DEBUG MODE ONLY)
+# (/metrics is for admins, or scrapers sending "Authorization: Bearer $METRICS_TOKEN")
+from metrics import init_metrics
+from queries import init_query_budget
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+init_metrics(app)
+init_query_budget(app)
+
+# FULL-TEXT SEARCH INDEX (see search.py; rebuild with: flask search-index)
+from search import init_search
+init_search(app)
+
+# DASHBOARD FRAGMENT CACHE (FRAGMENT_CACHE_URL=redis://... shares it between workers)
+from fragments import init_fragment_cache
+app.config['FRAGMENT_CACHE_URL'] = os.environ.get('FRAGMENT_CACHE_URL', '')
+init_fragment_cache(app)
+
+# PASSWORD HASHING POLICY (PASSWORD_HASH_METHOD=scrypt:16384:8:1; pick one with benchmarks/password_hash_bench.py)
+from passwords import init_password_policy
+init_password_policy(app)
 
+# PRINCIPAL CACHE (PRINCIPAL_IN_SESSION=1 also embeds it in the signed session)
+from principal import load_principal
+app.config['PRINCIPAL_IN_SESSION'] = os.environ.get('PRINCIPAL_IN_SESSION') == '1'
+
+
+# Cached principal snapshot instead of a User row per request (see principal.py)
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_principal(int(user_id))
 
 
 # IMPORT ROUTES
 from routes import *
 
+# IMPORT CLI COMMANDS
+import commands
+
+# BULK LOADING HELPERS (shared with 'flask seed')
+from seed import hash_passwords, insert_rows, attendance_rows
+
 
 def initialize_database():
     """Initialize database with dummy data"""
@@ -63,7 +99,7 @@ def initialize_database():
                 email="admin@example.com",
                 contact_number="09123456789",
                 role="admin",
-                password=generate_password_hash("Admin123")
+                password="Admin123"
             ),
             # EDUCATORS (4 educators)
             User(
@@ -73,7 +109,7 @@ def initialize_database():
                 email="educator1@example.com",
                 contact_number="09222222222",
                 role="educator",
-                password=generate_password_hash("Educator123")
+                password="Educator123"
             ),
             User(
                 first_name="Elaine",
@@ -82,7 +118,7 @@ def initialize_database():
                 email="evillanueva@example.com",
                 contact_number="09333333333",
                 role="educator",
-                password=generate_password_hash("villanueva123")
+                password="villanueva123"
             ),
             User(
                 first_name="Roland",
@@ -91,7 +127,7 @@ def initialize_database():
                 email="rsantos@example.com",
                 contact_number="09444444444",
                 role="educator",
-                password=generate_password_hash("rsantos123")
+                password="rsantos123"
             ),
             User(
                 first_name="Patricia",
@@ -100,7 +136,7 @@ def initialize_database():
                 email="pcruz@example.com",
                 contact_number="09555555555",
                 role="educator",
-                password=generate_password_hash("pcruz123")
+                password="pcruz123"
             ),
             # STUDENTS (20 students)
             User(
@@ -110,7 +146,7 @@ def initialize_database():
                 email="student1@example.com",
                 contact_number="09111111111",
                 role="student",
-                password=generate_password_hash("Student123")
+                password="Student123"
             ),
             User(
                 first_name="Alfred",
@@ -119,7 +155,7 @@ def initialize_database():
                 email="atorres@example.com",
                 contact_number="09666666666",
                 role="student",
-                password=generate_password_hash("atorres123")
+                password="atorres123"
             ),
             User(
                 first_name="Bianca",
@@ -128,7 +164,7 @@ def initialize_database():
                 email="bmendoza@example.com",
                 contact_number="09777777777",
                 role="student",
-                password=generate_password_hash("bmendoza123")
+                password="bmendoza123"
             ),
             User(
                 first_name="Cedric",
@@ -137,7 +173,7 @@ def initialize_database():
                 email="cgonzales@example.com",
                 contact_number="09888888888",
                 role="student",
-                password=generate_password_hash("cgonzales123")
+                password="cgonzales123"
             ),
             User(
                 first_name="Danica",
@@ -146,7 +182,7 @@ def initialize_database():
                 email="dflores@example.com",
                 contact_number="09999999999",
                 role="student",
-                password=generate_password_hash("dflores123")
+                password="dflores123"
             ),
             User(
                 first_name="Ethan",
@@ -155,7 +191,7 @@ def initialize_database():
                 email="enavarro@example.com",
                 contact_number="09122222222",
                 role="student",
-                password=generate_password_hash("enavarro123")
+                password="enavarro123"
             ),
             User(
                 first_name="Fiona",
@@ -164,7 +200,7 @@ def initialize_database():
                 email="fsalazar@example.com",
                 contact_number="09133333333",
                 role="student",
-                password=generate_password_hash("fsalazar123")
+                password="fsalazar123"
             ),
             User(
                 first_name="Gabriel",
@@ -173,7 +209,7 @@ def initialize_database():
                 email="gdavid@example.com",
                 contact_number="09144444444",
                 role="student",
-                password=generate_password_hash("gdavid123")
+                password="gdavid123"
             ),
             User(
                 first_name="Hannah",
@@ -182,7 +218,7 @@ def initialize_database():
                 email="hocampo@example.com",
                 contact_number="09155555555",
                 role="student",
-                password=generate_password_hash("hocampo123")
+                password="hocampo123"
             ),
             User(
                 first_name="Ian",
@@ -191,7 +227,7 @@ def initialize_database():
                 email="iperez@example.com",
                 contact_number="09166666666",
                 role="student",
-                password=generate_password_hash("iperez123")
+                password="iperez123"
             ),
             User(
                 first_name="Jasmine",
@@ -200,7 +236,7 @@ def initialize_database():
                 email="jramos@example.com",
                 contact_number="09177777777",
                 role="student",
-                password=generate_password_hash("jramos123")
+                password="jramos123"
             ),
             User(
                 first_name="Kyle",
@@ -209,7 +245,7 @@ def initialize_database():
                 email="kbautista@example.com",
                 contact_number="09188888888",
                 role="student",
-                password=generate_password_hash("kbautista123")
+                password="kbautista123"
             ),
             User(
                 first_name="Lara",
@@ -218,7 +254,7 @@ def initialize_database():
                 email="ldomingo@example.com",
                 contact_number="09199999999",
                 role="student",
-                password=generate_password_hash("ldomingo123")
+                password="ldomingo123"
             ),
             User(
                 first_name="Marcus",
@@ -227,7 +263,7 @@ def initialize_database():
                 email="mjimenez@example.com",
                 contact_number="09112222222",
                 role="student",
-                password=generate_password_hash("mjimenez123")
+                password="mjimenez123"
             ),
             User(
                 first_name="Nicole",
@@ -236,7 +272,7 @@ def initialize_database():
                 email="npadilla@example.com",
                 contact_number="09113333333",
                 role="student",
-                password=generate_password_hash("npadilla123")
+                password="npadilla123"
             ),
             User(
                 first_name="Oscar",
@@ -245,7 +281,7 @@ def initialize_database():
                 email="ovaldez@example.com",
                 contact_number="09114444444",
                 role="student",
-                password=generate_password_hash("ovaldez123")
+                password="ovaldez123"
             ),
             User(
                 first_name="Paula",
@@ -254,7 +290,7 @@ def initialize_database():
                 email="pmarasigan@example.com",
                 contact_number="09115555555",
                 role="student",
-                password=generate_password_hash("pmarasigan123")
+                password="pmarasigan123"
             ),
             User(
                 first_name="Quentin",
@@ -263,7 +299,7 @@ def initialize_database():
                 email="qabadilla@example.com",
                 contact_number="09116666666",
                 role="student",
-                password=generate_password_hash("qabadilla123")
+                password="qabadilla123"
             ),
             User(
                 first_name="Rhea",
@@ -272,7 +308,7 @@ def initialize_database():
                 email="rlagman@example.com",
                 contact_number="09117777777",
                 role="student",
-                password=generate_password_hash("rlagman123")
+                password="rlagman123"
             ),
             User(
                 first_name="Samuel",
@@ -281,7 +317,7 @@ def initialize_database():
                 email="sfernandez@example.com",
                 contact_number="09118888888",
                 role="student",
-                password=generate_password_hash("sfernandez123")
+                password="sfernandez123"
             ),
             User(
                 first_name="Trixie",
@@ -290,11 +326,13 @@ def initialize_database():
                 email="tgutierrez@example.com",
                 contact_number="09119999999",
                 role="student",
-                password=generate_password_hash("tgutierrez123")
+                password="tgutierrez123"
             )
         ]
 
-        for user in dummy_users:
+        # Plain passwords above, hashed together in a process pool
+        for user, password in zip(dummy_users, hash_passwords(user.password for user in dummy_users)):
+            user.password = password
             db.session.add(user)
         db.session.commit()
         print("✓ Users created!")
@@ -337,14 +375,15 @@ def initialize_database():
         ]
 
         courses = []
-        for course_data in courses_data:
+        enrollment_codes = Course.generate_enrollment_codes(len(courses_data))
+        for course_data, enrollment_code in zip(courses_data, enrollment_codes):
             course = Course(
                 course_name=course_data["name"],
                 course_code=course_data["code"],
                 block_section=course_data["block"],
                 description=course_data["desc"],
                 educator_id=course_data["educator_id"],
-                enrollment_code=Course.generate_enrollment_code(),
+                enrollment_code=enrollment_code,
                 created_at=datetime.utcnow() - timedelta(days=random.randint(30, 90))
             )
             courses.append(course)
@@ -448,39 +487,13 @@ def initialize_database():
         print("Creating attendance records for past 20 days...")
         print("  (This may take a moment...)")
 
-        statuses = ['present', 'absent', 'late', 'excused']
-        attendance_count = 0
-
-        for days_ago in range(20, 0, -1):
-            attendance_date = date.today() - timedelta(days=days_ago)
-
-            for course in all_courses:
-                course_enrollments = Enrollment.query.filter_by(course_id=course.id).all()
-
-                for enrollment in course_enrollments:
-                    status = random.choices(
-                        statuses,
-                        weights=[70, 10, 15, 5],
-                        k=1
-                    )[0]
-
-                    attendance = AttendanceRecord(
-                        course_id=course.id,
-                        student_id=enrollment.student_id,
-                        date=attendance_date,
-                        status=status,
-                        recorded_by=course.educator_id,
-                        recorded_at=datetime.combine(attendance_date, datetime.min.time()) +
-                                   timedelta(hours=9, minutes=random.randint(0, 30))
-                    )
-                    db.session.add(attendance)
-                    attendance_count += 1
-
-            # Commit every day (every 200 records) to avoid memory issues
-            if days_ago % 5 == 0:
-                db.session.commit()
-                print(f"  Progress: {21 - days_ago}/20 days completed...")
-
+        # One roster query per course, then Core executemany batches (see seed.py)
+        rosters = {course.id: [student_id for student_id, in db.session.query(Enrollment.student_id)
+                               .filter_by(course_id=course.id)]
+                   for course in all_courses}
+        enrollments = [(course.id, student_id, course.educator_id)
+                       for course in all_courses for student_id in rosters[course.id]]
+        attendance_count = insert_rows(AttendanceRecord, attendance_rows(enrollments, 20, random))
         db.session.commit()
         print(f"✓ Attendance records created! (Total: {attendance_count})")
 
@@ -545,6 +558,16 @@ def initialize_database():
         db.session.commit()
         print(f"✓ Contact messages created! (Total: {len(contact_messages_data)})")
 
+        # Daily summary for the admin dashboard (see stats.py)
+        from stats import rebuild_daily_summary
+        rebuild_daily_summary()
+        print("✓ Daily summary built!")
+
+        # Per-enrollment attendance totals for the student page (see attendance.py)
+        from attendance import rebuild_enrollment_attendance
+        rebuild_enrollment_attendance()
+        print("✓ Attendance totals built!")
+
         print("\n" + "=" * 60)
         print("✅ DATABASE INITIALIZATION COMPLETE!")
         print("=" * 60)
@@ -0,0 +1,420 @@
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord, EnrollmentAttendance
+from sqlalchemy import event, select, insert, delete, func, case, literal, tuple_, inspect, bindparam
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.dialects import sqlite, postgresql
+from stats import apply_summary_deltas
+from collections import Counter
+from datetime import datetime
+
+# ==========================================
+# ATTENDANCE AGGREGATION
+# ==========================================
+# Set-based helpers for the attendance history pages.
+# Counts are computed by the database (GROUP BY date, status)
+# so a page costs the same no matter how long the course history is.
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'excused', 'late')
+HISTORY_DATES_PER_PAGE = 10
+
+
+def paginate_attendance_dates(course_id, page=1, per_page=HISTORY_DATES_PER_PAGE, start_date=None, end_date=None):
+    """Return (dates, has_next) for one page of a course's attendance dates, newest first"""
+    query = db.session.query(AttendanceRecord.date).filter(AttendanceRecord.course_id == course_id)
+
+    if start_date:
+        query = query.filter(AttendanceRecord.date >= start_date)
+    if end_date:
+        query = query.filter(AttendanceRecord.date <= end_date)
+
+    # Fetch one extra date to know if there is a next page without a COUNT query
+    rows = query.distinct().order_by(
+        AttendanceRecord.date.desc()
+    ).offset((page - 1) * per_page).limit(per_page + 1).all()
+
+    dates = [date_obj for (date_obj,) in rows[:per_page]]
+    return dates, len(rows) > per_page
+
+
+def summarize_attendance_dates(course_id, dates):
+    """Return {date: {'recorded_time', 'stats'}} for the given dates using one grouped query"""
+    summaries = {}
+    for date_obj in dates:
+        stats = {'total': 0}
+        stats.update({status: 0 for status in ATTENDANCE_STATUSES})
+        summaries[date_obj] = {'records': None, 'recorded_time': None, 'stats': stats}
+
+    if not dates:
+        return summaries
+
+    rows = db.session.query(
+        AttendanceRecord.date,
+        AttendanceRecord.status,
+        func.count(AttendanceRecord.id),
+        func.max(AttendanceRecord.recorded_at)
+    ).filter(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.date.in_(dates)
+    ).group_by(
+        AttendanceRecord.date,
+        AttendanceRecord.status
+    ).all()
+
+    for date_obj, status, count, recorded_at in rows:
+        summary = summaries[date_obj]
+        summary['stats']['total'] += count
+        if status in summary['stats']:
+            summary['stats'][status] += count
+
+        # Latest recording time for this date (what the history card shows)
+        if recorded_at and (summary['recorded_time'] is None or recorded_at > summary['recorded_time']):
+            summary['recorded_time'] = recorded_at
+
+    return summaries
+
+
+def load_attendance_records(course_id, dates):
+    """Return {date: [records]} for only the given dates, newest recording first"""
+    records_by_date = {date_obj: [] for date_obj in dates}
+
+    if not dates:
+        return records_by_date
+
+    records = AttendanceRecord.query.options(
+        joinedload(AttendanceRecord.student)
+    ).filter(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.date.in_(dates)
+    ).order_by(
+        AttendanceRecord.date.desc(),
+        AttendanceRecord.recorded_at.desc()
+    ).all()
+
+    for record in records:
+        records_by_date[record.date].append(record)
+
+    return records_by_date
+
+
+# ==========================================
+# ATTENDANCE WRITES
+# ==========================================
+# Bulk upsert for one course and date.
+# Uses the unique_attendance constraint (student_id, course_id, date)
+# so the whole class is written in one statement. Changed rows get a new
+# recorded_at, which also invalidates cached reports for that day.
+
+UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+# Rows per INSERT statement (keeps bound parameters under SQLite's limit)
+UPSERT_BATCH_SIZE = 1000
+
+
+def record_attendance_bulk(course_id, attendance_date, statuses, recorded_by):
+    """Insert or update attendance for {student_id: status}, returns the number of rows written"""
+    statuses = {student_id: status for student_id, status in statuses.items()
+                if status in ATTENDANCE_STATUSES}
+
+    if not statuses:
+        return 0
+
+    # Existing records for this day in one query, so unchanged rows are skipped
+    existing = dict(db.session.query(
+        AttendanceRecord.student_id,
+        AttendanceRecord.status
+    ).filter(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.date == attendance_date
+    ).all())
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'course_id': course_id,
+            'student_id': student_id,
+            'date': attendance_date,
+            'status': status,
+            'recorded_by': recorded_by,
+            'recorded_at': now
+        }
+        for student_id, status in statuses.items()
+        if existing.get(student_id) != status
+    ]
+
+    if not rows:
+        return 0
+
+    # Core writes bypass the ORM hooks, so keep the daily summary in step here
+    deltas = Counter()
+    for row in rows:
+        if row['student_id'] in existing:
+            deltas[(attendance_date, f"attendance.{existing[row['student_id']]}")] -= 1
+        deltas[(attendance_date, f"attendance.{row['status']}")] += 1
+    apply_summary_deltas(db.session.connection(), deltas)
+
+    dialect = db.session.get_bind().dialect.name
+    make_insert = UPSERT_DIALECTS.get(dialect)
+
+    if make_insert:
+        # INSERT ... ON CONFLICT (student_id, course_id, date) DO UPDATE
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = make_insert(AttendanceRecord.__table__).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['student_id', 'course_id', 'date'],
+                set_={'status': stmt.excluded.status, 'recorded_at': stmt.excluded.recorded_at}
+            )
+            db.session.execute(stmt)
+    else:
+        # Other databases: one batched INSERT and one batched UPDATE
+        new_rows = [row for row in rows if row['student_id'] not in existing]
+        changed_rows = [row for row in rows if row['student_id'] in existing]
+
+        if new_rows:
+            db.session.execute(AttendanceRecord.__table__.insert(), new_rows)
+        if changed_rows:
+            table = AttendanceRecord.__table__
+            db.session.execute(
+                table.update().where(
+                    table.c.course_id == bindparam('b_course_id'),
+                    table.c.student_id == bindparam('b_student_id'),
+                    table.c.date == bindparam('b_date')
+                ).values(status=bindparam('b_status'), recorded_at=bindparam('b_recorded_at')),
+                [{'b_course_id': row['course_id'], 'b_student_id': row['student_id'],
+                  'b_date': row['date'], 'b_status': row['status'],
+                  'b_recorded_at': row['recorded_at']} for row in changed_rows]
+            )
+
+    # Per-enrollment totals last: un-attending a last-seen date re-reads the written records
+    apply_attendance_changes(db.session.connection(), [
+        (row['student_id'], course_id, attendance_date, existing.get(row['student_id']), row['status'])
+        for row in rows
+    ])
+
+    return len(rows)
+
+
+# ==========================================
+# PER-ENROLLMENT TOTALS
+# ==========================================
+# enrollment_attendance holds each student's status counts and last-seen
+# date per course. Every write is reduced to changes of
+#   (student_id, course_id, date, old_status, new_status)
+# (old None = inserted, new None = deleted): counts move by +1/-1 and
+# last_seen only moves forward, except when a change un-attends a date,
+# which re-reads those students' latest attended date.
+# ORM writes are collected by hooks like stats.py; Core writes
+# (record_attendance_bulk) pass their changes themselves.
+# A course or student deleted in the same flush takes its rows with it
+# (its records' changes are dropped rather than written as -1 rows).
+# 'flask attendance-totals --rebuild' recomputes the table in one pass.
+
+ATTENDED_STATUSES = ('present', 'late')
+
+
+def _later(current, new):
+    """SQL for the later of two nullable dates"""
+    return case(
+        (new.is_(None), current),
+        (current.is_(None), new),
+        (new > current, new),
+        else_=current
+    )
+
+
+def apply_attendance_changes(connection, changes):
+    """Fold [(student_id, course_id, date, old_status, new_status)] into enrollment_attendance"""
+    totals = {}
+    unattended = set()
+    for student_id, course_id, day, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        row = totals.setdefault((student_id, course_id), {
+            'student_id': student_id, 'course_id': course_id, 'last_seen': None,
+            **{status: 0 for status in ATTENDANCE_STATUSES}
+        })
+        if old_status in ATTENDANCE_STATUSES:
+            row[old_status] -= 1
+        if new_status in ATTENDANCE_STATUSES:
+            row[new_status] += 1
+        if new_status in ATTENDED_STATUSES and (row['last_seen'] is None or day > row['last_seen']):
+            row['last_seen'] = day
+        if old_status in ATTENDED_STATUSES and new_status not in ATTENDED_STATUSES:
+            unattended.add((student_id, course_id))
+
+    if not totals:
+        return
+
+    table = EnrollmentAttendance.__table__
+    rows = list(totals.values())
+    make_insert = UPSERT_DIALECTS.get(connection.dialect.name)
+
+    if make_insert:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = make_insert(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['student_id', 'course_id'],
+                set_={
+                    **{status: table.c[status] + stmt.excluded[status] for status in ATTENDANCE_STATUSES},
+                    'last_seen': _later(table.c.last_seen, stmt.excluded.last_seen),
+                }
+            )
+            connection.execute(stmt)
+    else:
+        for row in rows:
+            updated = connection.execute(
+                table.update()
+                .where(table.c.student_id == row['student_id'], table.c.course_id == row['course_id'])
+                .values(**{status: table.c[status] + row[status] for status in ATTENDANCE_STATUSES},
+                        last_seen=_later(table.c.last_seen, literal(row['last_seen'], db.Date)))
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert(), row)
+
+    if unattended:
+        latest = select(func.max(AttendanceRecord.date)).where(
+            AttendanceRecord.student_id == table.c.student_id,
+            AttendanceRecord.course_id == table.c.course_id,
+            AttendanceRecord.status.in_(ATTENDED_STATUSES)
+        ).scalar_subquery()
+        connection.execute(
+            table.update()
+            # student_id IN (...) lets SQLite seek the primary key; it scans for a row-value IN alone
+            .where(table.c.student_id.in_(sorted({student_id for student_id, _ in unattended})),
+                   tuple_(table.c.student_id, table.c.course_id).in_(sorted(unattended)))
+            .values(last_seen=latest)
+        )
+
+
+def _change(target, old_status, new_status, day):
+    session = inspect(target).session
+    changes = session.info.setdefault('attendance_changes', [])
+    changes.append((target.student_id, target.course_id, day, old_status, new_status))
+
+
+@event.listens_for(AttendanceRecord, 'after_insert')
+def _record_added(mapper, connection, target):
+    _change(target, None, target.status, target.date)
+
+
+@event.listens_for(AttendanceRecord, 'after_delete')
+def _record_deleted(mapper, connection, target):
+    _change(target, target.status, None, target.date)
+
+
+@event.listens_for(AttendanceRecord, 'after_update')
+def _record_changed(mapper, connection, target):
+    status_history = inspect(target).attrs.status.history
+    date_history = inspect(target).attrs.date.history
+    if status_history.added or date_history.added:
+        old_status = status_history.deleted[0] if status_history.deleted else target.status
+        old_date = date_history.deleted[0] if date_history.deleted else target.date
+        _change(target, old_status, None, old_date)
+        _change(target, None, target.status, target.date)
+
+
+@event.listens_for(Course, 'after_delete')
+def _course_deleted(mapper, connection, target):
+    inspect(target).session.info.setdefault('attendance_deleted_courses', set()).add(target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    inspect(target).session.info.setdefault('attendance_deleted_students', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_attendance_changes(db_session, flush_context):
+    changes = db_session.info.pop('attendance_changes', None)
+    courses = db_session.info.pop('attendance_deleted_courses', None) or set()
+    students = db_session.info.pop('attendance_deleted_students', None) or set()
+
+    if changes and (courses or students):
+        changes = [change for change in changes if change[0] not in students and change[1] not in courses]
+    if changes:
+        apply_attendance_changes(db_session.connection(), changes)
+
+    # Without ON DELETE CASCADE (SQLite without foreign keys) the rows would stay behind
+    table = EnrollmentAttendance.__table__
+    if courses:
+        db_session.connection().execute(delete(table).where(table.c.course_id.in_(sorted(courses))))
+    if students:
+        db_session.connection().execute(delete(table).where(table.c.student_id.in_(sorted(students))))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_attendance_changes(db_session):
+    db_session.info.pop('attendance_changes', None)
+    db_session.info.pop('attendance_deleted_courses', None)
+    db_session.info.pop('attendance_deleted_students', None)
+
+
+def _grouped_totals():
+    """SELECT of every (student, course)'s totals straight from attendance_record"""
+    return select(
+        AttendanceRecord.student_id,
+        AttendanceRecord.course_id,
+        *[func.count(case((AttendanceRecord.status == status, 1))).label(status) for status in ATTENDANCE_STATUSES],
+        func.max(case((AttendanceRecord.status.in_(ATTENDED_STATUSES), AttendanceRecord.date))).label('last_seen')
+    ).join(
+        # Records left behind by a deleted student or course (no foreign keys in SQLite) don't count
+        Course, Course.id == AttendanceRecord.course_id
+    ).join(
+        User, User.id == AttendanceRecord.student_id
+    ).group_by(AttendanceRecord.student_id, AttendanceRecord.course_id)
+
+
+def rebuild_enrollment_attendance():
+    """Recompute enrollment_attendance from attendance_record; return the number of rows written"""
+    table = EnrollmentAttendance.__table__
+    columns = ['student_id', 'course_id', *ATTENDANCE_STATUSES, 'last_seen']
+
+    db.session.info.pop('attendance_changes', None)
+    connection = db.session.connection()
+    connection.execute(delete(table))
+    written = connection.execute(insert(table).from_select(columns, _grouped_totals())).rowcount
+    db.session.commit()
+    return written
+
+
+def enrollment_attendance_drift():
+    """[(student_id, course_id)] whose stored totals differ from the records"""
+    def keyed(rows):
+        return {(row[0], row[1]): tuple(row[2:]) for row in rows if any(row[2:])}
+
+    table = EnrollmentAttendance.__table__
+    stored = keyed(db.session.execute(
+        select(table.c.student_id, table.c.course_id, *[table.c[status] for status in ATTENDANCE_STATUSES],
+               table.c.last_seen)
+    ))
+    live = keyed(db.session.execute(_grouped_totals()))
+    return sorted(key for key in stored.keys() | live.keys() if stored.get(key) != live.get(key))
+
+
+def student_attendance_totals(student_id):
+    """One dict per enrolled course with the student's totals, read from enrollment_attendance only"""
+    rows = db.session.execute(
+        select(Course, EnrollmentAttendance)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .outerjoin(EnrollmentAttendance, (EnrollmentAttendance.student_id == Enrollment.student_id)
+                   & (EnrollmentAttendance.course_id == Enrollment.course_id))
+        .where(Enrollment.student_id == student_id)
+        .options(joinedload(Course.educator))
+        .order_by(Enrollment.id)
+    ).all()
+
+    summaries = []
+    for course, totals in rows:
+        counts = {status: getattr(totals, status) if totals else 0 for status in ATTENDANCE_STATUSES}
+        attended = counts['present'] + counts['late']
+        counted = attended + counts['absent']
+        summaries.append({
+            'course': course,
+            **counts,
+            'total': sum(counts.values()),
+            'rate': attended / counted if counted else None,
+            'last_seen': totals.last_seen if totals else None,
+        })
+    return summaries
@@ -0,0 +1,170 @@
+from flask import flash, redirect, url_for, abort
+from flask_login import current_user
+from database import db
+from models import Course, Enrollment
+from cache import TTLCache
+from fragments import scope_versions, invalidate_fragments
+from sqlalchemy import event, select, inspect
+from sqlalchemy.orm import Session, object_session
+from functools import wraps
+
+# ==========================================
+# ROUTE AUTHORIZATION
+# ==========================================
+# Declarative guards for routes, stacked under @login_required:
+#   @role_required('educator')   role check (flash + redirect home, or 403 with api=True)
+#   @owns_course                 <course_id> must be one of the educator's courses
+#                                (@owns_course(message=...) to change the flash message)
+#   @enrolled_in_course          <course_id> must be one of the student's courses
+# Course ids per user are cached (owned and enrolled sets), so granted checks
+# are set lookups. Each set is stored with the user's version (a
+# 'course-access:<id>' scope of the fragment cache backend), and a set whose
+# version moved on is reloaded, so revoking access takes effect on the next
+# request. With the Redis backend (FRAGMENT_CACHE_URL) the versions are shared
+# by every worker; run more than one worker without it and a revoked grant
+# lingers in the other workers for up to COURSE_ACCESS_TTL. A course missing
+# from the set is re-checked in the database before access is denied. Course /
+# Enrollment inserts, deletes and educator changes bump the affected user's
+# version; bulk Core inserts must call invalidate_course_access().
+
+COURSE_ACCESS_CACHE_SIZE = 10000
+COURSE_ACCESS_TTL = 300  # seconds
+
+_owned = TTLCache(COURSE_ACCESS_CACHE_SIZE, COURSE_ACCESS_TTL)  # educator id -> (version, frozenset of course ids)
+_enrolled = TTLCache(COURSE_ACCESS_CACHE_SIZE, COURSE_ACCESS_TTL)  # student id -> (version, frozenset of course ids)
+
+
+def course_access_scope(user_id):
+    return f'course-access:{user_id}'
+
+
+def _course_ids(cache, user_id, query):
+    """The cached set if it is still at the user's current version, else reloaded"""
+    [version] = scope_versions(course_access_scope(user_id))
+    if version is None:
+        # Backend unavailable: nothing to check a cached set against
+        return frozenset(db.session.scalars(query))
+
+    entry = cache.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    course_ids = frozenset(db.session.scalars(query))
+    cache.set(user_id, (version, course_ids))
+    return course_ids
+
+
+def owned_course_ids(user_id):
+    return _course_ids(_owned, user_id, select(Course.id).where(Course.educator_id == user_id))
+
+
+def enrolled_course_ids(user_id):
+    return _course_ids(_enrolled, user_id, select(Enrollment.course_id).where(Enrollment.student_id == user_id))
+
+
+def owns(course_id):
+    if course_id in owned_course_ids(current_user.id):
+        return True
+    owned = db.session.scalar(
+        select(Course.id).where(Course.id == course_id, Course.educator_id == current_user.id)
+    ) is not None
+    if owned:
+        _owned.pop(current_user.id)  # stale set, reload it on the next check
+    return owned
+
+
+def is_enrolled(course_id):
+    if course_id in enrolled_course_ids(current_user.id):
+        return True
+    enrolled = db.session.scalar(
+        select(Enrollment.id).where(Enrollment.course_id == course_id, Enrollment.student_id == current_user.id)
+    ) is not None
+    if enrolled:
+        _enrolled.pop(current_user.id)
+    return enrolled
+
+
+def invalidate_course_access(user_id):
+    _owned.pop(user_id)
+    _enrolled.pop(user_id)
+    invalidate_fragments(course_access_scope(user_id))
+
+
+# ==========================================
+# DECORATORS
+# ==========================================
+
+def role_required(*roles, api=False):
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_user.role not in roles:
+                if api:
+                    abort(403)
+                flash("Access denied.", "error")
+                return redirect(url_for('home'))
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def owns_course(view=None, *, message="Access denied."):
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if not owns(kwargs['course_id']):
+                flash(message, "error")
+                return redirect(url_for('educator_courses'))
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator(view) if view else decorator
+
+
+def enrolled_in_course(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not is_enrolled(kwargs['course_id']):
+            flash("You are not enrolled in this course.", "error")
+            return redirect(url_for('student_home'))
+        return view(*args, **kwargs)
+    return wrapped
+
+
+# ==========================================
+# INVALIDATION
+# ==========================================
+
+def _changed(target, user_id):
+    invalidate_course_access(user_id)
+    object_session(target).info.setdefault('changed_course_access', set()).add(user_id)
+
+
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_delete')
+def _course_changed(mapper, connection, target):
+    _changed(target, target.educator_id)
+
+
+@event.listens_for(Course, 'after_update')
+def _course_moved(mapper, connection, target):
+    # Reassigning a course changes both educators' sets
+    history = inspect(target).attrs.educator_id.history
+    for educator_id in list(history.added or ()) + list(history.deleted or ()):
+        _changed(target, educator_id)
+
+
+@event.listens_for(Enrollment, 'after_insert')
+@event.listens_for(Enrollment, 'after_delete')
+def _enrollment_changed(mapper, connection, target):
+    _changed(target, target.student_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    # Another request may have cached the old sets between flush and commit
+    for user_id in db_session.info.pop('changed_course_access', ()):
+        invalidate_course_access(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(db_session):
+    db_session.info.pop('changed_course_access', None)
@@ -0,0 +1,149 @@
+"""Benchmark: concurrent attendance writers under each SQLite profile
+
+Run from the project root:
+    python benchmarks/concurrent_writers_bench.py [--writers 8] [--readers 4] [--submissions 25]
+
+Each writer thread records a full class (60 students) for its own course,
+one date per submission, while reader threads load attendance history.
+Reports throughput, latency and "database is locked" errors per profile.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from database import db, configure_database, init_sqlite_pragmas, SQLITE_PROFILES
+from models import User, Course, Enrollment
+from attendance import record_attendance_bulk, paginate_attendance_dates, summarize_attendance_dates
+
+CLASS_SIZE = 60
+
+
+def seed(writers):
+    educator = User(first_name='Bench', last_name='Educator', username='bench_edu',
+                    email='bench_edu@example.com', contact_number='09000000000',
+                    password='x', role='educator')
+    db.session.add(educator)
+    db.session.flush()
+
+    db.session.execute(User.__table__.insert(), [
+        {'first_name': 'Student', 'last_name': str(i), 'username': f'bench_s{i}',
+         'email': f'bench_s{i}@example.com', 'contact_number': '09000000000',
+         'password': 'x', 'role': 'student'}
+        for i in range(CLASS_SIZE)
+    ])
+    student_ids = [student_id for (student_id,) in db.session.query(User.id).filter_by(role='student').all()]
+
+    course_ids = []
+    for i in range(writers):
+        course = Course(course_name=f'Course {i}', course_code=f'B{i}', block_section='B1',
+                        educator_id=educator.id, enrollment_code=f'BENCH{i:03d}')
+        db.session.add(course)
+        db.session.flush()
+        course_ids.append(course.id)
+        db.session.execute(Enrollment.__table__.insert(), [
+            {'student_id': student_id, 'course_id': course.id} for student_id in student_ids
+        ])
+
+    db.session.commit()
+    return educator.id, course_ids, student_ids
+
+
+def run_profile(profile, writers, readers, submissions):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        bench_app = Flask(__name__)
+        configure_database(bench_app, profile=profile)
+        db.init_app(bench_app)
+        init_sqlite_pragmas(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            educator_id, course_ids, student_ids = seed(writers)
+
+        latencies = []
+        errors = {'locked': 0, 'reads': 0}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def writer(course_id):
+            with bench_app.app_context():
+                for n in range(submissions):
+                    statuses = {student_id: ('present', 'late', 'absent')[(student_id + n) % 3]
+                                for student_id in student_ids}
+                    started = time.perf_counter()
+                    try:
+                        record_attendance_bulk(course_id, date.today() - timedelta(days=n), statuses, educator_id)
+                        db.session.commit()
+                        with lock:
+                            latencies.append(time.perf_counter() - started)
+                    except OperationalError:
+                        db.session.rollback()
+                        with lock:
+                            errors['locked'] += 1
+                db.session.remove()
+
+        def reader(course_id):
+            with bench_app.app_context():
+                while not done.is_set():
+                    try:
+                        dates, _ = paginate_attendance_dates(course_id)
+                        summarize_attendance_dates(course_id, dates)
+                        with lock:
+                            errors['reads'] += 1
+                    except OperationalError:
+                        db.session.rollback()
+                    db.session.remove()
+
+        threads = [threading.Thread(target=writer, args=(course_id,)) for course_id in course_ids]
+        reader_threads = [threading.Thread(target=reader, args=(course_ids[i % len(course_ids)],))
+                          for i in range(readers)]
+
+        started = time.perf_counter()
+        for thread in threads + reader_threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        with bench_app.app_context():
+            db.engine.dispose()
+
+    latencies.sort()
+    return {
+        'commits_per_s': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+        'locked': errors['locked'],
+        'reads': errors['reads'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=25)
+    args = parser.parse_args()
+
+    print(f"{'profile':<11}  {'commits/s':>9}  {'p50 ms':>7}  {'p95 ms':>7}  {'locked':>6}  {'reads':>6}")
+    for profile in SQLITE_PROFILES:
+        result = run_profile(profile, args.writers, args.readers, args.submissions)
+        print(f"{profile:<11}  {result['commits_per_s']:>9.1f}  {result['p50_ms']:>7.1f}  "
+              f"{result['p95_ms']:>7.1f}  {result['locked']:>6}  {result['reads']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,500 @@
+"""Shared pieces of the route benchmarks: dataset, route cases and results
+
+Used by routes_bench.py (Flask test client) and load_bench.py (concurrent
+virtual users against a local server). Not a benchmark by itself.
+
+The dataset is the sample data of initialize_database times a scale factor
+(4 educators, 21 students, 10 courses, 20 lesson plans with a material each,
+20 days of attendance for every enrollment and 20 contact messages per 1x),
+generated with a fixed random seed so runs are comparable.
+"""
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+BENCH_PASSWORD = 'bench123'
+BENCH_MATERIAL = b'Benchmark lesson material.\n' * 64
+BENCH_MATERIAL_SHA256 = hashlib.sha256(BENCH_MATERIAL).hexdigest()
+
+SAMPLE = {
+    'educators': 4,
+    'students': 21,
+    'courses': 10,
+    'courses_per_student': 10,
+    'plans_per_course': 2,
+    'days': 20,
+    'messages': 20,
+}
+
+ROLES = ('anonymous', 'student', 'educator', 'admin')
+
+
+# ==========================================
+# APP AND DATASET
+# ==========================================
+
+def load_app(workdir):
+    """Import the real app against a fresh SQLite database in workdir"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Uploads and the material store are relative to the working directory
+    os.chdir(workdir)
+
+    from app import app
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.instance_path = workdir
+    return app
+
+
+def build_dataset(scale, seed=0):
+    """Load the sample data times scale; returns the route context (see route_context)"""
+    from passwords import hash_password
+    from database import db
+    from models import User, Course, LessonPlan, LearningMaterial, ContactMessage
+    from materials import store_material
+    from search import rebuild_search_index
+    from stats import rebuild_daily_summary
+    from seed import seed as seed_data, insert_rows
+
+    rng = random.Random(seed or scale)
+    db.create_all()
+
+    seed_data(
+        students=SAMPLE['students'] * scale,
+        courses=SAMPLE['courses'] * scale,
+        days=SAMPLE['days'],
+        educators=SAMPLE['educators'] * scale,
+        courses_per_student=SAMPLE['courses_per_student'],
+        password=BENCH_PASSWORD,
+        rng=rng,
+        echo=lambda message: None,
+    )
+
+    insert_rows(User, [{
+        'first_name': 'Bench', 'last_name': 'Admin', 'username': 'bench_admin',
+        'email': 'bench_admin@example.com', 'contact_number': '09000000000',
+        'role': 'admin', 'password': hash_password(BENCH_PASSWORD),
+    }])
+
+    now = datetime.utcnow()
+    courses = db.session.execute(db.select(Course.id, Course.educator_id).order_by(Course.id)).all()
+    insert_rows(LessonPlan, (
+        {
+            'title': f"Lesson {n + 1} of course {course_id}",
+            'topic': rng.choice(['Variables', 'Loops', 'Functions', 'Databases', 'Networks']),
+            'objectives': "Understand the topic and apply it in practice",
+            'description': "This lesson covers the topic in detail with practical examples.",
+            'course_id': course_id,
+            'educator_id': educator_id,
+            'created_at': now - timedelta(days=rng.randint(15, 70)),
+            'updated_at': now - timedelta(days=rng.randint(1, 15)),
+        }
+        for course_id, educator_id in courses
+        for n in range(SAMPLE['plans_per_course'])
+    ))
+
+    # Every material shares one stored file, as identical uploads do in the store
+    filepath = store_material(BytesIO(BENCH_MATERIAL), 'notes.txt')
+    insert_rows(LearningMaterial, (
+        {'lesson_plan_id': plan_id, 'filename': 'notes.txt', 'filepath': filepath, 'uploaded_at': now}
+        for plan_id in db.session.scalars(db.select(LessonPlan.id).order_by(LessonPlan.id))
+    ))
+
+    insert_rows(ContactMessage, (
+        {
+            'name': f"Visitor {n}",
+            'email': f"visitor{n}@example.com",
+            'message': "I'm interested in enrolling in your programming courses.",
+            'created_at': now - timedelta(days=rng.randint(1, 30)),
+            'is_read': rng.random() < 0.4,
+        }
+        for n in range(SAMPLE['messages'] * scale)
+    ))
+    db.session.commit()
+
+    rebuild_search_index()
+    rebuild_daily_summary()
+    return route_context()
+
+
+def route_context():
+    """Ids the route cases use, per role: the first seeded educator and student"""
+    from database import db
+    from models import User, Course, LessonPlan, LearningMaterial, Enrollment
+
+    educator = db.session.scalars(db.select(User).filter_by(role='educator').order_by(User.id)).first()
+    student = db.session.scalars(db.select(User).filter_by(role='student').order_by(User.id)).first()
+    admin = db.session.scalars(db.select(User).filter_by(role='admin').order_by(User.id)).first()
+
+    course_id = db.session.scalar(db.select(Course.id).filter_by(educator_id=educator.id).order_by(Course.id))
+    student_course_id = db.session.scalar(
+        db.select(Enrollment.course_id).filter_by(student_id=student.id).order_by(Enrollment.course_id)
+    )
+
+    def first_plan(course):
+        return db.session.scalar(db.select(LessonPlan.id).filter_by(course_id=course).order_by(LessonPlan.id))
+
+    def first_material(plan):
+        return db.session.scalar(
+            db.select(LearningMaterial.id).filter_by(lesson_plan_id=plan).order_by(LearningMaterial.id)
+        )
+
+    plan_id = first_plan(course_id)
+    student_plan_id = first_plan(student_course_id)
+    roster = list(db.session.scalars(db.select(Enrollment.student_id).filter_by(course_id=course_id)))
+
+    return {
+        'admin': {'id': admin.id, 'username': admin.username},
+        'educator': {
+            'id': educator.id,
+            'username': educator.username,
+            'course_id': course_id,
+            'plan_id': plan_id,
+            'material_id': first_material(plan_id),
+            'material_path': db.session.get(LearningMaterial, first_material(plan_id)).filepath,
+            'date_str': (date.today() - timedelta(days=1)).isoformat(),
+            'roster': roster,
+        },
+        'student': {
+            'id': student.id,
+            'username': student.username,
+            'course_id': student_course_id,
+            'plan_id': student_plan_id,
+            'material_id': first_material(student_plan_id),
+        },
+    }
+
+
+# ==========================================
+# ROUTE CASES
+# ==========================================
+# Every GET route runs under every role (denials and redirects are part of
+# the cost), with ids taken from the role the route belongs to. Routes that
+# write run under their own role only, each request against a fresh target
+# made by its setup (outside the timing).
+
+@dataclass
+class Case:
+    endpoint: str
+    rule: str
+    method: str
+    role: str
+    setup: object = None  # (ctx, n) -> {'path': {...}, 'data'/'json'/'headers': ...}
+    query: dict = field(default_factory=dict)
+    fresh_client: bool = False  # the request changes who is logged in
+
+    @property
+    def name(self):
+        return f"{self.method} {self.endpoint} [{self.role}]"
+
+
+def route_role(rule):
+    for prefix, role in (('/admin', 'admin'), ('/educator', 'educator'), ('/student', 'student')):
+        if rule.startswith(prefix):
+            return role
+    return None
+
+
+def path_params(ctx, role, arguments):
+    """URL arguments for a GET rule, from the owning role's ids"""
+    source = ctx.get(role) or ctx['educator']
+    params = {}
+    for argument in arguments:
+        if argument == 'role':
+            params[argument] = 'student'
+        else:
+            params[argument] = source.get(argument, ctx['educator'].get(argument))
+    return params
+
+
+QUERY_ARGS = {
+    'search_lessons': {'q': 'lesson'},
+    'export_course_attendance': {'format': 'csv'},
+    'export_all_attendance': {'format': 'csv'},
+}
+
+
+def _new_student(n):
+    from database import db
+    from models import User
+    user = User(first_name='Bench', last_name='Student', username=f"bench_new{n}_{time.time_ns() % 10 ** 9}",
+                email=f"bench_new{n}_{time.time_ns()}@example.com", contact_number='09000000000',
+                role='student', password='x')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _new_course(ctx):
+    from database import db
+    from models import Course
+    course = Course(course_name='Bench course', course_code='BENCH', block_section='B1',
+                    educator_id=ctx['educator']['id'], enrollment_code=Course.generate_enrollment_code())
+    db.session.add(course)
+    db.session.flush()
+    return course
+
+
+def _new_upload(ctx, filled=False):
+    from uploads import create_upload, write_chunk
+    upload = create_upload(ctx['educator']['plan_id'], ctx['educator']['id'], 'notes.txt', len(BENCH_MATERIAL))
+    if filled:
+        write_chunk(upload, 0, BytesIO(BENCH_MATERIAL), len(BENCH_MATERIAL), BENCH_MATERIAL_SHA256)
+    return upload.upload_id
+
+
+def _new_import():
+    from provisioning import start_account_import
+    return start_account_import([])
+
+
+def _commit(result):
+    from database import db
+    db.session.commit()
+    return result
+
+
+def _course_form(n):
+    return {'course_name': f"Bench course {n}", 'course_code': 'BENCH', 'block_section': 'B1',
+            'description': 'Benchmark course'}
+
+
+def _enrollment_setup(ctx, n):
+    from database import db
+    from models import Enrollment
+    enrollment = Enrollment(student_id=_new_student(n).id, course_id=ctx['educator']['course_id'])
+    db.session.add(enrollment)
+    db.session.flush()
+    return _commit({'path': {'enrollment_id': enrollment.id}})
+
+
+def _plan_setup(ctx, n):
+    from database import db
+    from models import LessonPlan
+    plan = LessonPlan(title=f"Bench plan {n}", course_id=ctx['educator']['course_id'],
+                      educator_id=ctx['educator']['id'])
+    db.session.add(plan)
+    db.session.flush()
+    return _commit({'path': {'plan_id': plan.id}})
+
+
+def _material_setup(ctx, n):
+    from database import db
+    from models import LearningMaterial
+    material = LearningMaterial(lesson_plan_id=ctx['educator']['plan_id'], filename='notes.txt',
+                                filepath=ctx['educator']['material_path'])
+    db.session.add(material)
+    db.session.flush()
+    return _commit({'path': {'material_id': material.id}})
+
+
+def _message_setup(ctx, n):
+    from database import db
+    from models import ContactMessage
+    message = ContactMessage(name='Bench', email='bench@example.com', message='Benchmark message body')
+    db.session.add(message)
+    db.session.flush()
+    return _commit({'path': {'message_id': message.id}})
+
+
+def _attendance_form(ctx, n):
+    statuses = ('present', 'late', 'absent', 'excused')
+    data = {'course_id': ctx['educator']['course_id'], 'date': ctx['educator']['date_str']}
+    for i, student_id in enumerate(ctx['educator']['roster']):
+        data[f'student_{student_id}'] = statuses[(i + n) % len(statuses)]
+    return data
+
+
+# endpoint -> (role, setup, fresh_client) for every route that is not a plain GET
+WRITES = {
+    'login': ('anonymous', lambda ctx, n: {'data': {
+        'username_or_email': ctx['student']['username'], 'password': BENCH_PASSWORD}}, True),
+    'register_form': ('anonymous', lambda ctx, n: {'path': {'role': 'student'}, 'data': {
+        'first_name': 'Bench', 'last_name': 'Register', 'username': f"benchreg{n}_{time.time_ns() % 10 ** 6}",
+        'email': f"benchreg{n}_{time.time_ns()}@example.com", 'contact_number': '09000000000',
+        'password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD}}, True),
+    'contacts': ('anonymous', lambda ctx, n: {'data': {
+        'name': 'Bench', 'email': 'bench@example.com', 'message': 'Benchmark message body'}}, False),
+    'add_course': ('educator', lambda ctx, n: {'data': _course_form(n)}, False),
+    'edit_course': ('educator', lambda ctx, n: {'path': {'course_id': ctx['educator']['course_id']},
+                                                'data': _course_form(n)}, False),
+    'delete_course': ('educator', lambda ctx, n: _commit({'path': {'course_id': _new_course(ctx).id}}), False),
+    'manage_enrollments': ('educator', lambda ctx, n: _commit({'path': {'course_id': ctx['educator']['course_id']},
+                                                               'data': {'student_email': _new_student(n).email}}),
+                           False),
+    'remove_enrollment': ('educator', _enrollment_setup, False),
+    'add_lesson_plan': ('educator', lambda ctx, n: {'path': {'course_id': ctx['educator']['course_id']},
+                                                    'data': {'title': f"Bench plan {n}", 'topic': 'Benchmarks'}},
+                        False),
+    'edit_lesson_plan': ('educator', lambda ctx, n: {'path': {'plan_id': ctx['educator']['plan_id']},
+                                                     'data': {'title': f"Bench plan {n}", 'topic': 'Benchmarks'}},
+                         False),
+    'delete_lesson_plan': ('educator', _plan_setup, False),
+    'delete_material': ('educator', _material_setup, False),
+    'course_attendance': ('educator', lambda ctx, n: {'path': {'course_id': ctx['educator']['course_id']},
+                                                      'data': {'date': ctx['educator']['date_str']}}, False),
+    'record_attendance': ('educator', lambda ctx, n: {'data': _attendance_form(ctx, n)}, False),
+    'start_material_upload': ('educator', lambda ctx, n: {'path': {'plan_id': ctx['educator']['plan_id']},
+                                                          'json': {'filename': 'notes.txt',
+                                                                   'size': len(BENCH_MATERIAL)}}, False),
+    'material_upload_status': ('educator', lambda ctx, n: {'path': {'upload_id': _new_upload(ctx)}}, False),
+    'upload_material_chunk': ('educator', lambda ctx, n: {
+        'path': {'upload_id': _new_upload(ctx)}, 'data': BENCH_MATERIAL,
+        'headers': {'Content-Range': f"bytes 0-{len(BENCH_MATERIAL) - 1}/{len(BENCH_MATERIAL)}",
+                    'X-Chunk-SHA256': BENCH_MATERIAL_SHA256}}, False),
+    'finalize_material_upload': ('educator', lambda ctx, n: {'path': {'upload_id': _new_upload(ctx, filled=True)},
+                                                             'json': {}}, False),
+    'cancel_material_upload': ('educator', lambda ctx, n: {'path': {'upload_id': _new_upload(ctx)}}, False),
+    'student_join_course': ('student', lambda ctx, n: _commit({'data': {
+        'enrollment_code': _new_course(ctx).enrollment_code}}), False),
+    'mark_message_read': ('admin', _message_setup, False),
+    'delete_message': ('admin', _message_setup, False),
+    'promote_user': ('admin', lambda ctx, n: _commit({'path': {'user_id': _new_student(n).id}}), False),
+    'remove_user': ('admin', lambda ctx, n: _commit({'path': {'user_id': _new_student(n).id}}), False),
+    'admin_import_result': ('admin', lambda ctx, n: {'path': {'job_id': _new_import()}}, False),
+    'admin_import_status': ('admin', lambda ctx, n: {'path': {'job_id': _new_import()}}, False),
+}
+
+# GETs that need a setup of their own
+GET_SETUPS = {'material_upload_status', 'admin_import_result', 'admin_import_status'}
+
+
+def route_cases(app, roles=ROLES, include_writes=True):
+    """One Case per (route, method, role) for every rule in the app"""
+    cases = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint == 'static':
+            continue
+        methods = sorted(rule.methods - {'HEAD', 'OPTIONS'})
+        owner = route_role(rule.rule)
+
+        if 'GET' in methods and rule.endpoint not in GET_SETUPS:
+            for role in roles:
+                params = path_params(ROUTE_CONTEXT, owner or role, rule.arguments)
+                cases.append(Case(rule.endpoint, rule.rule, 'GET', role,
+                                  setup=lambda ctx, n, params=params: {'path': params},
+                                  query=QUERY_ARGS.get(rule.endpoint, {}),
+                                  fresh_client=rule.endpoint == 'logout'))
+
+        if include_writes and rule.endpoint in WRITES:
+            role, setup, fresh_client = WRITES[rule.endpoint]
+            if role in roles:
+                method = 'GET' if rule.endpoint in GET_SETUPS else next(m for m in methods if m != 'GET')
+                cases.append(Case(rule.endpoint, rule.rule, method, role, setup=setup, fresh_client=fresh_client))
+    return cases
+
+
+# Filled by prepare(); GET cases resolve their ids from it
+ROUTE_CONTEXT = {}
+
+
+def prepare(app, scale):
+    """Build the dataset for scale and remember its route context"""
+    with app.app_context():
+        started = time.perf_counter()
+        ROUTE_CONTEXT.clear()
+        ROUTE_CONTEXT.update(build_dataset(scale))
+        return time.perf_counter() - started
+
+
+def login(client, role):
+    if role == 'anonymous':
+        return
+    response = client.post('/login', data={'username_or_email': ROUTE_CONTEXT[role]['username'],
+                                           'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"Could not log in as {role} (HTTP {response.status_code})")
+
+
+# ==========================================
+# MEASUREMENTS
+# ==========================================
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def reset_peak_rss():
+    """Reset the process high-water mark where the OS allows it (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb():
+    """Peak resident set size in KiB (since the last reset on Linux, else process lifetime)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_results(results, output, prefix):
+    """Write results as JSON (default: benchmarks/results/<prefix>-<timestamp>.json); returns the path"""
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    return output
+
+
+def compare(baseline_path, results, key_fields=('scale', 'name')):
+    """Print p50/p95/query changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {tuple(row[k] for k in key_fields): row for row in json.load(f)['results']}
+
+    def queries(row):
+        return row.get('queries_p50', row.get('queries_avg', 0))
+
+    print(f"\nChange vs {baseline_path}")
+    print(f"{'endpoint':<58} {'p50 ms':>15} {'p95 ms':>15} {'queries':>11}")
+    for row in results['results']:
+        old = baseline.get(tuple(row[k] for k in key_fields))
+        if not old:
+            continue
+        print(f"{row['scale']:>3}x {row['name']:<54} "
+              f"{old['p50_ms']:>6.1f} → {row['p50_ms']:>6.1f} "
+              f"{old['p95_ms']:>6.1f} → {row['p95_ms']:>6.1f} "
+              f"{queries(old):>4} → {queries(row):>4}")
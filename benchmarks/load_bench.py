@@ -0,0 +1,217 @@
+"""Benchmark: concurrent virtual users against a local server
+
+Run from the project root:
+    python benchmarks/load_bench.py [--scale 10] [--users 20] [--duration 30] [--think-ms 100]
+
+Starts the app on a threaded local server over the benchmark dataset (see
+harness.py), then spawns virtual users locust-style: each logs in as a
+student, educator or admin (by --mix weights) and loops over the GET routes
+of its role, plus attendance submissions for educators, with exponential
+think time. Reports requests/s, failures and p50/p95 latency per endpoint,
+SQL queries per request from the app's own metrics and peak RSS of the
+process, and saves them as JSON under benchmarks/results/.
+"""
+import argparse
+import http.cookiejar
+import random
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from harness import (ROUTE_CONTEXT, BENCH_PASSWORD, load_app, prepare, route_cases, route_role, percentile,
+                     reset_peak_rss, peak_rss_kb, environment, save_results, compare)
+
+# Routes a virtual user would not call in a loop (or that need state the dataset lacks)
+SKIPPED = {'logout', 'login', 'register', 'register_form', 'choose_role', 'prometheus_metrics',
+           'material_upload_status', 'student_material_thumbnail'}
+
+# endpoint -> weight relative to 1 for each GET route
+WRITE_TASKS = {'educator': {'record_attendance': 3}}
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, app, base_url, role, tasks, think_ms, stop, results, lock, rng):
+        super().__init__(daemon=True)
+        self.app = app
+        self.base_url = base_url
+        self.role = role
+        self.tasks = tasks
+        self.think_ms = think_ms
+        self.stop = stop
+        self.results = results
+        self.lock = lock
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            return 0
+
+    def login(self):
+        status = self.request('POST', '/login', {'username_or_email': ROUTE_CONTEXT[self.role]['username'],
+                                                 'password': BENCH_PASSWORD})
+        return status == 200  # redirects are followed to the dashboard
+
+    def run(self):
+        if not self.login():
+            with self.lock:
+                self.results['login'].append((0, False))
+            return
+
+        weights = [weight for _, _, weight in self.tasks]
+        n = 0
+        while not self.stop.is_set():
+            case, path, _ = self.rng.choices(self.tasks, weights=weights)[0]
+            data = None
+            if case.method != 'GET':
+                with self.app.app_context():
+                    data = case.setup(ROUTE_CONTEXT, n).get('data')
+            n += 1
+
+            started = time.perf_counter()
+            status = self.request(case.method, path, data)
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.results[case.name].append((elapsed, 200 <= status < 400))
+
+            self.stop.wait(self.rng.expovariate(1000 / self.think_ms) if self.think_ms else 0)
+
+
+def role_tasks(app, role):
+    """(case, path, weight) for the routes a user of this role would call"""
+    from flask import url_for
+
+    tasks = []
+    cases = route_cases(app, roles=(role,))
+    writes = WRITE_TASKS.get(role, {})
+    for case in cases:
+        if case.endpoint in SKIPPED or route_role(case.rule) not in (role, None):
+            continue
+        if case.method != 'GET' and case.endpoint not in writes:
+            continue
+        with app.app_context():
+            spec = case.setup(ROUTE_CONTEXT, 0)
+        with app.test_request_context():
+            path = url_for(case.endpoint, **spec.get('path', {}), **case.query)
+        tasks.append((case, path, writes.get(case.endpoint, 1)))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--spawn-rate', type=float, default=10, help='Users started per second.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run after all users started.')
+    parser.add_argument('--think-ms', type=float, default=100, help='Mean think time between requests.')
+    parser.add_argument('--mix', type=int, nargs=3, default=[70, 25, 5], metavar=('STUDENT', 'EDUCATOR', 'ADMIN'))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/load-<timestamp>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(tmp)
+        build_seconds = prepare(app, args.scale)
+        tasks = {role: role_tasks(app, role) for role in ('student', 'educator', 'admin')}
+
+        import metrics
+        metrics.reset()
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        print(f"{args.scale}x dataset built in {build_seconds:.1f}s, serving on {base_url}")
+
+        rng = random.Random(args.seed)
+        stop = threading.Event()
+        lock = threading.Lock()
+        results = defaultdict(list)
+        users = []
+        reset_peak_rss()
+
+        started = time.perf_counter()
+        for n in range(args.users):
+            role = rng.choices(('student', 'educator', 'admin'), weights=args.mix)[0]
+            user = VirtualUser(app, base_url, role, tasks[role], args.think_ms, stop, results, lock,
+                               random.Random(args.seed + n))
+            user.start()
+            users.append(user)
+            time.sleep(1 / args.spawn_rate)
+
+        time.sleep(args.duration)
+        stop.set()
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        endpoint_queries = {endpoint: stats.average('queries') for endpoint, stats in metrics.snapshot()}
+        peak_kb = peak_rss_kb()
+        with app.app_context():
+            from database import db
+            db.engine.dispose()
+
+    rows = []
+    for name, samples in sorted(results.items()):
+        latencies = [ms for ms, ok in samples if ms]
+        endpoint = name.split(' ')[1] if ' ' in name else name
+        rows.append({
+            'scale': args.scale,
+            'name': name,
+            'endpoint': endpoint,
+            'requests': len(samples),
+            'failures': sum(1 for _, ok in samples if not ok),
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'mean_ms': round(statistics.mean(latencies), 2) if latencies else 0,
+            'queries_avg': round(endpoint_queries.get(endpoint, 0), 1),
+        })
+
+    total = sum(row['requests'] for row in rows)
+    print(f"{'endpoint':<50} {'reqs':>6} {'fail':>5} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'queries':>7}")
+    for row in rows:
+        print(f"{row['name']:<50} {row['requests']:>6} {row['failures']:>5} {row['rps']:>7.1f} "
+              f"{row['p50_ms']:>7.1f} {row['p95_ms']:>7.1f} {row['queries_avg']:>7}")
+    print(f"{'total':<50} {total:>6} {sum(row['failures'] for row in rows):>5} {total / elapsed:>7.1f}")
+    print(f"Peak RSS {peak_kb / 1024:.1f} MB")
+
+    output = {
+        'benchmark': 'load',
+        'environment': environment(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'build_seconds': round(build_seconds, 2),
+        'elapsed_seconds': round(elapsed, 2),
+        'peak_rss_kb': peak_kb,
+        'results': rows,
+    }
+    print(f"\n✓ Saved {save_results(output, args.output, 'load')}")
+
+    if args.compare:
+        compare(args.compare, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark: password hashing cost, calibrated to a target login latency
+
+Run from the project root:
+    python benchmarks/password_hash_bench.py [--target-ms 250] [--algorithms scrypt pbkdf2] [--samples 5]
+
+Times werkzeug's scrypt at n = 2^12 .. 2^17 (r=8, p=1) and pbkdf2-sha256 at
+a range of iterations on this host, picks for each algorithm the strongest
+parameters whose median hash stays under --target-ms, and measures hashes/s
+for them with one process per CPU (the ceiling for a login stampede). Prints
+the PASSWORD_HASH_METHOD to set (see passwords.py) and saves the results as
+JSON under benchmarks/results/.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from harness import environment, save_results
+
+from passwords import hash_method, canonical_method
+from werkzeug.security import generate_password_hash, check_password_hash
+
+SCRYPT_N = [2 ** exponent for exponent in range(12, 18)]
+SCRYPT_R, SCRYPT_P = 8, 1
+PBKDF2_PROBE = 100_000  # iterations timed to extrapolate from
+PASSWORD = 'correct horse battery'
+
+
+def time_method(method, samples):
+    """Median ms of check_password_hash (what a login pays) for a hash made with method"""
+    stored = generate_password_hash(PASSWORD, method=method)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        check_password_hash(stored, PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def memory_mb(method):
+    name, *args = method.split(':')
+    return 128 * int(args[0]) * int(args[1]) / 2 ** 20 if name == 'scrypt' else 0
+
+
+def scrypt_candidates(target_ms, samples):
+    rows = []
+    for n in SCRYPT_N:
+        method = f"scrypt:{n}:{SCRYPT_R}:{SCRYPT_P}"
+        ms = time_method(method, samples)
+        rows.append({'algorithm': 'scrypt', 'method': method, 'median_ms': round(ms, 2)})
+        if ms > target_ms * 2:
+            break  # each step doubles the cost; no point going further
+    return rows
+
+
+def pbkdf2_candidates(target_ms, samples):
+    probe_ms = time_method(f"pbkdf2:sha256:{PBKDF2_PROBE}", samples)
+    # Cost is linear in iterations: try the extrapolated count and steps around it
+    fitted = target_ms / probe_ms * PBKDF2_PROBE
+    rows = [{'algorithm': 'pbkdf2', 'method': f"pbkdf2:sha256:{PBKDF2_PROBE}", 'median_ms': round(probe_ms, 2)}]
+    for factor in (0.5, 0.8, 0.95, 1.1):
+        iterations = max(10_000, int(fitted * factor) // 10_000 * 10_000)
+        method = f"pbkdf2:sha256:{iterations}"
+        rows.append({'algorithm': 'pbkdf2', 'method': method, 'median_ms': round(time_method(method, samples), 2)})
+    return rows
+
+
+def _check(stored):
+    return check_password_hash(stored, PASSWORD)
+
+
+def throughput(method, workers, seconds=3.0):
+    """Password checks per second with one process per worker"""
+    stored = generate_password_hash(PASSWORD, method=method)
+    batch = [stored] * workers * 2
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_check, batch[:workers]))  # start the workers before timing
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            done += sum(1 for _ in pool.map(_check, batch))
+        elapsed = time.perf_counter() - started
+    return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target-ms', type=float, default=250, help='Latency budget of one password check.')
+    parser.add_argument('--algorithms', nargs='+', choices=('scrypt', 'pbkdf2'), default=['scrypt', 'pbkdf2'])
+    parser.add_argument('--samples', type=int, default=5, help='Timed checks per candidate.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes for the throughput run.')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/password-hash-<timestamp>.json).')
+    args = parser.parse_args()
+
+    rows = []
+    if 'scrypt' in args.algorithms:
+        rows += scrypt_candidates(args.target_ms, args.samples)
+    if 'pbkdf2' in args.algorithms:
+        rows += pbkdf2_candidates(args.target_ms, args.samples)
+
+    current = canonical_method(hash_method())
+    if current not in {row['method'] for row in rows}:
+        rows.append({'algorithm': current.split(':')[0], 'method': current,
+                     'median_ms': round(time_method(current, args.samples), 2)})
+
+    # Strongest = slowest under the target (for scrypt also the most memory)
+    chosen = {}
+    for row in rows:
+        best = chosen.get(row['algorithm'])
+        if row['median_ms'] <= args.target_ms and (best is None or row['median_ms'] > best['median_ms']):
+            chosen[row['algorithm']] = row
+
+    for row in chosen.values():
+        row['selected'] = True
+        row['checks_per_second'] = round(throughput(row['method'], args.workers), 1)
+
+    print(f"Target {args.target_ms:.0f} ms per check, {args.workers} worker(s)\n")
+    print(f"{'method':<28} {'median ms':>9} {'memory MB':>9} {'checks/s':>9}")
+    for row in sorted(rows, key=lambda row: (row['algorithm'], row['median_ms'])):
+        marks = ('  <- selected' if row.get('selected') else '') + ('  (current)' if row['method'] == current else '')
+        checks = f"{row['checks_per_second']:>9.1f}" if 'checks_per_second' in row else f"{'':>9}"
+        print(f"{row['method']:<28} {row['median_ms']:>9.1f} {memory_mb(row['method']):>9.1f} {checks}{marks}")
+
+    # scrypt is memory-hard, so it wins whenever one fits the budget
+    recommended = chosen.get('scrypt') or chosen.get('pbkdf2')
+    if recommended:
+        print(f"\nPASSWORD_HASH_METHOD={recommended['method']}")
+        if recommended['method'] != current:
+            print("Existing users are rehashed with it at their next login.")
+    else:
+        print(f"\n✗ No candidate checks within {args.target_ms:.0f} ms on this host.")
+
+    output = {
+        'benchmark': 'password-hash',
+        'environment': environment(),
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'current': current,
+        'recommended': recommended['method'] if recommended else None,
+        'results': rows,
+    }
+    print(f"\n✓ Saved {save_results(output, args.output, 'password-hash')}")
+
+
+if __name__ == '__main__':
+    main()
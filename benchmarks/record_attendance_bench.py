@@ -0,0 +1,123 @@
+"""Benchmark: record_attendance per-student loop vs bulk upsert
+
+Run from the project root:
+    python benchmarks/record_attendance_bench.py
+
+Prints query count and latency for class sizes of 30, 300 and 3000,
+for a first submission (all inserts) and a re-submission (all updates).
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord
+from attendance import record_attendance_bulk
+
+CLASS_SIZES = (30, 300, 3000)
+
+
+def legacy_record(course_id, attendance_date, statuses, recorded_by):
+    """The original route logic: one SELECT per student"""
+    for student_id, status in statuses.items():
+        existing_record = AttendanceRecord.query.filter_by(
+            course_id=course_id,
+            student_id=student_id,
+            date=attendance_date
+        ).first()
+
+        if existing_record:
+            existing_record.status = status
+        else:
+            db.session.add(AttendanceRecord(
+                course_id=course_id,
+                student_id=student_id,
+                date=attendance_date,
+                status=status,
+                recorded_by=recorded_by
+            ))
+
+
+def seed(size):
+    educator = User(first_name='Bench', last_name='Educator', username='bench_edu',
+                    email='bench_edu@example.com', contact_number='09000000000',
+                    password='x', role='educator')
+    db.session.add(educator)
+    db.session.flush()
+
+    course = Course(course_name='Benchmark', course_code='BENCH', block_section='B1',
+                    educator_id=educator.id, enrollment_code='BENCH001')
+    db.session.add(course)
+    db.session.flush()
+
+    db.session.execute(User.__table__.insert(), [
+        {'first_name': 'Student', 'last_name': str(i), 'username': f'bench_s{i}',
+         'email': f'bench_s{i}@example.com', 'contact_number': '09000000000',
+         'password': 'x', 'role': 'student'}
+        for i in range(size)
+    ])
+    student_ids = [student_id for (student_id,) in db.session.query(User.id).filter_by(role='student').all()]
+    db.session.execute(Enrollment.__table__.insert(), [
+        {'student_id': student_id, 'course_id': course.id} for student_id in student_ids
+    ])
+    db.session.commit()
+    return educator.id, course.id, student_ids
+
+
+def measure(fn, *args):
+    counter = {'queries': 0}
+
+    def count(*_):
+        counter['queries'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    started = time.perf_counter()
+    try:
+        fn(*args)
+        db.session.commit()
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return counter['queries'], (time.perf_counter() - started) * 1000
+
+
+def run(size, writer):
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_app = Flask(__name__)
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            educator_id, course_id, student_ids = seed(size)
+            today = date.today()
+
+            first = {student_id: 'present' for student_id in student_ids}
+            second = {student_id: 'late' for student_id in student_ids}
+
+            results = [
+                measure(writer, course_id, today, first, educator_id),
+                measure(writer, course_id, today, second, educator_id),
+            ]
+            db.session.remove()
+            db.engine.dispose()
+        return results
+
+
+def main():
+    print(f"{'students':>8}  {'writer':<7}  {'insert q':>8}  {'insert ms':>9}  {'update q':>8}  {'update ms':>9}")
+    for size in CLASS_SIZES:
+        for name, writer in (('loop', legacy_record), ('bulk', record_attendance_bulk)):
+            (insert_q, insert_ms), (update_q, update_ms) = run(size, writer)
+            print(f"{size:>8}  {name:<7}  {insert_q:>8}  {insert_ms:>9.1f}  {update_q:>8}  {update_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
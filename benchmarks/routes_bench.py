@@ -0,0 +1,167 @@
+"""Benchmark: every route under every role through the Flask test client
+
+Run from the project root:
+    python benchmarks/routes_bench.py [--scales 1 10 100] [--repeat 20] [--compare results/old.json]
+
+Each scale runs in its own process on a fresh SQLite database holding the
+initialize_database sample data times the scale (see harness.py). For every
+route, method and role it reports the cold (first) request, p50/p95 of the
+next --repeat requests, SQL queries per request and peak RSS while the
+endpoint ran. Results are saved as JSON under benchmarks/results/ so runs
+can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from harness import (ROLES, ROUTE_CONTEXT, load_app, prepare, route_cases, login, percentile,
+                     reset_peak_rss, peak_rss_kb, environment, save_results, compare)
+
+
+def run_scale(scale, repeat, roles, include_writes):
+    """Measure every case at one scale (call once per process)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(tmp)
+        build_seconds = prepare(app, scale)
+
+        from flask import url_for
+        from sqlalchemy import event
+        from database import db
+
+        # Count only the request thread; report and preview workers run queries of their own
+        main_thread = threading.get_ident()
+        queries = [0]
+
+        def count_query(*args):
+            if threading.get_ident() == main_thread:
+                queries[0] += 1
+
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count_query)
+
+        clients = {}
+        for role in roles:
+            clients[role] = app.test_client()
+            login(clients[role], role)
+
+        results = []
+        for case in route_cases(app, roles, include_writes):
+            latencies, query_counts, statuses, sizes = [], [], Counter(), []
+            cold_ms = 0
+            reset_peak_rss()
+
+            for n in range(repeat + 1):
+                with app.app_context():
+                    spec = case.setup(ROUTE_CONTEXT, n)
+                with app.test_request_context():
+                    url = url_for(case.endpoint, **spec.get('path', {}), **case.query)
+
+                client = clients[case.role]
+                if case.fresh_client:
+                    client = app.test_client()
+                    login(client, case.role)
+
+                queries[0] = 0
+                started = time.perf_counter()
+                response = client.open(url, method=case.method, data=spec.get('data'),
+                                       json=spec.get('json'), headers=spec.get('headers'))
+                body = response.get_data()
+                response.close()
+                elapsed = (time.perf_counter() - started) * 1000
+
+                if n == 0:
+                    cold_ms = elapsed
+                    continue
+                latencies.append(elapsed)
+                query_counts.append(queries[0])
+                statuses[response.status_code] += 1
+                sizes.append(len(body))
+
+            results.append({
+                'scale': scale,
+                'name': case.name,
+                'endpoint': case.endpoint,
+                'rule': case.rule,
+                'method': case.method,
+                'role': case.role,
+                'requests': len(latencies),
+                'status': {str(code): count for code, count in sorted(statuses.items())},
+                'cold_ms': round(cold_ms, 2),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'mean_ms': round(statistics.mean(latencies), 2),
+                'queries_p50': percentile(query_counts, 0.50),
+                'queries_max': max(query_counts),
+                'peak_rss_kb': peak_rss_kb(),
+                'response_bytes': int(statistics.mean(sizes)),
+            })
+
+        with app.app_context():
+            db.engine.dispose()
+
+    return {'scale': scale, 'build_seconds': round(build_seconds, 2), 'results': results}
+
+
+def print_results(scale_run):
+    print(f"\n{scale_run['scale']}x dataset (built in {scale_run['build_seconds']:.1f}s)")
+    print(f"{'endpoint':<58} {'status':>8} {'cold':>7} {'p50 ms':>7} {'p95 ms':>7} {'queries':>7} {'RSS MB':>7}")
+    for row in scale_run['results']:
+        status = ','.join(row['status'])
+        print(f"{row['name']:<58} {status:>8} {row['cold_ms']:>7.1f} {row['p50_ms']:>7.1f} "
+              f"{row['p95_ms']:>7.1f} {row['queries_p50']:>7} {row['peak_rss_kb'] / 1024:>7.1f}")
+
+    errors = [row['name'] for row in scale_run['results'] if any(code.startswith('5') for code in row['status'])]
+    if errors:
+        print(f"✗ Server errors in: {', '.join(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=20, help='Measured requests per case (after one cold request).')
+    parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+    parser.add_argument('--no-writes', action='store_true', help='Only drive GET routes.')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/routes-<timestamp>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # One scale per process: fresh caches, fresh app import and a clean RSS baseline
+        json.dump(run_scale(args.child, args.repeat, args.roles, not args.no_writes), sys.stdout)
+        return
+
+    runs = []
+    for scale in args.scales:
+        command = [sys.executable, os.path.abspath(__file__), '--child', str(scale),
+                   '--repeat', str(args.repeat), '--roles', *args.roles]
+        if args.no_writes:
+            command.append('--no-writes')
+        # The app prints while it imports; the run is the last line
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        scale_run = json.loads(output.strip().splitlines()[-1])
+        print_results(scale_run)
+        runs.append(scale_run)
+
+    results = {
+        'benchmark': 'routes',
+        'environment': environment(),
+        'repeat': args.repeat,
+        'builds': {str(run['scale']): run['build_seconds'] for run in runs},
+        'results': [row for run in runs for row in run['results']],
+    }
+    print(f"\n✓ Saved {save_results(results, args.output, 'routes')}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
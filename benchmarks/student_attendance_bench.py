@@ -0,0 +1,133 @@
+"""Benchmark: per-student attendance analytics, ORM rows vs int8 matrix
+
+Run from the project root:
+    python benchmarks/student_attendance_bench.py
+
+Builds courses of 50x40, 500x150 and 1000x200 students x sessions and
+times the at-risk figures computed by iterating ORM records per student
+against analytics.student_attendance_report, checking both agree.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord
+from analytics import student_attendance_report, SCORE_HALF_LIFE
+
+SIZES = ((50, 40), (500, 150), (1000, 200))
+
+
+def seed(students, sessions):
+    rng = random.Random(students * sessions)
+    educator = User(first_name='Bench', last_name='Educator', username='bench_edu',
+                    email='bench_edu@example.com', contact_number='09000000000',
+                    password='x', role='educator')
+    db.session.add(educator)
+    db.session.flush()
+
+    course = Course(course_name='Benchmark', course_code='BENCH', block_section='B1',
+                    educator_id=educator.id, enrollment_code='BENCH001')
+    db.session.add(course)
+    db.session.flush()
+
+    db.session.execute(User.__table__.insert(), [
+        {'first_name': 'Student', 'last_name': str(i), 'username': f'bench_s{i}',
+         'email': f'bench_s{i}@example.com', 'contact_number': '09000000000',
+         'password': 'x', 'role': 'student'}
+        for i in range(students)
+    ])
+    student_ids = [student_id for (student_id,) in db.session.query(User.id).filter_by(role='student').all()]
+    db.session.execute(Enrollment.__table__.insert(), [
+        {'student_id': student_id, 'course_id': course.id} for student_id in student_ids
+    ])
+
+    first_day = date.today() - timedelta(days=sessions)
+    for n in range(sessions):
+        db.session.execute(AttendanceRecord.__table__.insert(), [
+            {'course_id': course.id, 'student_id': student_id, 'date': first_day + timedelta(days=n),
+             'status': rng.choices(['present', 'absent', 'late', 'excused'], weights=[70, 10, 15, 5])[0],
+             'recorded_by': educator.id}
+            for student_id in student_ids
+        ])
+    db.session.commit()
+    return course.id
+
+
+def orm_report(course_id):
+    """The straightforward version: ORM records per student, Python loops"""
+    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+    dates = sorted({d for (d,) in db.session.query(AttendanceRecord.date).filter_by(course_id=course_id).distinct()})
+    results = {}
+    for enrollment in enrollments:
+        records = {record.date: record.status for record in
+                   AttendanceRecord.query.filter_by(course_id=course_id, student_id=enrollment.student_id)}
+        attended = absent = 0
+        run = longest = 0
+        weighted = total = 0.0
+        for j, day in enumerate(dates):
+            status = records.get(day)
+            attended += status in ('present', 'late')
+            absent += status == 'absent'
+            run = run + 1 if status == 'absent' else 0
+            longest = max(longest, run)
+            if status in ('present', 'late', 'absent'):
+                weight = 0.5 ** ((len(dates) - 1 - j) / SCORE_HALF_LIFE)
+                weighted += weight * {'present': 1.0, 'late': 0.5, 'absent': 0.0}[status]
+                total += weight
+        results[enrollment.student_id] = (
+            attended / (attended + absent) if attended + absent else None,
+            longest,
+            weighted / total if total else None,
+        )
+    return results
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(students, sessions):
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_app = Flask(__name__)
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            course_id = seed(students, sessions)
+
+            orm, orm_ms = timed(orm_report, course_id)
+            db.session.expunge_all()
+            (rows, _), matrix_ms = timed(student_attendance_report, course_id)
+
+            for row in rows:
+                rate, longest, score = orm[row['student_id']]
+                assert row['longest_absence_streak'] == longest
+                assert abs((row['rate'] or 0) - (rate or 0)) < 1e-9
+                assert abs((row['score'] or 0) - (score or 0)) < 1e-9
+
+            at_risk = sum(1 for row in rows if row['reasons'])
+            db.session.remove()
+            db.engine.dispose()
+        return orm_ms, matrix_ms, at_risk
+
+
+def main():
+    print(f"{'students':>8}  {'sessions':>8}  {'orm ms':>9}  {'matrix ms':>9}  {'at risk':>7}")
+    for students, sessions in SIZES:
+        orm_ms, matrix_ms, at_risk = run(students, sessions)
+        print(f"{students:>8}  {sessions:>8}  {orm_ms:>9.1f}  {matrix_ms:>9.1f}  {at_risk:>7}")
+
+
+if __name__ == '__main__':
+    main()
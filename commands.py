@@ -0,0 +1,303 @@
+import click
+import os
+from datetime import date
+from sqlalchemy import inspect, select, func
+from app import app
+from database import db
+from models import User, Course, LessonPlan, LearningMaterial, Enrollment, AttendanceRecord, ContactMessage, MaterialPreview
+
+
+# ==========================================
+# INDEX MIGRATION / VERIFY
+# ==========================================
+
+def missing_indexes():
+    """Return [(table, index)] for model indexes not present in the database"""
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                missing.append((table, index))
+    return missing
+
+
+def main_route_queries():
+    """The main query of each list/detail route, with representative parameters"""
+    # A quick check for existing databases; tests/test_query_plans.py checks
+    # every statement the routes actually run
+    today = date.today()
+    return {
+        'student_home': select(Enrollment).where(Enrollment.student_id == 1),
+        'educator_courses': select(Course).where(Course.educator_id == 1),
+        'manage_enrollments': select(Enrollment).where(Enrollment.course_id == 1),
+        'course_lesson_plans': select(LessonPlan).where(LessonPlan.course_id == 1),
+        'student_course_lessons': select(LessonPlan).where(LessonPlan.course_id == 1)
+        .order_by(LessonPlan.created_at.desc()),
+        'lesson_plan_materials': select(LearningMaterial).where(LearningMaterial.lesson_plan_id == 1),
+        'course_attendance': select(AttendanceRecord).where(AttendanceRecord.course_id == 1,
+                                                            AttendanceRecord.date == today),
+        'attendance_history': select(AttendanceRecord.date).where(AttendanceRecord.course_id == 1)
+        .distinct().order_by(AttendanceRecord.date.desc()),
+        'admin_home_students': select(func.count(User.id)).where(User.role == 'student'),
+        'admin_messages_unread': select(func.count(ContactMessage.id)).where(ContactMessage.is_read == False),
+    }
+
+
+def full_scans():
+    """Return {route: plan} for main route queries that scan a whole table (SQLite only)"""
+    scans = {}
+    for route, stmt in main_route_queries().items():
+        sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+        plan = [row[-1] for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()]
+        # "SCAN <table>" without an index means every row is read
+        if any(step.startswith('SCAN ') and ' INDEX ' not in step for step in plan):
+            scans[route] = plan
+    return scans
+
+
+@app.cli.command('indexes')
+@click.option('--verify', is_flag=True, help='Only report missing indexes and full table scans.')
+def indexes_command(verify):
+    """Create missing model indexes on an existing database."""
+    missing = missing_indexes()
+
+    for table, index in missing:
+        if verify:
+            click.echo(f"✗ Missing {index.name} on {table.name}")
+        else:
+            index.create(db.engine, checkfirst=True)
+            click.echo(f"✓ Created {index.name} on {table.name}")
+
+    if not missing:
+        click.echo("✓ All indexes present.")
+
+    scans = {}
+    if db.engine.dialect.name == 'sqlite':
+        scans = full_scans()
+        for route, plan in scans.items():
+            click.echo(f"✗ Full table scan in {route}: {'; '.join(plan)}")
+        if not scans:
+            click.echo("✓ No full table scans in route queries.")
+
+    if verify and (missing or scans):
+        raise SystemExit(1)
+
+
+# ==========================================
+# MATERIAL STORAGE MIGRATION
+# ==========================================
+
+@app.cli.command('materials')
+def materials_command():
+    """Move legacy uploads into the content-addressed material store."""
+    from materials import store_material, stored_hash
+
+    legacy = [material for material in LearningMaterial.query.all() if not stored_hash(material.filepath)]
+    old_paths = set()
+    moved = 0
+
+    for material in legacy:
+        if not os.path.isfile(material.filepath):
+            click.echo(f"✗ Missing file for material {material.id}: {material.filepath}")
+            continue
+        with open(material.filepath, 'rb') as f:
+            new_path = store_material(f, material.filename)
+        old_paths.add(material.filepath)
+        material.filepath = new_path
+        moved += 1
+
+    db.session.commit()
+
+    # Old copies are no longer referenced by any material
+    for path in old_paths:
+        os.remove(path)
+
+    stored = db.session.query(func.count(func.distinct(LearningMaterial.filepath))).scalar()
+    click.echo(f"✓ Moved {moved} materials; {stored} distinct files in the store.")
+
+
+# ==========================================
+# MATERIAL PREVIEWS BACKFILL
+# ==========================================
+
+@app.cli.command('previews')
+@click.option('--retry-failed', is_flag=True, help='Also rebuild previews that failed before.')
+def previews_command(retry_failed):
+    """Build missing thumbnails, page counts and text for stored materials."""
+    from previews import build_preview
+
+    done = select(MaterialPreview.filepath)
+    if retry_failed:
+        done = done.where(MaterialPreview.status != 'failed')
+    filepaths = db.session.scalars(
+        select(LearningMaterial.filepath).distinct().where(LearningMaterial.filepath.not_in(done))
+    ).all()
+
+    for filepath in filepaths:
+        if not db.session.scalar(select(MaterialPreview.id).where(MaterialPreview.filepath == filepath)):
+            db.session.add(MaterialPreview(filepath=filepath))
+            db.session.commit()
+        build_preview(filepath)
+        preview = MaterialPreview.query.filter_by(filepath=filepath).one()
+        mark = '✓' if preview.status == 'ready' else '✗'
+        click.echo(f"{mark} {filepath}: {preview.page_count or '-'} pages{', thumbnail' if preview.has_thumbnail else ''}")
+
+    click.echo(f"✓ Processed {len(filepaths)} files.")
+
+
+# ==========================================
+# SEARCH INDEX REBUILD
+# ==========================================
+
+@app.cli.command('search-index')
+def search_index_command():
+    """Rebuild the full-text search index from lesson plans and materials."""
+    from search import rebuild_search_index
+
+    plans, materials = rebuild_search_index()
+    click.echo(f"✓ Indexed {plans} lesson plans and {materials} materials.")
+
+
+# ==========================================
+# DAILY SUMMARY (ADMIN STATISTICS)
+# ==========================================
+
+@app.cli.command('stats')
+@click.option('--rebuild', is_flag=True, help='Recompute the daily summary table from scratch.')
+def stats_command(rebuild):
+    """Show the admin dashboard totals (and rebuild the daily summary)."""
+    from stats import rebuild_daily_summary, summary_totals, live_totals, BUILT_METRIC
+
+    if rebuild:
+        rows = rebuild_daily_summary()
+        click.echo(f"✓ Daily summary rebuilt ({rows} rows).")
+
+    totals = summary_totals()
+    if not totals.get(BUILT_METRIC):
+        click.echo("Daily summary not built yet - run: flask stats --rebuild")
+        return
+
+    live = live_totals()
+    for metric in sorted(totals):
+        if metric == BUILT_METRIC:
+            continue
+        drift = '' if metric not in live or live[metric] == totals[metric] else f"  (live: {live[metric]})"
+        click.echo(f"  {metric:<22} {totals[metric]}{drift}")
+
+
+@app.cli.command('attendance-totals')
+@click.option('--rebuild', is_flag=True, help='Recompute the per-enrollment totals from the attendance records.')
+def attendance_totals_command(rebuild):
+    """Check (and rebuild) the per-enrollment attendance totals."""
+    from attendance import rebuild_enrollment_attendance, enrollment_attendance_drift
+
+    if rebuild:
+        rows = rebuild_enrollment_attendance()
+        click.echo(f"✓ Attendance totals rebuilt ({rows} rows).")
+
+    drift = enrollment_attendance_drift()
+    for student_id, course_id in drift[:20]:
+        click.echo(f"✗ Totals differ for student {student_id} in course {course_id}")
+    if len(drift) > 20:
+        click.echo(f"  ... and {len(drift) - 20} more")
+
+    if drift:
+        click.echo("Run: flask attendance-totals --rebuild")
+    else:
+        click.echo("✓ Attendance totals match the records.")
+
+
+# ==========================================
+# BULK ACCOUNT PROVISIONING
+# ==========================================
+
+@app.cli.command('provision')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--role', type=click.Choice(['student', 'educator']), default='student', show_default=True,
+              help='Role for rows without a role column.')
+@click.option('--workers', type=int, default=None, help='Password hashing processes (default: one per CPU).')
+@click.option('--batch-size', type=int, default=None, help='Rows per INSERT batch.')
+@click.option('--dry-run', is_flag=True, help='Only validate and check uniqueness; create nothing.')
+def provision_command(csv_file, role, workers, batch_size, dry_run):
+    """Create the accounts listed in a CSV (one per row, with per-row errors)."""
+    import time
+    from provisioning import (ProvisioningError, read_accounts, provision_accounts, provisioning_counts,
+                              PROVISION_BATCH_SIZE, FAILED)
+    from seed import HASH_WORKERS
+
+    try:
+        rows = read_accounts(csv_file.read())
+    except ProvisioningError as e:
+        raise click.ClickException(str(e))
+
+    db.create_all()
+    started = time.perf_counter()
+    report = provision_accounts(rows, role=role, workers=workers or HASH_WORKERS,
+                                batch_size=batch_size or PROVISION_BATCH_SIZE, dry_run=dry_run)
+    elapsed = time.perf_counter() - started
+
+    for row in report:
+        if row['outcome'] == FAILED:
+            click.echo(f"✗ line {row['line']} {row['username'] or '-'}: {'; '.join(row['errors'])}")
+
+    counts = provisioning_counts(report)
+    summary = ', '.join(f"{count} {outcome}" for outcome, count in counts.items())
+    click.echo(f"✓ {len(report)} rows in {elapsed:.1f}s: {summary}")
+
+
+# ==========================================
+# PASSWORD HASHING POLICY
+# ==========================================
+
+@app.cli.command('passwords')
+def passwords_command():
+    """Show the hashing policy and how many users still have hashes made with other parameters."""
+    from collections import Counter
+    from passwords import hash_method, method_of
+
+    current = hash_method()
+    methods = Counter(
+        method_of(password_hash)
+        for password_hash in db.session.scalars(select(User.password).execution_options(yield_per=1000))
+    )
+
+    click.echo(f"Policy: {current}")
+    for method, users in methods.most_common():
+        marker = '✓' if method == current else '✗'
+        click.echo(f"{marker} {method:<28} {users} users")
+
+    outdated = sum(users for method, users in methods.items() if method != current)
+    if outdated:
+        click.echo(f"{outdated} users are rehashed with the policy at their next login.")
+
+
+# ==========================================
+# BULK SEED (LOAD-TEST DATA)
+# ==========================================
+
+@app.cli.command('seed')
+@click.option('--students', default=1000, show_default=True, help='Students to create.')
+@click.option('--courses', default=50, show_default=True, help='Courses to create.')
+@click.option('--days', default=60, show_default=True, help='Days of attendance per enrollment.')
+@click.option('--educators', type=int, help='Educators to create (default: one per 3 courses).')
+@click.option('--per-student', default=5, show_default=True, help='Courses each student is enrolled in.')
+@click.option('--workers', type=int, help='Password hashing processes (default: CPU count).')
+@click.option('--password', help='One password for every seeded user (hashed once).')
+def seed_command(students, courses, days, educators, per_student, workers, password):
+    """Bulk-load a synthetic dataset for load testing."""
+    import time
+    from seed import seed, HASH_WORKERS
+
+    db.create_all()
+    started = time.perf_counter()
+    counts = seed(students, courses, days, educators=educators, courses_per_student=per_student,
+                  workers=workers or HASH_WORKERS, password=password, echo=click.echo)
+    elapsed = time.perf_counter() - started
+
+    for table, rows in counts.items():
+        click.echo(f"✓ {rows} {table}")
+    click.echo(f"✓ Seeded in {elapsed:.1f}s.")
@@ -1,4 +1,71 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+import os
 
 db = SQLAlchemy()
 
+
+# ==========================================
+# DATABASE PROFILES
+# ==========================================
+# DATABASE_URL selects the database (defaults to SQLite in the instance folder).
+# PLANIFY_DB_PROFILE selects the SQLite tuning profile:
+#   production - WAL, synchronous=NORMAL, mmap, larger cache, busy timeout (default)
+#   legacy     - SQLite defaults (rollback journal, synchronous=FULL)
+# For PostgreSQL, DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT size the pool.
+
+SQLITE_PROFILES = {
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # negative = KiB, so 64 MB
+        'busy_timeout': 5000,  # ms to wait on a locked database
+    },
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+    },
+}
+
+DEFAULT_SQLITE_PROFILE = 'production'
+
+
+def configure_database(app, profile=None):
+    """Set SQLALCHEMY_DATABASE_URI and engine options from the environment"""
+    uri = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(app.instance_path, 'planify.db')}"
+
+    # Heroku-style URLs use the old postgres:// scheme
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+
+    if uri.startswith('sqlite'):
+        profile = profile or os.environ.get('PLANIFY_DB_PROFILE', DEFAULT_SQLITE_PROFILE)
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown SQLite profile '{profile}', choose from {', '.join(SQLITE_PROFILES)}")
+        app.config['SQLITE_PRAGMAS'] = SQLITE_PROFILES[profile]
+    else:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'pool_pre_ping': True,
+        }
+
+
+def init_sqlite_pragmas(app):
+    """Apply the SQLite profile to every new connection (call after db.init_app)"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', apply_pragmas)
@@ -77,4 +77,53 @@ CREATE TABLE contact_message (
     message TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_read BOOLEAN DEFAULT FALSE
-);
\ No newline at end of file
+);
+
+CREATE TABLE material_preview (
+    id SERIAL PRIMARY KEY,
+    filepath VARCHAR(500) NOT NULL UNIQUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    page_count INTEGER,
+    excerpt TEXT,
+    has_thumbnail BOOLEAN DEFAULT FALSE,
+    error VARCHAR(255),
+    processed_at TIMESTAMP
+);
+
+CREATE TABLE daily_summary (
+    day DATE NOT NULL,
+    metric VARCHAR(40) NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, metric)
+);
+
+CREATE TABLE enrollment_attendance (
+    student_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    excused INTEGER NOT NULL DEFAULT 0,
+    last_seen DATE,
+    PRIMARY KEY (student_id, course_id),
+    FOREIGN KEY (student_id) REFERENCES "user"(id) ON DELETE CASCADE,
+    FOREIGN KEY (course_id) REFERENCES course(id) ON DELETE CASCADE
+);
+
+
+-- INDEXES
+-- Keep in sync with the db.Index entries in models.py
+-- (apply to an existing database with: flask indexes)
+
+CREATE INDEX ix_user_role ON "user" (role);
+CREATE INDEX ix_course_educator_id ON course (educator_id);
+CREATE INDEX ix_lesson_plan_course_id ON lesson_plan (course_id, created_at);
+CREATE INDEX ix_lesson_plan_educator_id ON lesson_plan (educator_id);
+CREATE INDEX ix_learning_material_lesson_plan_id ON learning_material (lesson_plan_id);
+CREATE INDEX ix_learning_material_filepath ON learning_material (filepath);
+CREATE INDEX ix_enrollment_course_id ON enrollment (course_id);
+CREATE INDEX ix_attendance_record_course_date ON attendance_record (course_id, date);
+CREATE INDEX ix_attendance_record_recorded_by ON attendance_record (recorded_by);
+CREATE INDEX ix_contact_message_created_at ON contact_message (created_at);
+CREATE INDEX ix_contact_message_is_read_created_at ON contact_message (is_read, created_at);
+CREATE INDEX ix_enrollment_attendance_course_id ON enrollment_attendance (course_id);
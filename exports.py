@@ -0,0 +1,211 @@
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord
+from sqlalchemy import select
+from io import StringIO
+import csv
+import importlib.util
+import os
+import tempfile
+
+# ==========================================
+# TERM ATTENDANCE EXPORTS
+# ==========================================
+# Walks AttendanceRecord for one or more courses with a server-side cursor
+# (yield_per). CSV rows are written out as they are read, so the response
+# starts before the whole term has been fetched; XLSX rows are flushed to a
+# temp file by openpyxl's write-only mode. The PDF is laid out by reportlab
+# in one pass, so its tables are held in memory until the file is written.
+# XLSX and PDF need openpyxl and reportlab; without them only CSV is offered.
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'pdf', 'xlsx')
+EXPORT_LIBRARIES = {'pdf': 'reportlab', 'xlsx': 'openpyxl'}
+CSV_HEADER = ['Course Code', 'Block', 'Date', 'Last Name', 'First Name', 'Email', 'Status', 'Recorded At']
+
+
+def available_export_formats():
+    """EXPORT_FORMATS whose library is installed"""
+    return [export_format for export_format in EXPORT_FORMATS
+            if export_format not in EXPORT_LIBRARIES or importlib.util.find_spec(EXPORT_LIBRARIES[export_format])]
+
+
+def attendance_rows(course_ids, start_date=None, end_date=None):
+    """Yield attendance rows for the courses, ordered by course, date and student name"""
+    stmt = select(
+        Course.id,
+        Course.course_code,
+        Course.block_section,
+        AttendanceRecord.date,
+        User.last_name,
+        User.first_name,
+        User.email,
+        AttendanceRecord.status,
+        AttendanceRecord.recorded_at
+    ).join(
+        Course, AttendanceRecord.course_id == Course.id
+    ).join(
+        User, AttendanceRecord.student_id == User.id
+    ).where(
+        AttendanceRecord.course_id.in_(course_ids)
+    )
+
+    if start_date:
+        stmt = stmt.where(AttendanceRecord.date >= start_date)
+    if end_date:
+        stmt = stmt.where(AttendanceRecord.date <= end_date)
+
+    stmt = stmt.order_by(
+        Course.course_code, Course.id, AttendanceRecord.date, User.last_name, User.first_name
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    yield from db.session.execute(stmt)
+
+
+def stream_csv(course_ids, start_date=None, end_date=None):
+    """Yield the CSV export in chunks of EXPORT_BATCH_SIZE rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    for count, row in enumerate(attendance_rows(course_ids, start_date, end_date), 1):
+        writer.writerow([
+            row.course_code,
+            row.block_section,
+            row.date.isoformat(),
+            row.last_name,
+            row.first_name,
+            row.email,
+            row.status,
+            row.recorded_at.strftime('%Y-%m-%d %H:%M') if row.recorded_at else ''
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def stream_file(path, chunk_size=64 * 1024):
+    """Yield a temporary export file in chunks and delete it afterwards"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def build_xlsx(course_ids, start_date=None, end_date=None):
+    """Write a students x dates matrix (one sheet per course) to a temp file and return its path"""
+    from openpyxl import Workbook
+
+    # Write-only mode flushes rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+
+    courses = Course.query.filter(Course.id.in_(course_ids)).order_by(Course.course_code, Course.id).all()
+    for course in courses:
+        dates_query = db.session.query(AttendanceRecord.date).filter(AttendanceRecord.course_id == course.id)
+        if start_date:
+            dates_query = dates_query.filter(AttendanceRecord.date >= start_date)
+        if end_date:
+            dates_query = dates_query.filter(AttendanceRecord.date <= end_date)
+        dates = [date_obj for (date_obj,) in dates_query.distinct().order_by(AttendanceRecord.date).all()]
+        columns = {date_obj: idx for idx, date_obj in enumerate(dates)}
+
+        sheet = workbook.create_sheet(title=f"{course.course_code} {course.block_section}"[:31])
+        sheet.append(['Last Name', 'First Name', 'Email'] + [date_obj.isoformat() for date_obj in dates])
+
+        # Every enrolled student, left-joined to their records, one student at a time
+        record_match = (AttendanceRecord.student_id == User.id) & (AttendanceRecord.course_id == course.id)
+        if start_date:
+            record_match &= AttendanceRecord.date >= start_date
+        if end_date:
+            record_match &= AttendanceRecord.date <= end_date
+
+        stmt = select(
+            User.id, User.last_name, User.first_name, User.email, AttendanceRecord.date, AttendanceRecord.status
+        ).join(
+            Enrollment, Enrollment.student_id == User.id
+        ).outerjoin(
+            AttendanceRecord, record_match
+        ).where(
+            Enrollment.course_id == course.id
+        ).order_by(
+            User.last_name, User.first_name, User.id
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        current_id, current_row = None, None
+        for row in db.session.execute(stmt):
+            if row.id != current_id:
+                if current_row:
+                    sheet.append(current_row)
+                current_id = row.id
+                current_row = [row.last_name, row.first_name, row.email] + [''] * len(dates)
+            if row.date in columns:
+                current_row[3 + columns[row.date]] = row.status
+        if current_row:
+            sheet.append(current_row)
+
+    if not courses:
+        workbook.create_sheet(title='Attendance')
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    workbook.save(path)
+    return path
+
+
+def build_pdf(course_ids, start_date=None, end_date=None):
+    """Write a multi-page PDF (one section per course and date) to a temp file and return its path"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+
+    doc = SimpleDocTemplate(path, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ])
+
+    elements = []
+    current_key, data = None, None
+
+    def flush_section():
+        if data:
+            table = Table(data, colWidths=[2.4 * inch, 2.6 * inch, 1.2 * inch], repeatRows=1)
+            table.setStyle(table_style)
+            elements.append(table)
+            elements.append(PageBreak())
+
+    for row in attendance_rows(course_ids, start_date, end_date):
+        key = (row.id, row.date)
+        if key != current_key:
+            flush_section()
+            current_key = key
+            elements.append(Paragraph(f"{row.course_code} - {row.block_section}", styles['Heading2']))
+            elements.append(Paragraph(row.date.strftime('%A, %B %d, %Y'), styles['Normal']))
+            elements.append(Spacer(1, 0.2 * inch))
+            data = [['Student Name', 'Email', 'Status']]
+        data.append([f"{row.first_name} {row.last_name}", row.email, row.status.capitalize()])
+    flush_section()
+
+    if not elements:
+        elements.append(Paragraph("No attendance records in this range.", styles['Normal']))
+
+    doc.build(elements)
+    return path
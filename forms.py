@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed, MultipleFileField
+from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
 from wtforms import StringField, PasswordField, SubmitField, TextAreaField, DateField, SelectField
 from wtforms.validators import DataRequired, Email, Length, Regexp, EqualTo, Optional
 
@@ -92,6 +92,20 @@ class EnrollByEmailForm(FlaskForm):
                                 validators=[DataRequired(), Email()])
     submit = SubmitField("Enroll Student")
 
+# FORM FOR IMPORTING A WHOLE ROSTER (EDUCATOR)
+class RosterImportForm(FlaskForm):
+    roster_file = FileField("CSV File", validators=[Optional(), FileAllowed(['csv', 'txt'], "CSV or text files only")])
+    emails = TextAreaField("Or Paste Emails", validators=[Optional()])
+    submit = SubmitField("Import Roster")
+
+# FORM FOR PROVISIONING ACCOUNTS FROM A CSV (ADMIN)
+class AccountImportForm(FlaskForm):
+    accounts_file = FileField("CSV File", validators=[FileRequired(), FileAllowed(['csv'], "CSV files only")])
+    role = SelectField("Default Role",
+                       choices=[("student", "Student"), ("educator", "Educator")],
+                       validators=[DataRequired()])
+    submit = SubmitField("Create Accounts")
+
 # FORM FOR STUDENTS TO JOIN COURSE BY CODE
 class JoinCourseForm(FlaskForm):
     enrollment_code = StringField("Course Code",
@@ -0,0 +1,209 @@
+from flask_login import current_user
+from markupsafe import Markup
+from models import User, Course, LessonPlan, Enrollment, ContactMessage
+from cache import TTLCache
+from sqlalchemy import event, select, inspect
+from sqlalchemy.orm import Session, object_session
+from threading import Lock
+
+# ==========================================
+# FRAGMENT CACHE
+# ==========================================
+# Dashboard sections are rendered once and reused until the data behind them
+# changes. In a template:
+#
+#   {% call fragment_cache('educator_home', 'educator:%d' % current_user.id) %}
+#       ...expensive markup...
+#   {% endcall %}
+#
+# The cache key is the fragment name, the user and the current version of
+# every scope listed. Writes to courses, enrollments, lesson plans, users and
+# contact messages bump the affected scopes (ORM hooks below), so the next
+# render misses.
+# Work the fragment needs should happen inside the block (lazy queries or
+# callables passed by the view), so a hit skips the queries too.
+#
+# Backends: in-process memory (default, one worker), Redis when
+# FRAGMENT_CACHE_URL is set, or any object with the same methods assigned to
+# app.config['FRAGMENT_CACHE_BACKEND'].
+
+FRAGMENT_TTL = 600  # seconds
+FRAGMENT_CACHE_SIZE = 5000
+SITE_SCOPE = 'site'
+
+
+def educator_scope(educator_id):
+    return f'educator:{educator_id}'
+
+
+class MemoryBackend:
+    """Fragments in an LRU+TTL cache, versions in a dict (per process)"""
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE, ttl=FRAGMENT_TTL):
+        self._fragments = TTLCache(maxsize, ttl)
+        self._versions = {}
+        self._lock = Lock()
+
+    def get(self, key):
+        return self._fragments.get(key)
+
+    def set(self, key, html):
+        self._fragments.set(key, html)
+
+    def versions(self, scopes):
+        with self._lock:
+            return [self._versions.get(scope, 0) for scope in scopes]
+
+    def bump(self, scopes):
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def clear(self):
+        self._fragments.clear()
+
+
+class RedisBackend:
+    """Fragments and versions shared by every worker through Redis"""
+
+    def __init__(self, url, ttl=FRAGMENT_TTL):
+        import redis
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            html = self._client.get('fragment:' + key)
+        except self._errors:
+            return None
+        return html.decode('utf-8') if html is not None else None
+
+    def set(self, key, html):
+        try:
+            self._client.set('fragment:' + key, html.encode('utf-8'), ex=self.ttl)
+        except self._errors:
+            pass
+
+    def versions(self, scopes):
+        try:
+            values = self._client.mget(['fragment-version:' + scope for scope in scopes]) if scopes else []
+        except self._errors:
+            return [None] * len(scopes)
+        return [int(value or 0) for value in values]
+
+    def bump(self, scopes):
+        try:
+            pipe = self._client.pipeline()
+            for scope in scopes:
+                pipe.incr('fragment-version:' + scope)
+            pipe.execute()
+        except self._errors:
+            pass
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter('fragment:*'))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            pass
+
+
+_backend = MemoryBackend()
+
+
+def init_fragment_cache(app):
+    """Pick the backend from the app config and expose fragment_cache to templates"""
+    global _backend
+    backend = app.config.get('FRAGMENT_CACHE_BACKEND')
+    if backend is None:
+        url = app.config.get('FRAGMENT_CACHE_URL')
+        backend = RedisBackend(url) if url else MemoryBackend()
+    _backend = backend
+    app.jinja_env.globals['fragment_cache'] = fragment_cache
+
+
+def fragment_cache(name, *scopes, caller):
+    """Jinja call block: render the body once per (user, scope versions)"""
+    versions = _backend.versions(scopes)
+    if None in versions:
+        # Backend unavailable: render without caching
+        return caller()
+
+    user_id = current_user.get_id() if current_user else None
+    key = ':'.join([name, str(user_id)] + [f'{scope}={version}' for scope, version in zip(scopes, versions)])
+    html = _backend.get(key)
+    if html is None:
+        html = str(caller())
+        _backend.set(key, html)
+    return Markup(html)
+
+
+def invalidate_fragments(*scopes):
+    """Bump scopes by hand, e.g. after Core bulk writes the ORM hooks don't see"""
+    if scopes:
+        _backend.bump(scopes)
+
+
+def scope_versions(*scopes):
+    """Current version of each scope (None for all while the backend is unavailable)"""
+    return _backend.versions(scopes)
+
+
+def clear_fragments():
+    _backend.clear()
+
+
+# ==========================================
+# INVALIDATION
+# ==========================================
+
+def _changed(target, scopes):
+    invalidate_fragments(*scopes)
+    object_session(target).info.setdefault('changed_fragments', set()).update(scopes)
+
+
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_update')
+@event.listens_for(Course, 'after_delete')
+def _course_changed(mapper, connection, target):
+    # A reassigned course leaves one dashboard and joins another
+    educator_ids = {target.educator_id} | set(inspect(target).attrs.educator_id.history.deleted or ())
+    _changed(target, [SITE_SCOPE] + [educator_scope(educator_id) for educator_id in educator_ids])
+
+
+@event.listens_for(LessonPlan, 'after_insert')
+@event.listens_for(LessonPlan, 'after_update')
+@event.listens_for(LessonPlan, 'after_delete')
+def _plan_changed(mapper, connection, target):
+    _changed(target, [educator_scope(target.educator_id)])
+
+
+@event.listens_for(Enrollment, 'after_insert')
+@event.listens_for(Enrollment, 'after_delete')
+def _enrollment_changed(mapper, connection, target):
+    educator_id = connection.scalar(select(Course.educator_id).where(Course.id == target.course_id))
+    if educator_id is not None:
+        _changed(target, [educator_scope(educator_id)])
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+@event.listens_for(ContactMessage, 'after_insert')
+@event.listens_for(ContactMessage, 'after_update')
+@event.listens_for(ContactMessage, 'after_delete')
+def _site_changed(mapper, connection, target):
+    _changed(target, [SITE_SCOPE])
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    # A request may have rendered the old data between flush and commit
+    invalidate_fragments(*db_session.info.pop('changed_fragments', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(db_session):
+    db_session.info.pop('changed_fragments', None)
@@ -0,0 +1,151 @@
+from flask import current_app, request, abort
+from database import db
+from models import LearningMaterial
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from werkzeug.utils import send_file
+import hashlib
+import os
+import re
+import tempfile
+
+# ==========================================
+# LEARNING MATERIAL STORAGE
+# ==========================================
+# Uploads are stored once per content under static/uploads/objects/<ab>/<sha256><ext>,
+# so the same file attached to several lesson plans shares one copy on disk.
+# A stored file is removed when the last LearningMaterial row pointing at it is deleted.
+#
+# Downloads use the SHA-256 as a strong ETag and support Range / 304 requests.
+# MATERIAL_SENDFILE hands the bytes to the reverse proxy instead:
+#   x-sendfile - Apache mod_xsendfile / lighttpd (X-Sendfile: <absolute path>)
+#   x-accel    - nginx (X-Accel-Redirect: MATERIAL_ACCEL_PREFIX + path under static/uploads),
+#                e.g. location /protected-uploads/ { internal; alias /srv/planify/static/uploads/; }
+
+UPLOAD_FOLDER = os.path.join('static', 'uploads')
+MATERIAL_STORE = os.path.join(UPLOAD_FOLDER, 'objects')
+STORE_CHUNK_SIZE = 1024 * 1024
+SENDFILE_MODES = ('x-sendfile', 'x-accel')
+
+_stored_name = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+
+def material_path(content_hash, extension=''):
+    return os.path.join(MATERIAL_STORE, content_hash[:2], content_hash + extension)
+
+
+def stored_hash(filepath):
+    """Return the SHA-256 of a content-addressed file, or None for legacy uploads"""
+    match = _stored_name.match(os.path.basename(filepath))
+    if match and os.path.dirname(os.path.dirname(os.path.normpath(filepath))) == os.path.normpath(MATERIAL_STORE):
+        return match.group(1)
+    return None
+
+
+def store_material(stream, filename):
+    """Copy a binary stream into the store and return its filepath"""
+    os.makedirs(MATERIAL_STORE, exist_ok=True)
+    digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=MATERIAL_STORE, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(STORE_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+
+        return adopt_material(tmp_path, filename, digest.hexdigest())
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def adopt_material(path, filename, content_hash):
+    """Move an already-hashed file into the store and return its filepath"""
+    stored_path = material_path(content_hash, os.path.splitext(filename)[1].lower())
+    os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+    try:
+        # Same content already stored: replacing it is harmless and atomic
+        os.replace(path, stored_path)
+    except OSError:
+        # Different filesystem: copy through a temp file in the store instead
+        with open(path, 'rb') as f:
+            stored_path = store_material(f, filename)
+        os.remove(path)
+    return stored_path
+
+
+# REMOVE FILES NO LONGER REFERENCED (AFTER COMMIT, SO ROLLBACKS KEEP THEM)
+@event.listens_for(LearningMaterial, 'after_delete')
+def _queue_release(mapper, connection, target):
+    object_session(target).info.setdefault('released_materials', set()).add(target.filepath)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_release(session):
+    session.info.pop('released_materials', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _release_materials(session):
+    paths = session.info.pop('released_materials', None)
+    if paths:
+        release_unused(paths)
+
+
+def release_unused(paths):
+    """Delete stored files that no LearningMaterial row points at"""
+    paths = set(paths)
+    with db.engine.connect() as connection:
+        still_used = set(connection.execute(
+            select(LearningMaterial.filepath).where(LearningMaterial.filepath.in_(paths))
+        ).scalars())
+
+    released = paths - still_used
+    for path in released:
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Derived thumbnails/text go with the file (imported here: previews imports this module)
+    from previews import discard_previews
+    discard_previews(released)
+
+
+def send_material(material):
+    """Download response for a material (ETag, Range, 304, optional proxy offload)"""
+    path = os.path.abspath(material.filepath)
+    if not os.path.isfile(path):
+        abort(404)
+
+    mode = current_app.config.get('MATERIAL_SENDFILE')
+    if mode not in SENDFILE_MODES:
+        mode = None
+
+    environ = request.environ
+    if mode:
+        # The proxy serves byte ranges itself from the original request
+        environ = dict(environ)
+        environ.pop('HTTP_RANGE', None)
+
+    response = send_file(
+        path,
+        environ,
+        as_attachment=True,
+        download_name=material.filename,
+        conditional=True,
+        etag=stored_hash(material.filepath) or True,
+        use_x_sendfile=bool(mode),
+        response_class=current_app.response_class
+    )
+    # Revalidate on every use: access depends on enrollment, so never share caches
+    response.cache_control.private = True
+    if not mode:
+        response.accept_ranges = 'bytes'
+
+    if mode == 'x-accel' and 'X-Sendfile' in response.headers:
+        relative = os.path.relpath(path, os.path.abspath(UPLOAD_FOLDER)).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = current_app.config['MATERIAL_ACCEL_PREFIX'] + relative
+        del response.headers['X-Sendfile']
+
+    return response
@@ -0,0 +1,177 @@
+from flask import g, has_request_context, has_app_context, current_app, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from threading import Lock
+import hmac
+import time
+
+# ==========================================
+# REQUEST METRICS
+# ==========================================
+# Per-endpoint query count, SQL time, template render time and response size.
+# Collected in-process from SQLAlchemy engine events and Flask request hooks,
+# shown on /admin/metrics and exported as Prometheus text on /metrics
+# (admins, or a scraper with the METRICS_TOKEN bearer token; the client
+# address is not trusted, behind a proxy every request comes from localhost).
+
+
+class EndpointStats:
+    """Running totals for one endpoint"""
+    __slots__ = ('requests', 'queries', 'sql_seconds', 'render_seconds', 'total_seconds',
+                 'max_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.response_bytes = 0
+
+    def average(self, field):
+        return getattr(self, field) / self.requests if self.requests else 0
+
+
+_stats = {}
+_stats_lock = Lock()
+
+
+def record_request(endpoint, queries, sql_seconds, render_seconds, total_seconds, response_bytes):
+    with _stats_lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = EndpointStats()
+        stats.requests += 1
+        stats.queries += queries
+        stats.sql_seconds += sql_seconds
+        stats.render_seconds += render_seconds
+        stats.total_seconds += total_seconds
+        stats.max_seconds = max(stats.max_seconds, total_seconds)
+        stats.response_bytes += response_bytes
+
+
+def snapshot():
+    """Return a sorted list of (endpoint, stats) copies"""
+    with _stats_lock:
+        items = []
+        for endpoint, stats in _stats.items():
+            copy = EndpointStats()
+            for field in EndpointStats.__slots__:
+                setattr(copy, field, getattr(stats, field))
+            items.append((endpoint, copy))
+    return sorted(items, key=lambda item: item[1].total_seconds, reverse=True)
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ==========================================
+# SQL TIMING
+# ==========================================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+    # Optional slow query log
+    if has_app_context():
+        threshold = current_app.config.get('SLOW_QUERY_MS')
+        if threshold is not None and elapsed * 1000 >= threshold:
+            current_app.logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+
+@event.listens_for(Engine, 'handle_error')
+def drop_query_timer(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+# ==========================================
+# TEMPLATE TIMING
+# ==========================================
+
+def start_render_timer(sender, template, context, **extra):
+    if has_request_context():
+        g.render_start = time.perf_counter()
+
+
+def stop_render_timer(sender, template, context, **extra):
+    if has_request_context() and g.get('render_start') is not None:
+        g.render_seconds = g.get('render_seconds', 0.0) + time.perf_counter() - g.render_start
+        g.render_start = None
+
+
+# ==========================================
+# FLASK HOOKS
+# ==========================================
+
+def init_metrics(app):
+    app.config.setdefault('SLOW_QUERY_MS', None)
+
+    before_render_template.connect(start_render_timer, app)
+    template_rendered.connect(stop_render_timer, app)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        g.query_count = 0
+        g.sql_seconds = 0.0
+        g.render_seconds = 0.0
+
+    @app.after_request
+    def finish_request_metrics(response):
+        if request.endpoint and request.endpoint != 'static' and g.get('request_start') is not None:
+            # Streamed responses without a Content-Length count as 0 bytes
+            record_request(
+                request.endpoint,
+                g.get('query_count', 0),
+                g.get('sql_seconds', 0.0),
+                g.get('render_seconds', 0.0),
+                time.perf_counter() - g.request_start,
+                response.content_length or 0
+            )
+        return response
+
+
+def scrape_authorized():
+    """Whether the request carries the configured METRICS_TOKEN as a bearer token"""
+    token = current_app.config.get('METRICS_TOKEN')
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    # Compared as bytes: compare_digest refuses str with non-ASCII characters
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        credentials.strip().encode('utf-8', 'surrogateescape'), token.encode('utf-8')
+    )
+
+
+def prometheus_text():
+    """Render the collected stats in the Prometheus text exposition format"""
+    metrics = (
+        ('planify_requests_total', 'counter', 'Requests handled', 'requests'),
+        ('planify_sql_queries_total', 'counter', 'SQL statements executed', 'queries'),
+        ('planify_sql_seconds_total', 'counter', 'Time spent in SQL', 'sql_seconds'),
+        ('planify_render_seconds_total', 'counter', 'Time spent rendering templates', 'render_seconds'),
+        ('planify_request_seconds_total', 'counter', 'Total request time', 'total_seconds'),
+        ('planify_request_seconds_max', 'gauge', 'Slowest request', 'max_seconds'),
+        ('planify_response_bytes_total', 'counter', 'Response body bytes', 'response_bytes'),
+    )
+    items = snapshot()
+    lines = []
+    for name, kind, help_text, field in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for endpoint, stats in items:
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(stats, field)}')
+    return "\n".join(lines) + "\n"
@@ -24,6 +24,9 @@ class User(db.Model, UserMixin):
     lesson_plans = db.relationship('LessonPlan', backref='creator', lazy=True, cascade='all, delete-orphan')
     enrollments = db.relationship('Enrollment', backref='student', lazy=True, cascade='all, delete-orphan')
 
+    # Indexes for role-filtered listings and counts
+    __table_args__ = (db.Index('ix_user_role', 'role'),)
+
 
 class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,6 +45,9 @@ class Course(db.Model):
     enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan')
     attendance_records = db.relationship('AttendanceRecord', backref='course', lazy=True, cascade='all, delete-orphan')
 
+    # Index for "courses of this educator"
+    __table_args__ = (db.Index('ix_course_educator_id', 'educator_id'),)
+
     # Method to generate enrollment code
     @staticmethod
     def generate_enrollment_code():
@@ -53,6 +59,19 @@ class Course(db.Model):
             if not Course.query.filter_by(enrollment_code=code).first():
                 return code
 
+    @staticmethod
+    def generate_enrollment_codes(count):
+        """Generate count unique codes, checked in memory against the codes in use"""
+        characters = string.ascii_uppercase + string.digits
+        taken = set(db.session.scalars(db.select(Course.enrollment_code)))
+        codes = []
+        while len(codes) < count:
+            code = ''.join(random.choice(characters) for _ in range(8))
+            if code not in taken:
+                taken.add(code)
+                codes.append(code)
+        return codes
+
 
 # ==========================================
 # LESSON PLAN MODEL
@@ -76,6 +95,12 @@ class LessonPlan(db.Model):
     # Relationships
     materials = db.relationship('LearningMaterial', backref='lesson_plan', lazy=True, cascade='all, delete-orphan')
 
+    # Indexes for course- and educator-scoped lookups
+    __table_args__ = (
+        db.Index('ix_lesson_plan_course_id', 'course_id', 'created_at'),
+        db.Index('ix_lesson_plan_educator_id', 'educator_id'),
+    )
+
 
 # ==========================================
 # LEARNING MATERIAL MODEL
@@ -88,6 +113,12 @@ class LearningMaterial(db.Model):
     filepath = db.Column(db.String(500), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Indexes for "materials of this lesson plan" and "is this stored file still used"
+    __table_args__ = (
+        db.Index('ix_learning_material_lesson_plan_id', 'lesson_plan_id'),
+        db.Index('ix_learning_material_filepath', 'filepath'),
+    )
+
 
 # ==========================================
 # ENROLLMENT MODEL
@@ -100,7 +131,11 @@ class Enrollment(db.Model):
     enrolled_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Ensure a student can't enroll in the same course twice
-    __table_args__ = (db.UniqueConstraint('student_id', 'course_id', name='unique_enrollment'),)
+    # (course_id index covers course-scoped lookups, the constraint leads with student_id)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='unique_enrollment'),
+        db.Index('ix_enrollment_course_id', 'course_id'),
+    )
 
 
 # ==========================================
@@ -119,8 +154,16 @@ class AttendanceRecord(db.Model):
     # Relationship to recorder (educator)
     recorder = db.relationship('User', foreign_keys=[recorded_by])
 
+    # Relationship to the student this record belongs to
+    student = db.relationship('User', foreign_keys=[student_id])
+
     # Ensure unique attendance record per student per course per date
-    __table_args__ = (db.UniqueConstraint('student_id', 'course_id', 'date', name='unique_attendance'),)
+    # (course_id + date index covers course/day lookups and history dates)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', 'date', name='unique_attendance'),
+        db.Index('ix_attendance_record_course_date', 'course_id', 'date'),
+        db.Index('ix_attendance_record_recorded_by', 'recorded_by'),
+    )
 
 
 # ==========================================
@@ -135,5 +178,103 @@ class ContactMessage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+    # Indexes for newest-first listing and unread counts
+    __table_args__ = (
+        db.Index('ix_contact_message_created_at', 'created_at'),
+        db.Index('ix_contact_message_is_read_created_at', 'is_read', 'created_at'),
+    )
+
     def __repr__(self):
-        return f'<ContactMessage {self.id} from {self.email}>'
\ No newline at end of file
+        return f'<ContactMessage {self.id} from {self.email}>'
+
+
+# ==========================================
+# MATERIAL PREVIEW MODEL
+# ==========================================
+# Derived artifacts (thumbnail, page count, text) for one stored file,
+# produced in the background by previews.py
+class MaterialPreview(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filepath = db.Column(db.String(500), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready, failed
+    page_count = db.Column(db.Integer, nullable=True)
+    excerpt = db.Column(db.Text, nullable=True)
+    has_thumbnail = db.Column(db.Boolean, default=False)
+    error = db.Column(db.String(255), nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<MaterialPreview {self.filepath} {self.status}>'
+
+
+# ==========================================
+# DAILY SUMMARY MODEL
+# ==========================================
+# Per-day changes of the admin dashboard figures, maintained by stats.py.
+# A metric's total is the SUM of its rows, a trend is its rows by day.
+class DailySummary(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(40), primary_key=True)  # e.g. users.student, attendance.present
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailySummary {self.day} {self.metric}={self.value}>'
+
+
+# ==========================================
+# ENROLLMENT ATTENDANCE MODEL
+# ==========================================
+# Attendance totals of one student in one course (the enrollment's key),
+# maintained by attendance.py on every write so the student page never
+# scans attendance_record. Mirrors the records, so it outlives a removed
+# enrollment just as they do.
+class EnrollmentAttendance(db.Model):
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id', ondelete='CASCADE'), primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    excused = db.Column(db.Integer, nullable=False, default=0)
+    last_seen = db.Column(db.Date, nullable=True)  # latest date marked present or late
+
+    # The primary key leads with student_id; course deletes need course_id
+    __table_args__ = (
+        db.Index('ix_enrollment_attendance_course_id', 'course_id'),
+    )
+
+    def __repr__(self):
+        return f'<EnrollmentAttendance student={self.student_id} course={self.course_id}>'
+
+# ==========================================
+# COURSE COUNTERS
+# ==========================================
+# Counts computed in the same SELECT as the course (correlated subqueries).
+# Deferred by default - load them with Course.query.options(undefer_group('counts'))
+# so templates never load the child collections just to count them.
+Course.enrollment_count = db.column_property(
+    db.select(db.func.count(Enrollment.id))
+    .where(Enrollment.course_id == Course.id)
+    .correlate_except(Enrollment)
+    .scalar_subquery(),
+    deferred=True,
+    group='counts'
+)
+
+Course.lesson_plan_count = db.column_property(
+    db.select(db.func.count(LessonPlan.id))
+    .where(LessonPlan.course_id == Course.id)
+    .correlate_except(LessonPlan)
+    .scalar_subquery(),
+    deferred=True,
+    group='counts'
+)
+
+Course.material_count = db.column_property(
+    db.select(db.func.count(LearningMaterial.id))
+    .join(LessonPlan, LearningMaterial.lesson_plan_id == LessonPlan.id)
+    .where(LessonPlan.course_id == Course.id)
+    .correlate_except(LearningMaterial, LessonPlan)
+    .scalar_subquery(),
+    deferred=True,
+    group='counts'
+)
@@ -0,0 +1,99 @@
+from database import db
+from sqlalchemy import and_, or_, func
+from datetime import datetime
+import base64
+
+# ==========================================
+# KEYSET PAGINATION
+# ==========================================
+# Seek-based pages for large admin listings: each page is a
+# "WHERE (sort key) > cursor ORDER BY ... LIMIT n" query, so page 1000
+# costs the same as page 1. Totals are counted only up to COUNT_ESTIMATE_CAP.
+
+ADMIN_PAGE_SIZE = 50
+COUNT_ESTIMATE_CAP = 10000
+
+
+class KeysetPage:
+    """One page of results plus cursors for the neighbouring pages"""
+    __slots__ = ('items', 'next_cursor', 'prev_cursor', 'total', 'total_capped')
+
+    def __init__(self, items, next_cursor, prev_cursor, total, total_capped):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_capped = total_capped
+
+
+def encode_cursor(values):
+    raw = '|'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Turn a cursor back into typed values, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) != len(columns):
+            return None
+        values = []
+        for part, column in zip(parts, columns):
+            if column.type.python_type is datetime:
+                values.append(datetime.fromisoformat(part))
+            else:
+                values.append(column.type.python_type(part))
+        return values
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _seek_condition(columns, values, forward):
+    """Lexicographic (c1, c2, ...) > (v1, v2, ...) (or < when not forward)"""
+    clauses = []
+    for idx, column in enumerate(columns):
+        equal_prefix = [columns[i] == values[i] for i in range(idx)]
+        step = column > values[idx] if forward else column < values[idx]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def estimate_count(query, cap=COUNT_ESTIMATE_CAP):
+    """Return (count, capped) counting at most cap + 1 rows"""
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    count = db.session.query(func.count()).select_from(limited).scalar()
+    return min(count, cap), count > cap
+
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=ADMIN_PAGE_SIZE, descending=False):
+    """Return a KeysetPage of query ordered by columns (last column must be unique)"""
+    total, total_capped = estimate_count(query)
+
+    after_values = decode_cursor(after, columns) if after else None
+    before_values = decode_cursor(before, columns) if before else None
+
+    # Going backwards: flip the sort, then reverse the rows
+    backwards = before_values is not None and after_values is None
+    ascending = descending == backwards
+
+    if after_values:
+        query = query.filter(_seek_condition(columns, after_values, forward=not descending))
+    elif before_values:
+        query = query.filter(_seek_condition(columns, before_values, forward=descending))
+
+    order = [column.asc() if ascending else column.desc() for column in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if backwards:
+        items.reverse()
+
+    def key(item):
+        return encode_cursor([getattr(item, column.key) for column in columns])
+
+    next_cursor = key(items[-1]) if items and (has_more if not backwards else True) else None
+    prev_cursor = key(items[0]) if items and (has_more if backwards else after_values is not None) else None
+
+    return KeysetPage(items, next_cursor, prev_cursor, total, total_capped)
@@ -0,0 +1,98 @@
+from flask import current_app, has_app_context
+from database import db
+from models import User
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from sqlalchemy import update
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
+# ==========================================
+# PASSWORD HASHING POLICY
+# ==========================================
+# PASSWORD_HASH_METHOD picks the algorithm and cost of every new hash, in
+# werkzeug's method syntax:
+#   scrypt:<n>:<r>:<p>            e.g. scrypt:16384:8:1 (memory = 128 * n * r bytes)
+#   pbkdf2:<hash>:<iterations>    e.g. pbkdf2:sha256:600000
+# The default is werkzeug's own (scrypt:32768:8:1, ~100 ms and 32 MB per hash).
+# Pick a cost for the host with benchmarks/password_hash_bench.py.
+#
+# A stored hash starts with the method that made it, so a successful login
+# whose hash uses other parameters is rehashed with the current policy
+# (one extra hash, once per user). 'flask passwords' shows how many users
+# are still on old parameters.
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+HASH_WORKERS = os.cpu_count() or 1
+
+
+def canonical_method(method):
+    """The full method string werkzeug writes into hashes made with method"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            return DEFAULT_HASH_METHOD
+        if len(args) != 3 or not all(arg.isdigit() for arg in args):
+            raise ValueError("scrypt takes n, r and p, e.g. scrypt:16384:8:1")
+        n, r, p = map(int, args)
+        if n < 2 or n & (n - 1):
+            raise ValueError("scrypt n must be a power of 2")
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        if len(args) > 2 or (len(args) == 2 and not args[1].isdigit()):
+            raise ValueError("pbkdf2 takes a hash name and iterations, e.g. pbkdf2:sha256:600000")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Unknown password hash method '{method}', use scrypt or pbkdf2")
+
+
+def init_password_policy(app):
+    method = app.config.get('PASSWORD_HASH_METHOD') or os.environ.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+    app.config['PASSWORD_HASH_METHOD'] = canonical_method(method)
+
+
+def hash_method():
+    """The configured method (the app's, or the environment's outside an app context)"""
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+    return canonical_method(os.environ.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD)
+
+
+def hash_password(password, method=None):
+    return generate_password_hash(password, method=method or hash_method())
+
+
+def hash_passwords(passwords, workers=HASH_WORKERS, method=None):
+    """hash_password for each password, in a process pool"""
+    # Resolved here: the pool's workers have no app context
+    hasher = partial(generate_password_hash, method=method or hash_method())
+    passwords = list(passwords)
+    if workers <= 1 or len(passwords) < 2:
+        return [hasher(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hasher, passwords, chunksize=chunksize))
+
+
+def method_of(password_hash):
+    return password_hash.split('$', 1)[0]
+
+
+def needs_rehash(password_hash, method=None):
+    return method_of(password_hash) != (method or hash_method())
+
+
+def check_password(user, password):
+    """check_password_hash for a user, upgrading a matching hash made with other parameters"""
+    if not check_password_hash(user.password, password):
+        return False
+
+    if needs_rehash(user.password):
+        # A bulk UPDATE: skips the ORM hooks, a changed hash is not a change of any dashboard
+        db.session.execute(
+            update(User).where(User.id == user.id).values(password=hash_password(password))
+        )
+        db.session.commit()
+    return True
@@ -0,0 +1,238 @@
+from flask import current_app
+from database import db
+from models import MaterialPreview
+from materials import stored_hash
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.etree import ElementTree
+import hashlib
+import os
+import re
+import shutil
+import zipfile
+
+# ==========================================
+# MATERIAL PREVIEWS
+# ==========================================
+# After an upload, a background worker derives a first-page thumbnail, the
+# page count and the extracted text of each stored file. Artifacts live in
+# instance/previews/<ab>/<key>/ (thumb.png, text.txt) and the summary in
+# MaterialPreview, so listings never have to open the original file.
+#
+# PDFs use PyMuPDF for the first-page thumbnail, page count and text;
+# images use Pillow (both pinned in requirements.txt); docx/pptx/txt use only
+# the standard library. Archive
+# members are read up to MAX_MEMBER_BYTES, so a zip bomb fails its preview
+# instead of filling memory.
+
+PREVIEW_WORKERS = 2
+THUMBNAIL_SIZE = (320, 420)
+EXCERPT_LENGTH = 400
+MAX_TEXT_CHARS = 1_000_000
+MAX_MEMBER_BYTES = 20 * 1024 * 1024  # decompressed size of one docx/pptx part
+
+_executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix='material-preview')
+
+
+def preview_dir(filepath):
+    # Stored files are keyed by their content hash, legacy uploads by their path
+    key = stored_hash(filepath) or hashlib.sha256(filepath.encode()).hexdigest()
+    return os.path.join(current_app.instance_path, 'previews', key[:2], key)
+
+
+def thumbnail_path(filepath):
+    return os.path.join(preview_dir(filepath), 'thumb.png')
+
+
+def text_path(filepath):
+    return os.path.join(preview_dir(filepath), 'text.txt')
+
+
+def previews_for(materials):
+    """Return {filepath: MaterialPreview} for the given materials in one query"""
+    filepaths = {material.filepath for material in materials}
+    if not filepaths:
+        return {}
+    previews = MaterialPreview.query.filter(MaterialPreview.filepath.in_(filepaths)).all()
+    return {preview.filepath: preview for preview in previews}
+
+
+def queue_previews(filepaths):
+    """Add pending previews for files not seen before and build them in the background"""
+    filepaths = set(filepaths)
+    if not filepaths:
+        return
+
+    known = set(db.session.scalars(
+        select(MaterialPreview.filepath).where(MaterialPreview.filepath.in_(filepaths))
+    ))
+
+    app = current_app._get_current_object()
+    for filepath in filepaths - known:
+        db.session.add(MaterialPreview(filepath=filepath))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request queued the same file first
+            db.session.rollback()
+            continue
+        _executor.submit(_build_in_background, app, filepath)
+
+
+def _build_in_background(app, filepath):
+    with app.app_context():
+        try:
+            build_preview(filepath)
+        finally:
+            db.session.remove()
+
+
+def build_preview(filepath):
+    """Extract the artifacts for one file and record the outcome"""
+    try:
+        page_count, text, has_thumbnail = extract_preview(filepath, preview_dir(filepath))
+        values = {
+            'status': 'ready',
+            'page_count': page_count,
+            'excerpt': ' '.join(text.split())[:EXCERPT_LENGTH] if text else None,
+            'has_thumbnail': has_thumbnail,
+            'error': None,
+        }
+    except Exception as e:
+        current_app.logger.exception("Preview failed for %s", filepath)
+        values = {'status': 'failed', 'error': str(e)[:255]}
+
+    preview = MaterialPreview.query.filter_by(filepath=filepath).first()
+    if preview is None:
+        # The file was deleted while it was being processed
+        shutil.rmtree(preview_dir(filepath), ignore_errors=True)
+        return
+
+    for name, value in values.items():
+        setattr(preview, name, value)
+    preview.processed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def discard_previews(filepaths):
+    """Drop preview rows and artifacts for files that were removed from disk"""
+    if not filepaths:
+        return
+    with db.engine.begin() as connection:
+        connection.execute(delete(MaterialPreview).where(MaterialPreview.filepath.in_(filepaths)))
+    for filepath in filepaths:
+        shutil.rmtree(preview_dir(filepath), ignore_errors=True)
+
+
+# ==========================================
+# EXTRACTORS
+# ==========================================
+
+def extract_preview(filepath, out_dir):
+    """Write thumb.png / text.txt into out_dir; return (page_count, text, has_thumbnail)"""
+    os.makedirs(out_dir, exist_ok=True)
+    extension = os.path.splitext(filepath)[1].lower()
+    thumb = os.path.join(out_dir, 'thumb.png')
+
+    if extension == '.pdf':
+        page_count, text, has_thumbnail = _pdf_preview(filepath, thumb)
+    elif extension in ('.jpg', '.jpeg', '.png'):
+        page_count, text, has_thumbnail = 1, None, _image_thumbnail(filepath, thumb)
+    elif extension == '.txt':
+        with open(filepath, encoding='utf-8', errors='replace') as f:
+            page_count, text, has_thumbnail = None, f.read(MAX_TEXT_CHARS), False
+    elif extension == '.docx':
+        page_count, text, has_thumbnail = None, _ooxml_text(filepath, r'word/document\.xml'), False
+    elif extension == '.pptx':
+        page_count, text, has_thumbnail = _pptx_preview(filepath)
+    else:
+        # Legacy binary Office formats: nothing to extract without external tools
+        page_count, text, has_thumbnail = None, None, False
+
+    if text:
+        tmp_path = os.path.join(out_dir, 'text.txt.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text[:MAX_TEXT_CHARS])
+        os.replace(tmp_path, os.path.join(out_dir, 'text.txt'))
+
+    return page_count, text, has_thumbnail
+
+
+def _pdf_preview(filepath, thumb):
+    import pymupdf
+
+    with pymupdf.open(filepath) as doc:
+        text_parts, length = [], 0
+        for page in doc:
+            if length >= MAX_TEXT_CHARS:
+                break
+            part = page.get_text()
+            text_parts.append(part)
+            length += len(part)
+
+        has_thumbnail = False
+        if doc.page_count:
+            first = doc[0]
+            zoom = THUMBNAIL_SIZE[0] / first.rect.width
+            pixmap = first.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            pixmap.save(thumb + '.tmp.png')
+            os.replace(thumb + '.tmp.png', thumb)
+            has_thumbnail = True
+        return doc.page_count, '\n'.join(text_parts), has_thumbnail
+
+
+def _image_thumbnail(filepath, thumb):
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    with Image.open(filepath) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        image.convert('RGB').save(thumb + '.tmp.png', 'PNG')
+    os.replace(thumb + '.tmp.png', thumb)
+    return True
+
+
+def _ooxml_text(filepath, member_pattern):
+    """Text of the matching XML parts of a docx/pptx, one paragraph per line"""
+    pattern = re.compile(member_pattern)
+    lines = []
+    with zipfile.ZipFile(filepath) as archive:
+        names = sorted((name for name in archive.namelist() if pattern.fullmatch(name)), key=_natural_key)
+        length = 0
+        for name in names:
+            if length >= MAX_TEXT_CHARS:
+                break
+            root = ElementTree.fromstring(_read_member(archive, name))
+            for paragraph in root.iter():
+                if paragraph.tag.endswith('}p'):
+                    line = ''.join(node.text or '' for node in paragraph.iter() if node.tag.endswith('}t'))
+                    if line:
+                        lines.append(line)
+                        length += len(line)
+    return '\n'.join(lines)
+
+
+def _read_member(archive, name):
+    """An archive member's bytes, refusing members that inflate past MAX_MEMBER_BYTES"""
+    # The declared size can lie, so the read itself is bounded too
+    if archive.getinfo(name).file_size > MAX_MEMBER_BYTES:
+        raise ValueError(f"{name} is too large to preview")
+    with archive.open(name) as member:
+        data = member.read(MAX_MEMBER_BYTES + 1)
+    if len(data) > MAX_MEMBER_BYTES:
+        raise ValueError(f"{name} is too large to preview")
+    return data
+
+
+def _pptx_preview(filepath):
+    with zipfile.ZipFile(filepath) as archive:
+        slide_count = sum(1 for name in archive.namelist() if re.fullmatch(r'ppt/slides/slide\d+\.xml', name))
+    return slide_count, _ooxml_text(filepath, r'ppt/slides/slide\d+\.xml'), False
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
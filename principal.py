@@ -0,0 +1,126 @@
+from flask import current_app, session
+from database import db
+from models import User
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from cache import TTLCache
+from fragments import scope_versions, invalidate_fragments
+import time
+
+# ==========================================
+# PRINCIPAL CACHE
+# ==========================================
+# Flask-Login's user loader returns a small Principal snapshot (id, role,
+# names) instead of a User row. Snapshots are kept in an in-process LRU with a
+# TTL, so most requests authorize without touching the user table.
+# Any ORM update/delete of a User drops its snapshot (immediately and again after commit).
+#
+# PRINCIPAL_IN_SESSION embeds the snapshot in the signed session cookie as
+# well, which also skips the lookup after a worker restart. The snapshot
+# carries the user's version (a 'principal:<id>' scope of the fragment cache
+# backend, bumped with the LRU entry), so a promoted or removed user's cookie
+# is reloaded on the next request. With the Redis backend the versions are
+# shared by every worker; with the in-process one, changes made in another
+# worker still show up within PRINCIPAL_TTL seconds.
+
+PRINCIPAL_CACHE_SIZE = 10000
+PRINCIPAL_TTL = 300  # seconds
+SESSION_KEY = '_principal'
+
+
+class Principal:
+    """Read-only snapshot of the logged-in user, enough to authorize a request"""
+    __slots__ = ('id', 'role', 'username', 'first_name', 'last_name', 'email')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, role, username, first_name, last_name, email):
+        self.id = id
+        self.role = role
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.role, user.username, user.first_name, user.last_name, user.email)
+
+    def get_id(self):
+        return str(self.id)
+
+    def as_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __eq__(self, other):
+        return isinstance(other, (Principal, User)) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<Principal {self.id} {self.role}>'
+
+
+_principals = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_TTL)  # user id -> Principal
+
+
+def principal_scope(user_id):
+    return f'principal:{user_id}'
+
+
+def invalidate_principal(user_id):
+    _principals.pop(user_id)
+    invalidate_fragments(principal_scope(user_id))
+
+
+def clear_principals():
+    _principals.clear()
+
+
+def load_principal(user_id):
+    """Flask-Login user loader: session cookie, then LRU, then the database"""
+    in_session = current_app.config.get('PRINCIPAL_IN_SESSION')
+
+    version = None
+    if in_session:
+        [version] = scope_versions(principal_scope(user_id))
+        embedded = session.get(SESSION_KEY)
+        if (version is not None and embedded and len(embedded) == 4 and embedded[0] == user_id
+                and embedded[1] > time.time() and embedded[2] == version):
+            return Principal(*embedded[3])
+
+    principal = _principals.get(user_id)
+    if principal is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            session.pop(SESSION_KEY, None)
+            return None
+        principal = Principal.from_user(user)
+        _principals.set(user_id, principal)
+
+    if in_session and version is not None:
+        session[SESSION_KEY] = [user_id, time.time() + PRINCIPAL_TTL, version, principal.as_list()]
+    return principal
+
+
+# INVALIDATE ON USER CHANGES
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    invalidate_principal(target.id)
+    object_session(target).info.setdefault('changed_principals', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    # A request may have cached the old row between flush and commit
+    for user_id in db_session.info.pop('changed_principals', ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(db_session):
+    db_session.info.pop('changed_principals', None)
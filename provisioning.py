@@ -0,0 +1,288 @@
+from flask import current_app
+from database import db
+from models import User
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from stats import apply_summary_deltas
+from fragments import invalidate_fragments, SITE_SCOPE
+from seed import hash_passwords, insert_rows, HASH_WORKERS
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import csv
+import glob
+import json
+import os
+import re
+import time
+import uuid
+
+# ==========================================
+# BULK ACCOUNT PROVISIONING
+# ==========================================
+# Creates a cohort of accounts from a CSV with the registration fields:
+#   first_name,last_name,username,email,contact_number,password[,role]
+# (role falls back to the one given for the whole file).
+#   1. every row validated like RegisterForm
+#   2. usernames and emails checked against the unique indexes in one
+#      query, and against earlier rows of the file
+#   3. passwords of the valid rows hashed in a process pool (seed.py)
+#   4. rows inserted in executemany batches, each in a savepoint; a batch
+#      that hits a unique constraint anyway (a concurrent registration) is
+#      retried row by row so only the offending rows fail
+# Every row gets an outcome and its errors for the report. Core writes skip
+# the ORM hooks, so the daily summary and site fragments are updated here.
+#
+# Used by 'flask provision <file>' and the admin upload (/admin/users/import).
+# The upload runs as a background job (like the attendance PDF reports): the
+# job hashes in its own thread, since forking a process pool from a threaded
+# web worker is unsafe, and writes its report to instance/imports/ where any
+# worker can read it. Large cohorts are faster with 'flask provision', which
+# hashes on every CPU.
+
+PROVISION_BATCH_SIZE = 1000
+PROVISION_MAX_ROWS = 5000  # admin upload only; the CLI takes any size
+IMPORT_WORKERS = 1  # imports run one at a time
+IMPORT_RESULT_TTL = 24 * 3600  # seconds a finished import's report is kept
+IMPORT_TIMEOUT = 3600  # seconds after which a pending import is taken as interrupted
+PROVISION_ROLES = ('educator', 'student')
+
+FIELDS = ('first_name', 'last_name', 'username', 'email', 'contact_number', 'password')
+
+CREATED = 'created'
+VALID = 'valid'  # dry run
+FAILED = 'error'
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+CONTACT_PATTERN = re.compile(r'^[0-9]{11}$')
+
+
+class ProvisioningError(ValueError):
+    """The file can't be provisioned at all (missing columns, too many rows)"""
+
+
+def existing_identities(usernames, emails):
+    """(usernames, emails) already taken, in one query over both unique indexes"""
+    usernames, emails = set(usernames), set(emails)
+    if not usernames and not emails:
+        return set(), set()
+
+    taken_usernames, taken_emails = set(), set()
+    for username, email in db.session.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    ):
+        if username in usernames:
+            taken_usernames.add(username)
+        if email in emails:
+            taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def read_accounts(text, max_rows=None):
+    """[(line_number, {field: value})] from CSV text with a header row"""
+    reader = csv.DictReader(text.splitlines())
+    header = {name.strip().lower() for name in reader.fieldnames or ()}
+    missing = [field for field in FIELDS if field not in header]
+    if missing:
+        raise ProvisioningError(f"Missing column(s): {', '.join(missing)}.")
+
+    rows = []
+    for row in reader:
+        values = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()
+                  if isinstance(value, str)}
+        if any(values.values()):
+            rows.append((reader.line_num, values))
+
+    if not rows:
+        raise ProvisioningError("No accounts found.")
+    if max_rows and len(rows) > max_rows:
+        raise ProvisioningError(f"Uploads are limited to {max_rows} accounts (got {len(rows)}).")
+    return rows
+
+
+def _row_errors(values, role):
+    """Validation messages for one row, as RegisterForm would give them"""
+    errors = []
+    for field in ('first_name', 'last_name'):
+        if not 3 <= len(values.get(field, '')) <= 20:
+            errors.append(f"{field.replace('_', ' ').capitalize()} must be 3-20 characters")
+    if not 3 <= len(values.get('username', '')) <= 20:
+        errors.append("Username must be 3-20 characters")
+    if not EMAIL_PATTERN.match(values.get('email', '')) or len(values['email']) > 120:
+        errors.append("Invalid email address")
+    if not CONTACT_PATTERN.match(values.get('contact_number', '')):
+        errors.append("Contact number must be 11 digits")
+    if len(values.get('password', '')) < 6:
+        errors.append("Password must be at least 6 characters")
+    if role not in PROVISION_ROLES:
+        errors.append(f"Role must be one of: {', '.join(PROVISION_ROLES)}")
+    return errors
+
+
+def _insert_batch(rows, report_rows):
+    """Insert one batch in a savepoint; on a unique violation retry row by row"""
+    try:
+        with db.session.begin_nested():
+            insert_rows(User, rows, batch_size=len(rows))
+        return
+    except IntegrityError:
+        pass
+
+    for row, report_row in zip(rows, report_rows):
+        try:
+            with db.session.begin_nested():
+                insert_rows(User, [row])
+        except IntegrityError:
+            report_row['outcome'] = FAILED
+            report_row['errors'].append("Username or email already taken")
+
+
+def provision_accounts(rows, role='student', workers=HASH_WORKERS, batch_size=PROVISION_BATCH_SIZE, dry_run=False):
+    """Create accounts for [(line_number, {field: value})]; returns [{line, username, email, role, outcome, errors}]"""
+    report = []
+    for line_number, values in rows:
+        row_role = (values.get('role') or role).lower()
+        report.append({
+            'line': line_number,
+            'username': values.get('username', ''),
+            'email': values.get('email', ''),
+            'role': row_role,
+            'outcome': FAILED,
+            'errors': _row_errors(values, row_role),
+        })
+
+    # Uniqueness: the database in one query, then earlier rows of the file
+    taken_usernames, taken_emails = existing_identities(
+        [row['username'] for row in report], [row['email'] for row in report]
+    )
+    seen_usernames, seen_emails = set(), set()
+    for row in report:
+        if row['username'] in taken_usernames:
+            row['errors'].append("Username already taken")
+        elif row['username'] in seen_usernames:
+            row['errors'].append("Username repeated in the file")
+        if row['email'] in taken_emails:
+            row['errors'].append("Email already registered")
+        elif row['email'] in seen_emails:
+            row['errors'].append("Email repeated in the file")
+        seen_usernames.add(row['username'])
+        seen_emails.add(row['email'])
+
+    accepted = [(row, values) for row, (_, values) in zip(report, rows) if not row['errors']]
+    if dry_run:
+        for row, _ in accepted:
+            row['outcome'] = VALID
+        return report
+
+    hashes = hash_passwords([values['password'] for _, values in accepted], workers)
+    for (row, _), password_hash in zip(accepted, hashes):
+        row['outcome'] = CREATED
+        row['password_hash'] = password_hash
+
+    created = Counter()
+    for start in range(0, len(accepted), batch_size):
+        batch = accepted[start:start + batch_size]
+        _insert_batch([
+            {
+                'first_name': values['first_name'],
+                'last_name': values['last_name'],
+                'username': values['username'],
+                'email': values['email'],
+                'contact_number': values['contact_number'],
+                'password': row.pop('password_hash'),
+                'role': row['role'],
+            }
+            for row, values in batch
+        ], [row for row, _ in batch])
+
+    for row, _ in accepted:
+        if row['outcome'] == CREATED:
+            created[row['role']] += 1
+
+    today = datetime.utcnow().date()
+    apply_summary_deltas(db.session.connection(),
+                         Counter({(today, f'users.{user_role}'): count for user_role, count in created.items()}))
+    db.session.commit()
+
+    if created:
+        invalidate_fragments(SITE_SCOPE)
+    return report
+
+
+def provisioning_counts(report):
+    """{outcome: number of rows}"""
+    return Counter(row['outcome'] for row in report)
+
+
+# ==========================================
+# BACKGROUND IMPORTS (ADMIN UPLOAD)
+# ==========================================
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix='account-import')
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def import_dir():
+    path = os.path.join(current_app.instance_path, 'imports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def start_account_import(rows, role='student'):
+    """Provision rows in a background job; returns its id for account_import_status"""
+    directory = import_dir()
+    for old_path in glob.glob(os.path.join(directory, '*.json')):
+        if os.path.getmtime(old_path) < time.time() - IMPORT_RESULT_TTL:
+            os.remove(old_path)
+
+    job_id = uuid.uuid4().hex
+    with open(os.path.join(directory, f"{job_id}.pending"), 'w') as f:
+        f.write(str(len(rows)))
+
+    app = current_app._get_current_object()
+    _executor.submit(_import_in_background, app, directory, job_id, rows, role)
+    return job_id
+
+
+def account_import_status(job_id):
+    """Return {ready, rows, report, error}, or None for an unknown job"""
+    if not JOB_ID_PATTERN.match(job_id):
+        return None
+    directory = import_dir()
+
+    try:
+        with open(os.path.join(directory, f"{job_id}.json")) as f:
+            return {'ready': True, **json.load(f)}
+    except FileNotFoundError:
+        pass
+
+    pending = os.path.join(directory, f"{job_id}.pending")
+    try:
+        with open(pending) as f:
+            status = {'ready': False, 'rows': int(f.read() or 0), 'report': None, 'error': None}
+        if os.path.getmtime(pending) < time.time() - IMPORT_TIMEOUT:
+            # The worker running it was restarted
+            status.update(ready=True, error="The import was interrupted.")
+        return status
+    except FileNotFoundError:
+        return None
+
+
+def _import_in_background(app, directory, job_id, rows, role):
+    with app.app_context():
+        result = {'rows': len(rows), 'report': None, 'error': None}
+        try:
+            result['report'] = provision_accounts(rows, role=role, workers=1)
+        except Exception as e:
+            app.logger.exception("Account import %s failed", job_id)
+            db.session.rollback()
+            result['error'] = str(e)
+        finally:
+            db.session.remove()
+
+        # Write atomically, then drop the pending marker
+        path = os.path.join(directory, f"{job_id}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(result, f)
+        os.replace(f"{path}.tmp", path)
+        os.remove(os.path.join(directory, f"{job_id}.pending"))
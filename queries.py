@@ -0,0 +1,54 @@
+from flask import g, request
+from sqlalchemy.orm import joinedload, selectinload, undefer_group, configure_mappers
+from models import Course, LessonPlan, LearningMaterial, Enrollment, AttendanceRecord
+
+# Backref attributes (Enrollment.student, LessonPlan.course, ...) exist only after configuration
+configure_mappers()
+
+# ==========================================
+# LOADER PRESETS
+# ==========================================
+# Named eager-loading options used by the routes, so a page issues
+# a fixed number of queries no matter how many rows it shows.
+# Usage: Enrollment.query.options(*ENROLLMENT_WITH_STUDENT)
+
+# Enrollment rows that show the student (roster, attendance, PDF)
+ENROLLMENT_WITH_STUDENT = (joinedload(Enrollment.student),)
+
+# Course cards with counts and the educator's name
+COURSE_LIST = (undefer_group('counts'), joinedload(Course.educator))
+
+# Lesson plans listed together with their files
+PLAN_WITH_MATERIALS = (selectinload(LessonPlan.materials),)
+
+# A single lesson plan page (course name + files)
+PLAN_DETAIL = (joinedload(LessonPlan.course), selectinload(LessonPlan.materials))
+
+# A material together with its lesson plan (ownership checks)
+MATERIAL_WITH_PLAN = (joinedload(LearningMaterial.lesson_plan),)
+
+# Attendance rows that show who recorded them
+RECORD_WITH_RECORDER = (joinedload(AttendanceRecord.recorder),)
+
+
+# ==========================================
+# QUERY BUDGET
+# ==========================================
+# In debug mode every request fails if it runs more than QUERY_BUDGET
+# SQL statements, so a new N+1 shows up right away.
+# (g.query_count is maintained by metrics.py)
+
+DEFAULT_QUERY_BUDGET = 25
+
+
+def init_query_budget(app):
+    app.config.setdefault('QUERY_BUDGET', DEFAULT_QUERY_BUDGET)
+
+    @app.after_request
+    def check_query_budget(response):
+        budget = app.config.get('QUERY_BUDGET')
+        if app.debug and budget and g.get('query_count', 0) > budget:
+            raise AssertionError(
+                f"{request.endpoint} ran {g.query_count} queries (budget {budget})"
+            )
+        return response
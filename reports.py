@@ -0,0 +1,253 @@
+from flask import current_app
+from database import db
+from models import Course, Enrollment, AttendanceRecord
+from queries import ENROLLMENT_WITH_STUDENT
+from sqlalchemy import func
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from io import BytesIO
+import glob
+import os
+import zlib
+
+# ==========================================
+# ATTENDANCE PDF REPORTS
+# ==========================================
+# Each report is built once, in a background worker, and cached on disk.
+# The cache file name includes the newest recorded_at, the roster version
+# and the course header, so any change to those produces a new file.
+
+REPORT_WORKERS = 2
+
+STATUS_COLORS = {
+    'present': '#27ae60',
+    'absent': '#e74c3c',
+    'late': '#f39c12',
+    'excused': '#3498db',
+}
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='attendance-report')
+_jobs = {}
+_jobs_lock = Lock()
+
+
+def report_cache_dir():
+    path = os.path.join(current_app.instance_path, 'reports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_cache_path(course, attendance_date):
+    """Cache file for the current state of (course, date)"""
+    course_id = course.id
+    last_recorded, = db.session.query(
+        func.max(AttendanceRecord.recorded_at)
+    ).filter(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.date == attendance_date
+    ).one()
+
+    roster_size, roster_last = db.session.query(
+        func.count(Enrollment.id),
+        func.max(Enrollment.id)
+    ).filter(Enrollment.course_id == course_id).one()
+
+    stamp = last_recorded.strftime('%Y%m%d%H%M%S%f') if last_recorded else 'none'
+    header = zlib.crc32(f"{course.course_name}|{course.course_code}|{course.block_section}".encode())
+    filename = f"attendance_{course_id}_{attendance_date.isoformat()}_{stamp}_{roster_size}_{roster_last or 0}_{header:08x}.pdf"
+    return os.path.join(report_cache_dir(), filename)
+
+
+def get_attendance_report(course, attendance_date):
+    """Return (path, ready, error). Starts a background build on a cache miss."""
+    path = report_cache_path(course, attendance_date)
+
+    if os.path.exists(path):
+        with _jobs_lock:
+            _jobs.pop(path, None)
+        return path, True, None
+
+    with _jobs_lock:
+        job = _jobs.get(path)
+        if job is None:
+            app = current_app._get_current_object()
+            job = _jobs[path] = _executor.submit(_build_in_background, app, course.id, attendance_date, path)
+
+    if job.done():
+        with _jobs_lock:
+            _jobs.pop(path, None)
+        error = job.exception()
+        if error:
+            return path, False, str(error)
+        return path, True, None
+
+    return path, False, None
+
+
+def _build_in_background(app, course_id, attendance_date, path):
+    with app.app_context():
+        try:
+            course = db.session.get(Course, course_id)
+            records = AttendanceRecord.query.filter_by(
+                course_id=course_id,
+                date=attendance_date
+            ).order_by(AttendanceRecord.recorded_at.desc()).all()
+            enrollments = Enrollment.query.options(*ENROLLMENT_WITH_STUDENT).filter_by(course_id=course_id).all()
+
+            pdf_bytes = build_attendance_pdf(course, attendance_date, enrollments, records)
+
+            # Write atomically, then drop older versions of this report
+            prefix = os.path.join(os.path.dirname(path), f"attendance_{course_id}_{attendance_date.isoformat()}_")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+
+            for old_path in glob.glob(f"{prefix}*.pdf"):
+                if old_path != path:
+                    os.remove(old_path)
+        except Exception:
+            app.logger.exception("Attendance report failed for course %s on %s", course_id, attendance_date)
+            raise
+        finally:
+            db.session.remove()
+
+
+def build_attendance_pdf(course, attendance_date, enrollments, records):
+    """Render the attendance report and return the PDF bytes"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Title Style
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#2c3e50'),
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    # Subtitle Style
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=colors.HexColor('#34495e'),
+        spaceAfter=6,
+        alignment=TA_CENTER
+    )
+
+    # Header paragraphs
+    elements.append(Paragraph("<b>Attendance Report</b>", title_style))
+    elements.append(Paragraph(f"{course.course_name} ({course.course_code})", subtitle_style))
+    elements.append(Paragraph(f"Block: {course.block_section}", subtitle_style))
+    elements.append(Paragraph(f"Date: {attendance_date.strftime('%A, %B %d, %Y')}", subtitle_style))
+
+    if records:
+        elements.append(Paragraph(
+            f"Recorded on: {records[0].recorded_at.strftime('%B %d, %Y at %I:%M %p')}",
+            subtitle_style
+        ))
+
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Create attendance dictionary and count statuses in one pass
+    attendance_dict = {record.student_id: record for record in records}
+    counts = {status: 0 for status in STATUS_COLORS}
+    for record in records:
+        if record.status in counts:
+            counts[record.status] += 1
+
+    # Add Statistics Table
+    stats_data = [
+        ['Total Students', 'Present', 'Absent', 'Late', 'Excused'],
+        [str(len(enrollments)), str(counts['present']), str(counts['absent']), str(counts['late']),
+         str(counts['excused'])]
+    ]
+
+    stats_table = Table(stats_data, colWidths=[1.2 * inch] * 5)
+    stats_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('TOPPADDING', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+    ]))
+
+    elements.append(stats_table)
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Student table rows and their status colouring, built together
+    data = [['#', 'Student Name', 'Email', 'Status', 'Signature']]
+    status_styles = []
+    status_colors = {status: colors.HexColor(value) for status, value in STATUS_COLORS.items()}
+
+    for idx, enrollment in enumerate(enrollments, 1):
+        student = enrollment.student
+        record = attendance_dict.get(student.id)
+
+        status_text = 'Not Recorded'
+        if record:
+            status_text = record.status.capitalize()
+            if record.status in status_colors:
+                status_styles.append(('TEXTCOLOR', (3, idx), (3, idx), status_colors[record.status]))
+                status_styles.append(('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'))
+
+        data.append([
+            str(idx),
+            f"{student.first_name} {student.last_name}",
+            student.email,
+            status_text,
+            ''  # Empty signature field
+        ])
+
+    table = Table(data, colWidths=[0.4 * inch, 2.0 * inch, 2.0 * inch, 1.0 * inch, 1.5 * inch])
+
+    # One style list for the whole table (base styles + per-row status colours)
+    table.setStyle(TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+        # Body
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#2c3e50')),
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Center # column
+        ('ALIGN', (1, 1), (2, -1), 'LEFT'),  # Left align name and email
+        ('ALIGN', (3, 1), (3, -1), 'CENTER'),  # Center status column
+        ('ALIGN', (4, 1), (4, -1), 'CENTER'),  # Center signature column
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+        ('TOPPADDING', (0, 1), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
+    ] + status_styles))
+
+    elements.append(table)
+
+    # Build PDF
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,159 @@
+from database import db
+from models import User, Enrollment
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite, postgresql
+from stats import apply_summary_deltas
+from fragments import invalidate_fragments, educator_scope
+from authz import invalidate_course_access
+from collections import Counter
+from datetime import datetime
+import csv
+import re
+
+# ==========================================
+# BULK ROSTER IMPORT
+# ==========================================
+# Enrolls a whole class list (CSV upload or pasted emails) in a fixed
+# number of statements, however long the list:
+#   1. every email resolved to a user in one IN query
+#   2. existing enrollments for those users found in one query
+#   3. the rest inserted with multi-row INSERTs (ON CONFLICT DO NOTHING,
+#      so a student joining by code at the same moment is not an error)
+# Each line gets an outcome for the report. Core writes skip the ORM hooks,
+# so the daily summary, dashboard fragments and course access caches are
+# updated here.
+
+ROSTER_MAX_EMAILS = 5000
+ROSTER_BATCH_SIZE = 1000
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already enrolled'
+DUPLICATE = 'duplicate'
+UNKNOWN = 'unknown email'
+NOT_A_STUDENT = 'not a student'
+INVALID = 'not an email'
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+SEPARATORS = re.compile(r'[\s;]+')
+
+INSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+class RosterError(ValueError):
+    """The roster can't be imported at all (too long, empty, unreadable)"""
+
+
+def parse_roster(text):
+    """[(line_number, value)] for each email-like cell (or unparseable line) of a CSV / pasted list"""
+    entries = []
+    for line_number, cells in enumerate(csv.reader(text.splitlines()), start=1):
+        values = [value for cell in cells for value in SEPARATORS.split(cell.strip()) if value]
+        emails = [value.strip('<>"\'') for value in values if '@' in value]
+
+        if emails:
+            entries.extend((line_number, email) for email in emails)
+        elif values and line_number > 1:
+            # The first line without an email is taken as the CSV header
+            entries.append((line_number, ' '.join(values)))
+
+    if not entries:
+        raise RosterError("No email addresses found.")
+    if len(entries) > ROSTER_MAX_EMAILS:
+        raise RosterError(f"Rosters are limited to {ROSTER_MAX_EMAILS} emails (got {len(entries)}).")
+    return entries
+
+
+def _insert_enrollments(rows):
+    connection = db.session.connection()
+    make_insert = INSERT_DIALECTS.get(connection.dialect.name)
+    table = Enrollment.__table__
+
+    inserted = 0
+    for start in range(0, len(rows), ROSTER_BATCH_SIZE):
+        batch = rows[start:start + ROSTER_BATCH_SIZE]
+        if make_insert:
+            stmt = make_insert(table).values(batch).on_conflict_do_nothing(
+                index_elements=['student_id', 'course_id']
+            )
+        else:
+            stmt = table.insert().values(batch)
+        inserted += connection.execute(stmt).rowcount
+    return inserted
+
+
+def import_roster(course, entries):
+    """Enroll the students of [(line_number, email)] in course; returns [{line, email, outcome, student}]"""
+    valid = {email for _, email in entries if EMAIL_PATTERN.match(email)}
+
+    # 1. Users by email, matched case-insensitively but through the email index
+    # (as typed and lower-cased; IN keeps it one query)
+    users = {}
+    if valid:
+        candidates = valid | {email.lower() for email in valid}
+        for user in db.session.execute(
+            select(User.id, User.email, User.first_name, User.last_name, User.role)
+            .where(User.email.in_(candidates))
+        ):
+            users[user.email.lower()] = user
+
+    # 2. Which of them are already in the course
+    student_ids = [user.id for user in users.values() if user.role == 'student']
+    enrolled_ids = set()
+    if student_ids:
+        enrolled_ids = set(db.session.scalars(
+            select(Enrollment.student_id)
+            .where(Enrollment.course_id == course.id, Enrollment.student_id.in_(student_ids))
+        ))
+
+    report = []
+    seen = set()
+    to_enroll = []
+    for line_number, email in entries:
+        key = email.lower()
+        user = users.get(key)
+        if not EMAIL_PATTERN.match(email):
+            outcome = INVALID
+        elif key in seen:
+            outcome = DUPLICATE
+        elif user is None:
+            outcome = UNKNOWN
+        elif user.role != 'student':
+            outcome = NOT_A_STUDENT
+        elif user.id in enrolled_ids:
+            outcome = ALREADY_ENROLLED
+        else:
+            outcome = ENROLLED
+            to_enroll.append(user.id)
+        seen.add(key)
+        report.append({
+            'line': line_number,
+            'email': email,
+            'outcome': outcome,
+            'student': f"{user.first_name} {user.last_name}" if user else None,
+        })
+
+    # 3. The rest in multi-row INSERTs
+    if to_enroll:
+        now = datetime.utcnow()
+        inserted = _insert_enrollments([
+            {'student_id': student_id, 'course_id': course.id, 'enrolled_at': now}
+            for student_id in to_enroll
+        ])
+        apply_summary_deltas(db.session.connection(), Counter({(now.date(), 'enrollments'): inserted}))
+
+    db.session.commit()
+
+    if to_enroll:
+        invalidate_fragments(educator_scope(course.educator_id))
+        for student_id in to_enroll:
+            invalidate_course_access(student_id)
+
+    return report
+
+
+def roster_counts(report):
+    """{outcome: number of lines}"""
+    return Counter(row['outcome'] for row in report)
@@ -1,18 +1,38 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, abort, Response, jsonify, stream_with_context
 from app import app
 from database import db
-from forms import RegisterForm, LoginForm, CourseForm, LessonPlanForm, AttendanceForm, ContactForm, EnrollByEmailForm, JoinCourseForm
+from forms import RegisterForm, LoginForm, CourseForm, LessonPlanForm, AttendanceForm, ContactForm, EnrollByEmailForm, JoinCourseForm, RosterImportForm, AccountImportForm
 from models import User, Course, LessonPlan, LearningMaterial, Enrollment, AttendanceRecord, ContactMessage
-from werkzeug.security import generate_password_hash, check_password_hash
+import metrics
+from reports import get_attendance_report
+from exports import available_export_formats, stream_csv, stream_file, build_xlsx, build_pdf
+from attendance import (paginate_attendance_dates, summarize_attendance_dates, load_attendance_records, record_attendance_bulk,
+                        student_attendance_totals)
+from pagination import keyset_paginate, estimate_count
+from materials import UPLOAD_FOLDER, store_material, send_material
+from uploads import UploadError, create_upload, load_upload, write_chunk, finalize_upload, cancel_upload
+from previews import previews_for, queue_previews, thumbnail_path
+from search import search
+from stats import dashboard_stats
+from analytics import student_attendance_report
+from roster import RosterError, parse_roster, import_roster, roster_counts, ENROLLED
+from provisioning import (ProvisioningError, PROVISION_MAX_ROWS, existing_identities, read_accounts,
+                          start_account_import, account_import_status, provisioning_counts, CREATED)
+from authz import role_required, owns_course, enrolled_in_course, owns, is_enrolled, owned_course_ids, enrolled_course_ids
+from passwords import hash_password, check_password
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy import or_
+from sqlalchemy.orm import undefer_group
+from queries import (ENROLLMENT_WITH_STUDENT, COURSE_LIST, PLAN_WITH_MATERIALS, PLAN_DETAIL,
+                     MATERIAL_WITH_PLAN, RECORD_WITH_RECORDER)
 from werkzeug.utils import secure_filename
+from werkzeug.http import parse_content_range_header
 from datetime import datetime, date
 import os
 
 # ==========================================
 # FILE UPLOAD CONFIGURATION
 # ==========================================
-UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx', 'txt', 'jpg', 'png'}
 
 # Ensure the upload folder exists
@@ -23,6 +43,16 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def parse_date_arg(value):
+    """Parse a YYYY-MM-DD string, returning None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
 # ==========================================
 # PUBLIC PAGES
 # ==========================================
@@ -64,13 +94,14 @@ def register_form(role):
     form.role.render_kw = {'readonly': True, 'disabled': True}
 
     if form.validate_on_submit():
-        # CHECK USERNAME
-        if User.query.filter_by(username=form.username.data).first():
+        # CHECK USERNAME AND EMAIL (one query over both unique indexes)
+        taken_usernames, taken_emails = existing_identities([form.username.data], [form.email.data])
+
+        if taken_usernames:
             flash("Username already taken.", "error")
             return redirect(url_for('register_form', role=role))
 
-        # CHECK EMAIL
-        if User.query.filter_by(email=form.email.data).first():
+        if taken_emails:
             flash("Email already registered.", "error")
             return redirect(url_for('register_form', role=role))
 
@@ -82,7 +113,7 @@ def register_form(role):
             email=form.email.data,
             contact_number=form.contact_number.data,
             role=role,
-            password=generate_password_hash(form.password.data)
+            password=hash_password(form.password.data)
         )
 
         db.session.add(new_user)
@@ -109,7 +140,7 @@ def login():
             (User.email == username_or_email)
         ).first()
 
-        if user and check_password_hash(user.password, password):
+        if user and check_password(user, password):
             login_user(user)
             flash(f"Welcome back, {user.username}!", "success")
 
@@ -145,29 +176,44 @@ def logout():
 
 @app.route('/student/home')
 @login_required
+@role_required('student')
 def student_home():
-    if current_user.role != 'student':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    # Get enrolled courses
-    enrollments = Enrollment.query.filter_by(student_id=current_user.id).all()
-    courses = [enrollment.course for enrollment in enrollments]
+    # Get enrolled courses (with lesson/material counts)
+    courses = Course.query.options(*COURSE_LIST).join(
+        Enrollment, Enrollment.course_id == Course.id
+    ).filter(Enrollment.student_id == current_user.id).order_by(Enrollment.id).all()
 
     return render_template('student_home.html', courses=courses)
 
 
+# MY ATTENDANCE (STUDENT)
+@app.route('/student/attendance')
+@login_required
+@role_required('student')
+def student_attendance_summary():
+    # Per-enrollment totals only; attendance records are never scanned here
+    summaries = student_attendance_totals(current_user.id)
+
+    totals = {status: sum(summary[status] for summary in summaries)
+              for status in ('present', 'late', 'absent', 'excused')}
+    counted = totals['present'] + totals['late'] + totals['absent']
+    overall_rate = (totals['present'] + totals['late']) / counted if counted else None
+
+    return render_template('student_attendance_summary.html', summaries=summaries,
+                           totals=totals, overall_rate=overall_rate)
+
+
 # ==========================================
 # EDUCATOR DASHBOARD
 # ==========================================
 
 @app.route('/educator/home')
 @login_required
+@role_required('educator')
 def educator_home():
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-    return render_template('educator_home.html')
+    # Lazy query: only runs when the dashboard fragment is not cached
+    courses = Course.query.options(undefer_group('counts')).filter_by(educator_id=current_user.id)
+    return render_template('educator_home.html', courses=courses)
 
 
 # ==========================================
@@ -177,12 +223,9 @@ def educator_home():
 # VIEW ALL COURSES
 @app.route('/educator/courses')
 @login_required
+@role_required('educator')
 def educator_courses():
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    courses = Course.query.filter_by(educator_id=current_user.id).all()
+    courses = Course.query.options(undefer_group('counts')).filter_by(educator_id=current_user.id).all()
     return render_template('educator_courses.html', courses=courses)
 
 
@@ -193,11 +236,8 @@ def educator_courses():
 # ADD NEW COURSE - UPDATED
 @app.route('/educator/course/add', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
 def add_course():
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     form = CourseForm()
 
     if form.validate_on_submit():
@@ -229,17 +269,11 @@ def add_course():
 # MANAGE ENROLLMENTS BY EMAIL (EDUCATOR)
 @app.route('/educator/course/<int:course_id>/enrollments', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
+@owns_course
 def manage_enrollments(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
-
     form = EnrollByEmailForm()
 
     if form.validate_on_submit():
@@ -274,9 +308,46 @@ def manage_enrollments(course_id):
         return redirect(url_for('manage_enrollments', course_id=course_id))
 
     # Get current enrollments
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+    enrollments = Enrollment.query.options(*ENROLLMENT_WITH_STUDENT).filter_by(course_id=course_id).all()
+
+    return render_template('manage_enrollments.html', course=course, enrollments=enrollments, form=form,
+                           import_form=RosterImportForm())
+
+
+# IMPORT A ROSTER OF EMAILS (EDUCATOR)
+@app.route('/educator/course/<int:course_id>/enrollments/import', methods=['POST'])
+@login_required
+@role_required('educator')
+@owns_course
+def import_enrollments(course_id):
+    course = Course.query.get_or_404(course_id)
+
+    import_form = RosterImportForm()
+    if not import_form.validate_on_submit():
+        for errors in import_form.errors.values():
+            flash(errors[0], "error")
+        return redirect(url_for('manage_enrollments', course_id=course_id))
+
+    # An uploaded file wins over the pasted list
+    if import_form.roster_file.data:
+        text = import_form.roster_file.data.read().decode('utf-8-sig', errors='replace')
+    else:
+        text = import_form.emails.data or ''
+
+    try:
+        report = import_roster(course, parse_roster(text))
+    except RosterError as e:
+        flash(str(e), "error")
+        return redirect(url_for('manage_enrollments', course_id=course_id))
 
-    return render_template('manage_enrollments.html', course=course, enrollments=enrollments, form=form)
+    counts = roster_counts(report)
+    flash(f"{counts[ENROLLED]} of {len(report)} students enrolled.", "success" if counts[ENROLLED] else "error")
+
+    # Per-line report above the updated roster
+    enrollments = Enrollment.query.options(*ENROLLMENT_WITH_STUDENT).filter_by(course_id=course_id).all()
+    return render_template('manage_enrollments.html', course=course, enrollments=enrollments,
+                           form=EnrollByEmailForm(formdata=None), import_form=RosterImportForm(formdata=None),
+                           report=[row for row in report if row['outcome'] != ENROLLED], counts=counts)
 
 
 # ==========================================
@@ -286,11 +357,8 @@ def manage_enrollments(course_id):
 # JOIN COURSE BY CODE (STUDENT)
 @app.route('/student/join-course', methods=['GET', 'POST'])
 @login_required
+@role_required('student')
 def student_join_course():
-    if current_user.role != 'student':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     form = JoinCourseForm()
 
     if form.validate_on_submit():
@@ -329,18 +397,11 @@ def student_join_course():
 # EDIT COURSE
 @app.route('/educator/course/<int:course_id>/edit', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
+@owns_course(message="You don't have permission to edit this course.")
 def edit_course(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    # Check if educator owns this course
-    if course.educator_id != current_user.id:
-        flash("You don't have permission to edit this course.", "error")
-        return redirect(url_for('educator_courses'))
-
     form = CourseForm()
 
     if form.validate_on_submit():
@@ -365,17 +426,11 @@ def edit_course(course_id):
 # DELETE COURSE
 @app.route('/educator/course/<int:course_id>/delete', methods=['POST'])
 @login_required
+@role_required('educator')
+@owns_course(message="You don't have permission to delete this course.")
 def delete_course(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("You don't have permission to delete this course.", "error")
-        return redirect(url_for('educator_courses'))
-
     db.session.delete(course)
     db.session.commit()
 
@@ -390,17 +445,11 @@ def delete_course(course_id):
 # VIEW ALL LESSON PLANS FOR A COURSE
 @app.route('/educator/course/<int:course_id>/plans')
 @login_required
+@role_required('educator')
+@owns_course
 def course_lesson_plans(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
-
     lesson_plans = LessonPlan.query.filter_by(course_id=course_id).all()
 
     return render_template('lesson_plans.html', course=course, lesson_plans=lesson_plans)
@@ -409,17 +458,11 @@ def course_lesson_plans(course_id):
 # CREATE LESSON PLAN
 @app.route('/educator/course/<int:course_id>/plan/add', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
+@owns_course
 def add_lesson_plan(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
-
     form = LessonPlanForm()
 
     if form.validate_on_submit():
@@ -438,14 +481,13 @@ def add_lesson_plan(course_id):
 
         # Handle file uploads
         files = request.files.getlist('materials')
+        stored_paths = []
         for file in files:
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                # Add timestamp to avoid conflicts
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                unique_filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(filepath)
+                # Stored by content hash, so identical files share one copy
+                filepath = store_material(file.stream, filename)
+                stored_paths.append(filepath)
 
                 # Save to database
                 material = LearningMaterial(
@@ -456,6 +498,7 @@ def add_lesson_plan(course_id):
                 db.session.add(material)
 
         db.session.commit()
+        queue_previews(stored_paths)
 
         flash(f"Lesson plan '{new_plan.title}' created successfully!", "success")
         return redirect(url_for('course_lesson_plans', course_id=course_id))
@@ -466,12 +509,9 @@ def add_lesson_plan(course_id):
 # VIEW LESSON PLAN DETAILS
 @app.route('/educator/plan/<int:plan_id>')
 @login_required
+@role_required('educator')
 def view_lesson_plan(plan_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    plan = LessonPlan.query.get_or_404(plan_id)
+    plan = LessonPlan.query.options(*PLAN_DETAIL).get_or_404(plan_id)
 
     if plan.educator_id != current_user.id:
         flash("Access denied.", "error")
@@ -483,11 +523,8 @@ def view_lesson_plan(plan_id):
 # EDIT LESSON PLAN
 @app.route('/educator/plan/<int:plan_id>/edit', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
 def edit_lesson_plan(plan_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     plan = LessonPlan.query.get_or_404(plan_id)
 
     if plan.educator_id != current_user.id:
@@ -505,13 +542,12 @@ def edit_lesson_plan(plan_id):
 
         # Handle new file uploads
         files = request.files.getlist('materials')
+        stored_paths = []
         for file in files:
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                unique_filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(filepath)
+                filepath = store_material(file.stream, filename)
+                stored_paths.append(filepath)
 
                 material = LearningMaterial(
                     lesson_plan_id=plan.id,
@@ -521,6 +557,7 @@ def edit_lesson_plan(plan_id):
                 db.session.add(material)
 
         db.session.commit()
+        queue_previews(stored_paths)
         flash(f"Lesson plan '{plan.title}' updated successfully!", "success")
         return redirect(url_for('view_lesson_plan', plan_id=plan.id))
 
@@ -536,11 +573,8 @@ def edit_lesson_plan(plan_id):
 # DELETE LESSON PLAN
 @app.route('/educator/plan/<int:plan_id>/delete', methods=['POST'])
 @login_required
+@role_required('educator')
 def delete_lesson_plan(plan_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     plan = LessonPlan.query.get_or_404(plan_id)
     course_id = plan.course_id
 
@@ -558,22 +592,16 @@ def delete_lesson_plan(plan_id):
 # DELETE LEARNING MATERIAL
 @app.route('/educator/material/<int:material_id>/delete', methods=['POST'])
 @login_required
+@role_required('educator')
 def delete_material(material_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    material = LearningMaterial.query.get_or_404(material_id)
+    material = LearningMaterial.query.options(*MATERIAL_WITH_PLAN).get_or_404(material_id)
     plan = material.lesson_plan
 
     if plan.educator_id != current_user.id:
         flash("Access denied.", "error")
         return redirect(url_for('educator_courses'))
 
-    # Delete file from filesystem
-    if os.path.exists(material.filepath):
-        os.remove(material.filepath)
-
+    # The stored file is removed on commit if no other material uses it
     db.session.delete(material)
     db.session.commit()
 
@@ -581,6 +609,121 @@ def delete_material(material_id):
     return redirect(url_for('view_lesson_plan', plan_id=plan.id))
 
 
+# ==========================================
+# CHUNKED MATERIAL UPLOADS (EDUCATOR, JSON API)
+# ==========================================
+# POST   /educator/plan/<id>/uploads        {filename, size, sha256?} -> 201 session
+# GET    /educator/uploads/<upload_id>      -> {received, size, ...} (resume point)
+# PUT    /educator/uploads/<upload_id>      body = bytes, Content-Range: bytes start-end/size
+#                                           X-Chunk-SHA256: hex SHA-256 of the body (required)
+# POST   /educator/uploads/<upload_id>/finalize   {sha256?} -> 201 {material_id}
+# DELETE /educator/uploads/<upload_id>      cancel
+
+def upload_error(message, status):
+    return jsonify(error=message), status
+
+
+def owned_upload(upload_id):
+    """Load an upload session belonging to the current educator, or abort"""
+    if current_user.role != 'educator':
+        abort(403)
+    session = load_upload(upload_id)
+    if session is None:
+        abort(404)
+    if session.educator_id != current_user.id:
+        abort(403)
+    return session
+
+
+# START AN UPLOAD SESSION FOR A LESSON PLAN
+@app.route('/educator/plan/<int:plan_id>/uploads', methods=['POST'])
+@login_required
+@role_required('educator', api=True)
+def start_material_upload(plan_id):
+    plan = LessonPlan.query.get_or_404(plan_id)
+    if plan.educator_id != current_user.id:
+        abort(403)
+
+    # JSON only, which also keeps cross-site form posts out
+    if not request.is_json:
+        return upload_error("Expected a JSON body.", 415)
+    data = request.get_json(silent=True) or {}
+
+    filename = secure_filename(data.get('filename') or '')
+    if not filename or not allowed_file(filename):
+        return upload_error("File type not allowed.", 400)
+
+    try:
+        session = create_upload(plan.id, current_user.id, filename, data.get('size'), data.get('sha256'))
+    except UploadError as e:
+        return upload_error(str(e), e.status)
+
+    status = session.status()
+    status['upload_url'] = url_for('upload_material_chunk', upload_id=session.upload_id)
+    status['finalize_url'] = url_for('finalize_material_upload', upload_id=session.upload_id)
+    return jsonify(status), 201
+
+
+# UPLOAD STATUS (WHERE TO RESUME)
+@app.route('/educator/uploads/<upload_id>', methods=['GET'])
+@login_required
+def material_upload_status(upload_id):
+    return jsonify(owned_upload(upload_id).status())
+
+
+# WRITE ONE CHUNK
+@app.route('/educator/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_material_chunk(upload_id):
+    session = owned_upload(upload_id)
+
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    if content_range is None or content_range.units != 'bytes' or content_range.length != session.size:
+        return upload_error("Content-Range: bytes start-end/size is required.", 400)
+
+    length = content_range.stop - content_range.start
+    if request.content_length != length:
+        return upload_error("Content-Length does not match Content-Range.", 400)
+
+    try:
+        received = write_chunk(session, content_range.start, request.stream, length,
+                               request.headers.get('X-Chunk-SHA256'))
+    except UploadError as e:
+        return jsonify(error=str(e), received=session.received), e.status
+
+    return jsonify(received=received, size=session.size)
+
+
+# VERIFY AND ATTACH THE UPLOADED FILE
+@app.route('/educator/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_material_upload(upload_id):
+    session = owned_upload(upload_id)
+    data = request.get_json(silent=True) or {}
+
+    # The plan may have been deleted while the upload was running
+    if db.session.get(LessonPlan, session.lesson_plan_id) is None:
+        cancel_upload(session)
+        return upload_error("Lesson plan no longer exists.", 404)
+
+    try:
+        material = finalize_upload(session, data.get('sha256'))
+    except UploadError as e:
+        return upload_error(str(e), e.status)
+
+    queue_previews([material.filepath])
+
+    return jsonify(material_id=material.id, filename=material.filename), 201
+
+
+# CANCEL AN UPLOAD
+@app.route('/educator/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_material_upload(upload_id):
+    cancel_upload(owned_upload(upload_id))
+    return '', 204
+
+
 # ==========================================
 # ATTENDANCE MANAGEMENT (EDUCATOR)
 # ==========================================
@@ -588,21 +731,15 @@ def delete_material(material_id):
 # VIEW ATTENDANCE PAGE FOR A COURSE
 @app.route('/educator/course/<int:course_id>/attendance', methods=['GET', 'POST'])
 @login_required
+@role_required('educator')
+@owns_course
 def course_attendance(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
-
     form = AttendanceForm()
 
     # Get enrolled students
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+    enrollments = Enrollment.query.options(*ENROLLMENT_WITH_STUDENT).filter_by(course_id=course_id).all()
     students = [enrollment.student for enrollment in enrollments]
 
     # Get selected date from URL parameter or form or default to today
@@ -637,48 +774,30 @@ def course_attendance(course_id):
 # RECORD/UPDATE ATTENDANCE
 @app.route('/educator/attendance/record', methods=['POST'])
 @login_required
+@role_required('educator')
 def record_attendance():
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    course_id = request.form.get('course_id')
+    course_id = request.form.get('course_id', type=int)
     attendance_date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
 
-    course = Course.query.get_or_404(course_id)
-
-    if course.educator_id != current_user.id:
+    if not owns(course_id):
         flash("Access denied.", "error")
         return redirect(url_for('educator_courses'))
 
-    # Get all students in the course
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+    course = Course.query.get_or_404(course_id)
 
-    for enrollment in enrollments:
-        student_id = enrollment.student_id
-        status = request.form.get(f'student_{student_id}')
+    # Get all students in the course (ids only)
+    student_ids = [student_id for (student_id,) in db.session.query(
+        Enrollment.student_id
+    ).filter_by(course_id=course.id).all()]
 
+    # Collect submitted statuses and write them in one batch
+    statuses = {}
+    for student_id in student_ids:
+        status = request.form.get(f'student_{student_id}')
         if status:
-            # Check if record exists
-            existing_record = AttendanceRecord.query.filter_by(
-                course_id=course_id,
-                student_id=student_id,
-                date=attendance_date
-            ).first()
-
-            if existing_record:
-                # Update existing record
-                existing_record.status = status
-            else:
-                # Create new record
-                new_record = AttendanceRecord(
-                    course_id=course_id,
-                    student_id=student_id,
-                    date=attendance_date,
-                    status=status,
-                    recorded_by=current_user.id
-                )
-                db.session.add(new_record)
+            statuses[student_id] = status
+
+    record_attendance_bulk(course.id, attendance_date, statuses, current_user.id)
 
     db.session.commit()
     flash("Attendance recorded successfully!", "success")
@@ -688,15 +807,12 @@ def record_attendance():
 # REMOVE ENROLLMENT
 @app.route('/educator/enrollment/<int:enrollment_id>/remove', methods=['POST'])
 @login_required
+@role_required('educator')
 def remove_enrollment(enrollment_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     enrollment = Enrollment.query.get_or_404(enrollment_id)
-    course = enrollment.course
+    course_id = enrollment.course_id
 
-    if course.educator_id != current_user.id:
+    if not owns(course_id):
         flash("Access denied.", "error")
         return redirect(url_for('educator_courses'))
 
@@ -704,7 +820,7 @@ def remove_enrollment(enrollment_id):
     db.session.commit()
 
     flash("Student removed from course.", "success")
-    return redirect(url_for('manage_enrollments', course_id=course.id))
+    return redirect(url_for('manage_enrollments', course_id=course_id))
 
 
 # ==========================================
@@ -713,46 +829,133 @@ def remove_enrollment(enrollment_id):
 
 @app.route('/admin/home')
 @login_required
+@role_required('admin')
 def admin_home():
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    # Get statistics
-    total_users = User.query.count()
-    total_students = User.query.filter_by(role='student').count()
-    total_educators = User.query.filter_by(role='educator').count()
-    total_courses = Course.query.count()
-
-    return render_template('admin_home.html',
-                           total_users=total_users,
-                           total_students=total_students,
-                           total_educators=total_educators,
-                           total_courses=total_courses)
+    # Called from inside the cached fragment, so a cache hit runs no queries
+    return render_template('admin_home.html', load_stats=dashboard_stats)
 
 
 # VIEW ALL USERS
 @app.route('/admin/users')
 @login_required
+@role_required('admin')
 def admin_users():
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
+    role = request.args.get('role', '')
+    search = request.args.get('q', '').strip()
+
+    query = User.query
+    if role in ('admin', 'educator', 'student'):
+        query = query.filter(User.role == role)
+    if search:
+        query = query.filter(or_(
+            User.username.icontains(search, autoescape=True),
+            User.email.icontains(search, autoescape=True),
+            User.first_name.icontains(search, autoescape=True),
+            User.last_name.icontains(search, autoescape=True)
+        ))
+
+    page = keyset_paginate(query, [User.id],
+                           after=request.args.get('after'), before=request.args.get('before'))
+
+    return render_template('admin_users.html', users=page.items, page=page,
+                           filter_args={'role': role or None, 'q': search or None})
+
+
+# BULK ACCOUNT UPLOAD (ADMIN)
+# Provisioned in a background job; the result page polls its status
+@app.route('/admin/users/import', methods=['GET', 'POST'])
+@login_required
+@role_required('admin')
+def admin_import_users():
+    form = AccountImportForm()
 
-    users = User.query.all()
-    return render_template('admin_users.html', users=users)
+    if form.validate_on_submit():
+        text = form.accounts_file.data.read().decode('utf-8-sig', errors='replace')
+        try:
+            rows = read_accounts(text, max_rows=PROVISION_MAX_ROWS)
+        except ProvisioningError as e:
+            flash(str(e), "error")
+            return redirect(url_for('admin_import_users'))
+
+        job_id = start_account_import(rows, role=form.role.data)
+        return redirect(url_for('admin_import_result', job_id=job_id))
+
+    return render_template('admin_import_users.html', form=form, status=None)
+
+
+# BULK ACCOUNT UPLOAD RESULT (PENDING UNTIL THE JOB FINISHES)
+@app.route('/admin/users/import/<job_id>')
+@login_required
+@role_required('admin')
+def admin_import_result(job_id):
+    status = account_import_status(job_id)
+    if status is None:
+        abort(404)
+
+    report = counts = None
+    if status['report'] is not None:
+        counts = provisioning_counts(status['report'])
+        # Only the rows that need fixing
+        report = [row for row in status['report'] if row['outcome'] != CREATED]
+
+    return render_template('admin_import_users.html', form=AccountImportForm(), status=status,
+                           report=report, counts=counts,
+                           status_url=url_for('admin_import_status', job_id=job_id))
+
+
+# BULK ACCOUNT UPLOAD STATUS (POLLED BY THE RESULT PAGE)
+@app.route('/admin/users/import/<job_id>/status')
+@login_required
+@role_required('admin', api=True)
+def admin_import_status(job_id):
+    status = account_import_status(job_id)
+    if status is None:
+        abort(404)
+
+    return jsonify(ready=status['ready'], error=status['error'])
 
 
 # VIEW ALL COURSES
 @app.route('/admin/courses')
 @login_required
+@role_required('admin')
 def admin_courses():
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
+    search = request.args.get('q', '').strip()
+
+    query = Course.query.options(*COURSE_LIST)
+    if search:
+        query = query.filter(or_(
+            Course.course_name.icontains(search, autoescape=True),
+            Course.course_code.icontains(search, autoescape=True)
+        ))
 
-    courses = Course.query.all()
-    return render_template('admin_courses.html', courses=courses)
+    page = keyset_paginate(query, [Course.id],
+                           after=request.args.get('after'), before=request.args.get('before'))
+
+    return render_template('admin_courses.html', courses=page.items, page=page,
+                           filter_args={'q': search or None})
+
+
+# ==========================================
+# ADMIN - REQUEST METRICS
+# ==========================================
+
+# PER-ENDPOINT METRICS PAGE (ADMIN)
+@app.route('/admin/metrics')
+@login_required
+@role_required('admin')
+def admin_metrics():
+    return render_template('admin_metrics.html', endpoint_stats=metrics.snapshot())
+
+
+# PROMETHEUS TEXT ENDPOINT (ADMINS OR THE METRICS_TOKEN BEARER TOKEN)
+@app.route('/metrics')
+def prometheus_metrics():
+    is_admin = current_user.is_authenticated and current_user.role == 'admin'
+    if not is_admin and not metrics.scrape_authorized():
+        abort(403)
+
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
 
 
 # ==========================================
@@ -762,87 +965,84 @@ def admin_courses():
 # VIEW ATTENDANCE HISTORY FOR A COURSE
 @app.route('/educator/course/<int:course_id>/attendance/history')
 @login_required
+@role_required('educator')
+@owns_course
 def attendance_history(course_id):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
+    # Optional date range and page from URL parameters
+    page = max(request.args.get('page', 1, type=int), 1)
+    start_date = parse_date_arg(request.args.get('start'))
+    end_date = parse_date_arg(request.args.get('end'))
 
-    # Get all attendance records for this course, ordered by date (newest first)
-    # Group by date to show all records created on each date
-    from sqlalchemy import func, distinct
-
-    # Get all unique dates that have attendance records
-    attendance_dates = db.session.query(
-        AttendanceRecord.date
-    ).filter_by(
-        course_id=course_id
-    ).distinct().order_by(
-        AttendanceRecord.date.desc()
-    ).all()
+    # Dates the educator expanded to see individual records
+    expanded_dates = [d for d in (parse_date_arg(value) for value in request.args.getlist('expand')) if d]
 
-    # For each date, get all the records
-    attendance_by_date = {}
-    for (date_obj,) in attendance_dates:
-        records = AttendanceRecord.query.filter_by(
-            course_id=course_id,
-            date=date_obj
-        ).order_by(AttendanceRecord.recorded_at.desc()).all()
-
-        # Get the time when this attendance was recorded (from first record)
-        recorded_time = records[0].recorded_at if records else None
-
-        # Count statistics for this date
-        stats = {
-            'total': len(records),
-            'present': len([r for r in records if r.status == 'present']),
-            'absent': len([r for r in records if r.status == 'absent']),
-            'excused': len([r for r in records if r.status == 'excused']),
-            'late': len([r for r in records if r.status == 'late'])
-        }
-
-        attendance_by_date[date_obj] = {
-            'records': records,
-            'recorded_time': recorded_time,
-            'stats': stats
-        }
+    # Only the dates on this page, newest first
+    attendance_dates, has_next = paginate_attendance_dates(course_id, page=page,
+                                                          start_date=start_date, end_date=end_date)
+
+    # Per-date counts in one grouped query
+    attendance_by_date = summarize_attendance_dates(course_id, attendance_dates)
+
+    # Load individual records only for expanded dates on this page
+    expanded_dates = [d for d in expanded_dates if d in attendance_by_date]
+    for date_obj, records in load_attendance_records(course_id, expanded_dates).items():
+        attendance_by_date[date_obj]['records'] = records
 
     return render_template('attendance_history.html',
                            course=course,
-                           attendance_by_date=attendance_by_date)
+                           attendance_by_date=attendance_by_date,
+                           page=page,
+                           has_next=has_next,
+                           start_date=start_date,
+                           end_date=end_date,
+                           export_formats=available_export_formats())
+
+
+# PER-STUDENT ATTENDANCE REPORT (AT-RISK STUDENTS FIRST)
+@app.route('/educator/course/<int:course_id>/attendance/students')
+@login_required
+@role_required('educator')
+@owns_course
+def student_attendance(course_id):
+    course = Course.query.get_or_404(course_id)
+
+    start_date = parse_date_arg(request.args.get('start'))
+    end_date = parse_date_arg(request.args.get('end'))
+
+    # Whole course as one students x dates matrix (see analytics.py)
+    students, dates = student_attendance_report(course_id, start_date, end_date)
+
+    return render_template('student_attendance.html',
+                           course=course,
+                           students=students,
+                           at_risk_count=sum(1 for student in students if student['reasons']),
+                           session_count=len(dates),
+                           start_date=start_date,
+                           end_date=end_date)
 
 
 # VIEW DETAILED ATTENDANCE FOR A SPECIFIC DATE
 @app.route('/educator/course/<int:course_id>/attendance/view/<date_str>')
 @login_required
+@role_required('educator')
+@owns_course
 def view_attendance_date(course_id, date_str):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
-
     # Convert date string to date object
     from datetime import datetime
     attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
 
     # Get all attendance records for this date
-    records = AttendanceRecord.query.filter_by(
+    records = AttendanceRecord.query.options(*RECORD_WITH_RECORDER).filter_by(
         course_id=course_id,
         date=attendance_date
     ).order_by(AttendanceRecord.recorded_at.desc()).all()
 
     # Get enrollment info to show all students
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
+    enrollments = Enrollment.query.options(*ENROLLMENT_WITH_STUDENT).filter_by(course_id=course_id).all()
 
     # Create a dictionary for easy lookup
     attendance_dict = {record.student_id: record for record in records}
@@ -856,212 +1056,103 @@ def view_attendance_date(course_id, date_str):
 
 
 # DOWNLOAD ATTENDANCE AS PDF
+# Served from the report cache; a cache miss is built in the background
+# and the browser waits on a page that polls the status endpoint.
 @app.route('/educator/course/<int:course_id>/attendance/download/<date_str>')
 @login_required
+@role_required('educator')
+@owns_course
 def download_attendance_pdf(course_id, date_str):
-    if current_user.role != 'educator':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
+    course = Course.query.get_or_404(course_id)
+
+    attendance_date = parse_date_arg(date_str)
+    if not attendance_date:
+        abort(404)
+
+    path, ready, error = get_attendance_report(course, attendance_date)
+
+    if ready:
+        from flask import send_file
+        filename = f"attendance_{course.course_code}_{date_str}.pdf"
+        return send_file(path, as_attachment=True, download_name=filename, mimetype='application/pdf')
+
+    return render_template('report_pending.html',
+                           course=course,
+                           attendance_date=attendance_date,
+                           error=error,
+                           status_url=url_for('attendance_pdf_status', course_id=course.id, date_str=date_str),
+                           download_url=url_for('download_attendance_pdf', course_id=course.id, date_str=date_str))
+
+
+# ATTENDANCE PDF STATUS (POLLED BY THE PENDING PAGE)
+@app.route('/educator/course/<int:course_id>/attendance/download/<date_str>/status')
+@login_required
+@role_required('educator', api=True)
+def attendance_pdf_status(course_id, date_str):
+    if not owns(course_id):
+        abort(403)
 
     course = Course.query.get_or_404(course_id)
 
-    if course.educator_id != current_user.id:
-        flash("Access denied.", "error")
-        return redirect(url_for('educator_courses'))
+    attendance_date = parse_date_arg(date_str)
+    if not attendance_date:
+        abort(404)
 
-    # Convert date string to date object
-    from datetime import datetime
-    attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    path, ready, error = get_attendance_report(course, attendance_date)
 
-    # Get all attendance records for this date
-    records = AttendanceRecord.query.filter_by(
-        course_id=course_id,
-        date=attendance_date
-    ).order_by(AttendanceRecord.student_id).all()
-
-    # Get all enrolled students
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
-
-    # Create PDF
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    from io import BytesIO
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch)
-
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Title Style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=12,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-
-    # Subtitle Style
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=colors.HexColor('#34495e'),
-        spaceAfter=6,
-        alignment=TA_CENTER
-    )
-
-    # Add Title
-    title = Paragraph(f"<b>Attendance Report</b>", title_style)
-    elements.append(title)
-
-    # Add Course Info
-    course_info = Paragraph(f"{course.course_name} ({course.course_code})", subtitle_style)
-    elements.append(course_info)
-
-    block_info = Paragraph(f"Block: {course.block_section}", subtitle_style)
-    elements.append(block_info)
-
-    date_info = Paragraph(f"Date: {attendance_date.strftime('%A, %B %d, %Y')}", subtitle_style)
-    elements.append(date_info)
-
-    if records:
-        recorded_info = Paragraph(
-            f"Recorded on: {records[0].recorded_at.strftime('%B %d, %Y at %I:%M %p')}",
-            subtitle_style
-        )
-        elements.append(recorded_info)
+    return jsonify(ready=ready, error=error,
+                   download_url=url_for('download_attendance_pdf', course_id=course.id, date_str=date_str))
 
-    elements.append(Spacer(1, 0.3 * inch))
+# ==========================================
+# TERM ATTENDANCE EXPORT (EDUCATOR)
+# ==========================================
 
-    # Create attendance dictionary
-    attendance_dict = {record.student_id: record for record in records}
+def attendance_export_response(course_ids, filename_base):
+    """Stream the attendance export in the format given by ?format=csv|pdf|xlsx"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in available_export_formats():
+        abort(400)
+
+    start_date = parse_date_arg(request.args.get('start'))
+    end_date = parse_date_arg(request.args.get('end'))
+
+    range_label = f"{start_date or 'start'}_{end_date or 'end'}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename_base}_{range_label}.{export_format}"'}
+
+    if export_format == 'csv':
+        body = stream_with_context(stream_csv(course_ids, start_date, end_date))
+        return Response(body, mimetype='text/csv', headers=headers)
+
+    if export_format == 'xlsx':
+        path = build_xlsx(course_ids, start_date, end_date)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        path = build_pdf(course_ids, start_date, end_date)
+        mimetype = 'application/pdf'
+
+    return Response(stream_file(path), mimetype=mimetype, headers=headers)
+
+
+# EXPORT ONE COURSE
+@app.route('/educator/course/<int:course_id>/attendance/export')
+@login_required
+@role_required('educator')
+@owns_course
+def export_course_attendance(course_id):
+    course = Course.query.get_or_404(course_id)
+
+    return attendance_export_response([course.id], f"attendance_{secure_filename(course.course_code)}")
+
+
+# EXPORT ALL OF THE EDUCATOR'S COURSES
+@app.route('/educator/attendance/export')
+@login_required
+@role_required('educator')
+def export_all_attendance():
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).filter_by(educator_id=current_user.id).all()]
+
+    return attendance_export_response(course_ids, "attendance_all_courses")
 
-    # Calculate statistics
-    total_students = len(enrollments)
-    present_count = len([r for r in records if r.status == 'present'])
-    absent_count = len([r for r in records if r.status == 'absent'])
-    late_count = len([r for r in records if r.status == 'late'])
-    excused_count = len([r for r in records if r.status == 'excused'])
-
-    # Add Statistics Table
-    stats_data = [
-        ['Total Students', 'Present', 'Absent', 'Late', 'Excused'],
-        [str(total_students), str(present_count), str(absent_count), str(late_count), str(excused_count)]
-    ]
-
-    stats_table = Table(stats_data, colWidths=[1.2 * inch, 1.2 * inch, 1.2 * inch, 1.2 * inch, 1.2 * inch])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('TOPPADDING', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-    ]))
-
-    elements.append(stats_table)
-    elements.append(Spacer(1, 0.3 * inch))
-
-    # Add Student Attendance Table with Signature Column
-    data = [['#', 'Student Name', 'Email', 'Status', 'Signature']]
-
-    for idx, enrollment in enumerate(enrollments, 1):
-        student = enrollment.student
-        record = attendance_dict.get(student.id)
-
-        status_text = 'Not Recorded'
-        if record:
-            status_text = record.status.capitalize()
-
-        data.append([
-            str(idx),
-            f"{student.first_name} {student.last_name}",
-            student.email,
-            status_text,
-            ''  # Empty signature field
-        ])
-
-    # Updated column widths to accommodate signature column
-    table = Table(data, colWidths=[0.4 * inch, 2.0 * inch, 2.0 * inch, 1.0 * inch, 1.5 * inch])
-
-    # Table styling
-    table.setStyle(TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-
-        # Body
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#2c3e50')),
-        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Center # column
-        ('ALIGN', (1, 1), (2, -1), 'LEFT'),  # Left align name and email
-        ('ALIGN', (3, 1), (3, -1), 'CENTER'),  # Center status column
-        ('ALIGN', (4, 1), (4, -1), 'CENTER'),  # Center signature column
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        ('TOPPADDING', (0, 1), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
-    ]))
-
-    # Add status-specific coloring
-    for idx, enrollment in enumerate(enrollments, 1):
-        record = attendance_dict.get(enrollment.student.id)
-        if record:
-            if record.status == 'present':
-                table.setStyle(TableStyle([
-                    ('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#27ae60')),
-                    ('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'),
-                ]))
-            elif record.status == 'absent':
-                table.setStyle(TableStyle([
-                    ('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#e74c3c')),
-                    ('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'),
-                ]))
-            elif record.status == 'late':
-                table.setStyle(TableStyle([
-                    ('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#f39c12')),
-                    ('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'),
-                ]))
-            elif record.status == 'excused':
-                table.setStyle(TableStyle([
-                    ('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#3498db')),
-                    ('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'),
-                ]))
-
-    elements.append(table)
-
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-
-    # Send file
-    from flask import send_file
-    filename = f"attendance_{course.course_code}_{date_str}.pdf"
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/pdf'
-    )
 
 # ==========================================
 # STUDENT MATERIALS & LESSON PLANS
@@ -1071,21 +1162,9 @@ def download_attendance_pdf(course_id, date_str):
 # VIEW LESSON PLANS FOR A SPECIFIC COURSE (STUDENT)
 @app.route('/student/course/<int:course_id>/lessons')
 @login_required
+@role_required('student')
+@enrolled_in_course
 def student_course_lessons(course_id):
-    if current_user.role != 'student':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    # Check if student is enrolled in this course
-    enrollment = Enrollment.query.filter_by(
-        student_id=current_user.id,
-        course_id=course_id
-    ).first()
-
-    if not enrollment:
-        flash("You are not enrolled in this course.", "error")
-        return redirect(url_for('student_home'))
-
     course = Course.query.get_or_404(course_id)
     lesson_plans = LessonPlan.query.filter_by(course_id=course_id).order_by(
         LessonPlan.created_at.desc()
@@ -1099,84 +1178,122 @@ def student_course_lessons(course_id):
 # VIEW SPECIFIC LESSON PLAN (STUDENT)
 @app.route('/student/lesson/<int:plan_id>')
 @login_required
+@role_required('student')
 def student_view_lesson(plan_id):
-    if current_user.role != 'student':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    plan = LessonPlan.query.get_or_404(plan_id)
+    plan = LessonPlan.query.options(*PLAN_DETAIL).get_or_404(plan_id)
 
     # Check if student is enrolled in the course
-    enrollment = Enrollment.query.filter_by(
-        student_id=current_user.id,
-        course_id=plan.course_id
-    ).first()
-
-    if not enrollment:
+    if not is_enrolled(plan.course_id):
         flash("You are not enrolled in this course.", "error")
         return redirect(url_for('student_home'))
 
     return render_template('student_view_lesson.html', plan=plan)
 
 
-# DOWNLOAD MATERIAL (STUDENT)
-@app.route('/student/material/<int:material_id>/download')
+# ==========================================
+# SEARCH (EDUCATORS AND STUDENTS)
+# ==========================================
+
+# SEARCH LESSON PLANS AND MATERIALS IN THE USER'S COURSES
+@app.route('/search')
 @login_required
-def student_download_material(material_id):
-    if current_user.role != 'student':
+def search_lessons():
+    if current_user.role == 'educator':
+        course_ids = owned_course_ids(current_user.id)
+    elif current_user.role == 'student':
+        course_ids = enrolled_course_ids(current_user.id)
+    else:
         flash("Access denied.", "error")
         return redirect(url_for('home'))
 
-    material = LearningMaterial.query.get_or_404(material_id)
+    # Optional: limit to one of the user's courses
+    course_id = request.args.get('course_id', type=int)
+    if course_id is not None:
+        course_ids = [cid for cid in course_ids if cid == course_id]
+
+    query_text = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    hits, has_next = search(query_text, course_ids, page) if query_text else ([], False)
+
+    # Course names and material -> lesson plan links for the hits on this page
+    courses = {course.id: course for course in Course.query.filter(Course.id.in_({hit.course_id for hit in hits}))}
+    material_ids = [hit.ref_id for hit in hits if hit.kind == 'material']
+    material_plans = dict(db.session.execute(
+        db.select(LearningMaterial.id, LearningMaterial.lesson_plan_id).where(LearningMaterial.id.in_(material_ids))
+    ).all()) if material_ids else {}
+
+    return render_template('search_results.html',
+                           query_text=query_text,
+                           hits=hits,
+                           courses=courses,
+                           material_plans=material_plans,
+                           course_id=course_id,
+                           page=page,
+                           has_next=has_next)
+
+
+# DOWNLOAD MATERIAL (STUDENT)
+@app.route('/student/material/<int:material_id>/download')
+@login_required
+@role_required('student')
+def student_download_material(material_id):
+    material = LearningMaterial.query.options(*MATERIAL_WITH_PLAN).get_or_404(material_id)
     plan = material.lesson_plan
 
     # Check if student is enrolled in the course
-    enrollment = Enrollment.query.filter_by(
-        student_id=current_user.id,
-        course_id=plan.course_id
-    ).first()
-
-    if not enrollment:
+    if not is_enrolled(plan.course_id):
         flash("You are not enrolled in this course.", "error")
         return redirect(url_for('student_home'))
 
-    # Send file for download
-    from flask import send_file
-    return send_file(material.filepath, as_attachment=True, download_name=material.filename)
+    # Send file for download (ETag / Range / 304, see materials.py)
+    return send_material(material)
 
 
 # VIEW ALL MATERIALS FOR A COURSE (STUDENT)
 @app.route('/student/course/<int:course_id>/materials')
 @login_required
+@role_required('student')
+@enrolled_in_course
 def student_course_materials(course_id):
-    if current_user.role != 'student':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
-    # Check if student is enrolled
-    enrollment = Enrollment.query.filter_by(
-        student_id=current_user.id,
-        course_id=course_id
-    ).first()
-
-    if not enrollment:
-        flash("You are not enrolled in this course.", "error")
-        return redirect(url_for('student_home'))
-
     course = Course.query.get_or_404(course_id)
 
     # Get all lesson plans with materials
-    lesson_plans = LessonPlan.query.filter_by(course_id=course_id).order_by(
+    lesson_plans = LessonPlan.query.options(*PLAN_WITH_MATERIALS).filter_by(course_id=course_id).order_by(
         LessonPlan.created_at.desc()
     ).all()
 
     # Count total materials
     total_materials = sum(len(plan.materials) for plan in lesson_plans)
 
+    # Thumbnails / page counts / excerpts built after upload (one query)
+    previews = previews_for([material for plan in lesson_plans for material in plan.materials])
+
     return render_template('student_course_materials.html',
                            course=course,
                            lesson_plans=lesson_plans,
-                           total_materials=total_materials)
+                           total_materials=total_materials,
+                           previews=previews)
+
+
+# MATERIAL THUMBNAIL (STUDENT)
+@app.route('/student/material/<int:material_id>/thumbnail')
+@login_required
+@role_required('student', api=True)
+def student_material_thumbnail(material_id):
+    material = LearningMaterial.query.options(*MATERIAL_WITH_PLAN).get_or_404(material_id)
+
+    if not is_enrolled(material.lesson_plan.course_id):
+        abort(403)
+
+    path = thumbnail_path(material.filepath)
+    if not os.path.isfile(path):
+        abort(404)
+
+    from flask import send_file
+    response = send_file(path, mimetype='image/png', conditional=True)
+    response.cache_control.private = True
+    return response
 
 
 # ==========================================
@@ -1215,30 +1332,41 @@ def contacts():
 # VIEW ALL CONTACT MESSAGES (ADMIN)
 @app.route('/admin/messages')
 @login_required
+@role_required('admin')
 def admin_messages():
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     from models import ContactMessage
 
-    # Get all messages, ordered by newest first
-    messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
+    status = request.args.get('status', '')
+    search = request.args.get('q', '').strip()
 
-    # Count unread messages
-    unread_count = ContactMessage.query.filter_by(is_read=False).count()
+    query = ContactMessage.query
+    if status in ('read', 'unread'):
+        query = query.filter(ContactMessage.is_read == (status == 'read'))
+    if search:
+        query = query.filter(or_(
+            ContactMessage.name.icontains(search, autoescape=True),
+            ContactMessage.email.icontains(search, autoescape=True),
+            ContactMessage.message.icontains(search, autoescape=True)
+        ))
 
-    return render_template('admin_messages.html', messages=messages, unread_count=unread_count)
+    # Newest first, id breaks ties between messages sent in the same second
+    page = keyset_paginate(query, [ContactMessage.created_at, ContactMessage.id],
+                           after=request.args.get('after'), before=request.args.get('before'),
+                           descending=True)
+
+    # Count unread messages (capped, uses ix_contact_message_is_read_created_at)
+    unread_count, unread_capped = estimate_count(ContactMessage.query.filter_by(is_read=False))
+
+    return render_template('admin_messages.html', messages=page.items, page=page,
+                           unread_count=unread_count, unread_capped=unread_capped,
+                           filter_args={'status': status or None, 'q': search or None})
 
 
 # MARK MESSAGE AS READ (ADMIN)
 @app.route('/admin/message/<int:message_id>/mark-read', methods=['POST'])
 @login_required
+@role_required('admin')
 def mark_message_read(message_id):
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     from models import ContactMessage
 
     message = ContactMessage.query.get_or_404(message_id)
@@ -1252,11 +1380,8 @@ def mark_message_read(message_id):
 # DELETE MESSAGE (ADMIN)
 @app.route('/admin/message/<int:message_id>/delete', methods=['POST'])
 @login_required
+@role_required('admin')
 def delete_message(message_id):
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     from models import ContactMessage
 
     message = ContactMessage.query.get_or_404(message_id)
@@ -1274,11 +1399,8 @@ def delete_message(message_id):
 # PROMOTE USER TO ADMIN
 @app.route('/admin/user/<int:user_id>/promote', methods=['POST'])
 @login_required
+@role_required('admin')
 def promote_user(user_id):
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     user = User.query.get_or_404(user_id)
 
     # Prevent promoting yourself (redundant but safe)
@@ -1302,11 +1424,8 @@ def promote_user(user_id):
 # REMOVE USER
 @app.route('/admin/user/<int:user_id>/remove', methods=['POST'])
 @login_required
+@role_required('admin')
 def remove_user(user_id):
-    if current_user.role != 'admin':
-        flash("Access denied.", "error")
-        return redirect(url_for('home'))
-
     user = User.query.get_or_404(user_id)
 
     # Prevent removing yourself
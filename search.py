@@ -0,0 +1,259 @@
+from database import db
+from models import LessonPlan, LearningMaterial, MaterialPreview
+from previews import text_path
+from sqlalchemy import event, text, select, bindparam, or_
+from markupsafe import Markup, escape
+import os
+import re
+
+# ==========================================
+# FULL-TEXT SEARCH
+# ==========================================
+# One search document per lesson plan (title / topic, objectives, description)
+# and per material (filename / extracted text from previews.py).
+#   SQLite     - FTS5 table search_index, rowid = ref_id * 2 + kind, ranked by bm25
+#   PostgreSQL - search_document with a weighted tsvector + GIN index, ranked by ts_rank_cd
+# ORM hooks keep it current in the same transaction as the change;
+# 'flask search-index' rebuilds it from scratch. Other databases fall back
+# to LIKE over lesson plans.
+
+SEARCH_RESULTS_PER_PAGE = 20
+SNIPPET_WORDS = 16
+
+KIND_PLAN = 0
+KIND_MATERIAL = 1
+KIND_NAMES = {KIND_PLAN: 'plan', KIND_MATERIAL: 'material'}
+
+# Unlikely to appear in user text; swapped for <mark> after escaping
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+SEARCH_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "course_id UNINDEXED, title, body, tokenize = 'porter unicode61')",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS search_document ("
+        "kind SMALLINT NOT NULL, ref_id INTEGER NOT NULL, course_id INTEGER NOT NULL, "
+        "title TEXT NOT NULL, body TEXT NOT NULL, "
+        "document TSVECTOR GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', body), 'B')) STORED, "
+        "PRIMARY KEY (kind, ref_id))",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_document ON search_document USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_search_document_course_id ON search_document (course_id)",
+    ],
+}
+
+
+def init_search(app):
+    """Create the search table for the configured database if it is missing"""
+    with app.app_context():
+        statements = SEARCH_DDL.get(db.engine.dialect.name, [])
+        if statements:
+            with db.engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+
+
+def _dialect(connection):
+    name = connection.dialect.name
+    return name if name in SEARCH_DDL else None
+
+
+# ==========================================
+# INDEXING
+# ==========================================
+
+def plan_document(plan):
+    body = '\n'.join(part for part in (plan.topic, plan.objectives, plan.description) if part)
+    return plan.title, body
+
+
+def material_text(filepath):
+    path = text_path(filepath)
+    if not os.path.isfile(path):
+        return ''
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def index_document(connection, kind, ref_id, course_id, title, body):
+    dialect = _dialect(connection)
+    params = {'kind': kind, 'ref_id': ref_id, 'course_id': course_id, 'title': title or '', 'body': body or ''}
+    if dialect == 'sqlite':
+        params['rowid'] = ref_id * 2 + kind
+        connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), params)
+        connection.execute(text(
+            "INSERT INTO search_index (rowid, course_id, title, body) VALUES (:rowid, :course_id, :title, :body)"
+        ), params)
+    elif dialect == 'postgresql':
+        connection.execute(text(
+            "INSERT INTO search_document (kind, ref_id, course_id, title, body) "
+            "VALUES (:kind, :ref_id, :course_id, :title, :body) "
+            "ON CONFLICT (kind, ref_id) DO UPDATE SET course_id = EXCLUDED.course_id, "
+            "title = EXCLUDED.title, body = EXCLUDED.body"
+        ), params)
+
+
+def remove_document(connection, kind, ref_id):
+    dialect = _dialect(connection)
+    if dialect == 'sqlite':
+        connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {'rowid': ref_id * 2 + kind})
+    elif dialect == 'postgresql':
+        connection.execute(text("DELETE FROM search_document WHERE kind = :kind AND ref_id = :ref_id"),
+                           {'kind': kind, 'ref_id': ref_id})
+
+
+def index_materials(connection, filepath=None, material_id=None):
+    """(Re)index materials by file or id, reading course ids through the connection"""
+    stmt = select(
+        LearningMaterial.id, LearningMaterial.filename, LearningMaterial.filepath, LessonPlan.course_id
+    ).join(LessonPlan, LearningMaterial.lesson_plan_id == LessonPlan.id)
+    if filepath is not None:
+        stmt = stmt.where(LearningMaterial.filepath == filepath)
+    if material_id is not None:
+        stmt = stmt.where(LearningMaterial.id == material_id)
+
+    texts = {}
+    for row in connection.execute(stmt).all():
+        if row.filepath not in texts:
+            texts[row.filepath] = material_text(row.filepath)
+        index_document(connection, KIND_MATERIAL, row.id, row.course_id, row.filename, texts[row.filepath])
+
+
+# ORM HOOKS (RUN INSIDE THE FLUSH, SO THE INDEX COMMITS OR ROLLS BACK WITH THE DATA)
+@event.listens_for(LessonPlan, 'after_insert')
+@event.listens_for(LessonPlan, 'after_update')
+def _index_plan(mapper, connection, target):
+    if _dialect(connection):
+        index_document(connection, KIND_PLAN, target.id, target.course_id, *plan_document(target))
+
+
+@event.listens_for(LessonPlan, 'after_delete')
+def _remove_plan(mapper, connection, target):
+    remove_document(connection, KIND_PLAN, target.id)
+
+
+@event.listens_for(LearningMaterial, 'after_insert')
+def _index_material(mapper, connection, target):
+    if _dialect(connection):
+        index_materials(connection, material_id=target.id)
+
+
+@event.listens_for(LearningMaterial, 'after_delete')
+def _remove_material(mapper, connection, target):
+    remove_document(connection, KIND_MATERIAL, target.id)
+
+
+@event.listens_for(MaterialPreview, 'after_update')
+def _index_preview_text(mapper, connection, target):
+    # Extracted text arrives after the material row, once the preview is built
+    if _dialect(connection) and target.status == 'ready':
+        index_materials(connection, filepath=target.filepath)
+
+
+def rebuild_search_index():
+    """Drop and repopulate every search document; return (plans, materials) indexed"""
+    dialect = _dialect(db.session.connection())
+    if dialect is None:
+        return 0, 0
+
+    connection = db.session.connection()
+    connection.execute(text("DELETE FROM search_index" if dialect == 'sqlite' else "DELETE FROM search_document"))
+
+    plans = 0
+    for plan in LessonPlan.query.yield_per(500):
+        index_document(connection, KIND_PLAN, plan.id, plan.course_id, *plan_document(plan))
+        plans += 1
+
+    index_materials(connection)
+    materials = db.session.query(LearningMaterial.id).count()
+
+    if dialect == 'sqlite':
+        connection.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+    return plans, materials
+
+
+# ==========================================
+# QUERIES
+# ==========================================
+
+class SearchHit:
+    """One ranked search result"""
+    __slots__ = ('kind', 'ref_id', 'course_id', 'title', 'snippet')
+
+    def __init__(self, kind, ref_id, course_id, title, snippet):
+        self.kind = kind
+        self.ref_id = ref_id
+        self.course_id = course_id
+        self.title = title
+        self.snippet = snippet
+
+
+def _highlight(value):
+    """Escape text and turn the match markers into <mark> tags"""
+    escaped = str(escape(value or ''))
+    return Markup(escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def fts5_query(query_text):
+    """Quote each word so user input can never be FTS5 syntax; prefix-match the last one"""
+    words = re.findall(r'\w+', query_text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words[:-1]) + (' ' if len(words) > 1 else '') + f'"{words[-1]}"*'
+
+
+def search(query_text, course_ids, page=1, per_page=SEARCH_RESULTS_PER_PAGE):
+    """Return ([SearchHit], has_next) for the query within the given course ids"""
+    course_ids = list(course_ids)
+    if not course_ids:
+        return [], False
+
+    dialect = _dialect(db.session.connection())
+    offset = (page - 1) * per_page
+    params = {'limit': per_page + 1, 'offset': offset, 'words': SNIPPET_WORDS,
+              'start': _MARK_START, 'end': _MARK_END, 'course_ids': course_ids}
+
+    if dialect == 'sqlite':
+        params['query'] = fts5_query(query_text)
+        if params['query'] is None:
+            return [], False
+        stmt = text(
+            "SELECT rowid, course_id, title, "
+            "snippet(search_index, 2, :start, :end, '…', :words) AS snippet "
+            "FROM search_index WHERE search_index MATCH :query AND course_id IN :course_ids "
+            "ORDER BY bm25(search_index, 0.0, 10.0, 1.0) LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == 'postgresql':
+        params['query'] = query_text
+        stmt = text(
+            "SELECT ref_id * 2 + kind AS rowid, course_id, title, "
+            "ts_headline('english', body, q, 'StartSel=' || :start || ', StopSel=' || :end || "
+            "', MaxWords=' || :words || ', MinWords=5') AS snippet "
+            "FROM search_document, websearch_to_tsquery('english', :query) AS q "
+            "WHERE document @@ q AND course_id IN :course_ids "
+            "ORDER BY ts_rank_cd(document, q) DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        return _search_like(query_text, course_ids, offset, per_page)
+
+    stmt = stmt.bindparams(bindparam('course_ids', expanding=True))
+
+    rows = db.session.execute(stmt, params).all()
+    hits = [SearchHit(KIND_NAMES[row.rowid % 2], row.rowid // 2, row.course_id,
+                      row.title, _highlight(row.snippet)) for row in rows[:per_page]]
+    return hits, len(rows) > per_page
+
+
+def _search_like(query_text, course_ids, offset, per_page):
+    rows = LessonPlan.query.filter(
+        LessonPlan.course_id.in_(course_ids),
+        or_(LessonPlan.title.icontains(query_text, autoescape=True),
+            LessonPlan.topic.icontains(query_text, autoescape=True),
+            LessonPlan.description.icontains(query_text, autoescape=True))
+    ).order_by(LessonPlan.created_at.desc()).offset(offset).limit(per_page + 1).all()
+    hits = [SearchHit('plan', plan.id, plan.course_id, plan.title, _highlight(plan.topic))
+            for plan in rows[:per_page]]
+    return hits, len(rows) > per_page
@@ -0,0 +1,153 @@
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord
+from sqlalchemy import insert, select, func
+from passwords import hash_password, hash_passwords, HASH_WORKERS
+from datetime import datetime, date, timedelta
+import random
+
+# ==========================================
+# BULK DATA LOADER
+# ==========================================
+# Loads a synthetic dataset with Core executemany INSERTs:
+#   educators, students, courses, enrollments, and one attendance row per
+#   enrollment per day for the last N days.
+# Passwords are hashed in a process pool (passwords.py; the KDF is deliberately slow),
+# enrollment codes are drawn in memory against the codes already in use.
+#
+# Core writes bypass the ORM hooks, so the daily summary is rebuilt and the
+# site fragments are invalidated once at the end.
+#
+# Seeded users log in as <username> / <username>123, like the demo users,
+# or all with one shared password (hashed once) when one is given.
+
+SEED_BATCH_SIZE = 5000  # rows per executemany
+
+ATTENDANCE_STATUSES = ['present', 'absent', 'late', 'excused']
+ATTENDANCE_WEIGHTS = [70, 10, 15, 5]
+
+
+def insert_rows(model, rows, batch_size=SEED_BATCH_SIZE):
+    """executemany INSERT of rows (any iterable of dicts) in batches; returns the row count"""
+    # The table, not the mapped class, so the ORM bulk-insert layer is skipped
+    stmt = insert(model.__table__)
+    connection = db.session.connection()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(stmt, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        connection.execute(stmt, batch)
+        total += len(batch)
+    return total
+
+
+def insert_returning_ids(model, rows):
+    """INSERT rows and return their new ids in row order"""
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.session.scalars(stmt, rows))
+
+
+def _new_users(role, count, offset, workers, password=None):
+    usernames = [f"seed{role[0]}{offset + n}" for n in range(1, count + 1)]
+    if password:
+        hashes = [hash_password(password)] * count
+    else:
+        hashes = hash_passwords([f"{username}123" for username in usernames], workers)
+    return [
+        {
+            'first_name': f"Seed{role.capitalize()}",
+            'last_name': str(offset + n),
+            'username': username,
+            'email': f"{username}@seed.example.com",
+            'contact_number': f"09{(offset + n) % 10 ** 9:09d}",
+            'role': role,
+            'password': password,
+        }
+        for n, (username, password) in enumerate(zip(usernames, hashes), start=1)
+    ]
+
+
+def attendance_rows(enrollments, days, rng):
+    """One row per (course, student) per day, statuses drawn a day at a time"""
+    for days_ago in range(days, 0, -1):
+        attendance_date = date.today() - timedelta(days=days_ago)
+        morning = datetime.combine(attendance_date, datetime.min.time()) + timedelta(hours=9)
+        statuses = rng.choices(ATTENDANCE_STATUSES, weights=ATTENDANCE_WEIGHTS, k=len(enrollments))
+        for (course_id, student_id, educator_id), status in zip(enrollments, statuses):
+            yield {
+                'course_id': course_id,
+                'student_id': student_id,
+                'date': attendance_date,
+                'status': status,
+                'recorded_by': educator_id,
+                'recorded_at': morning,
+            }
+
+
+def seed(students, courses, days, educators=None, courses_per_student=5, workers=HASH_WORKERS, password=None, rng=None, echo=print):
+    """Load a synthetic dataset; returns {table: rows inserted}"""
+    from stats import rebuild_daily_summary
+    from attendance import rebuild_enrollment_attendance
+    from fragments import invalidate_fragments, SITE_SCOPE
+
+    rng = rng or random.Random()
+    educators = educators or max(1, -(-courses // 3))
+    courses_per_student = min(courses_per_student, courses)
+    counts = {}
+
+    # Usernames continue from the highest user id, so repeated runs don't collide
+    offset = db.session.scalar(select(func.max(User.id))) or 0
+
+    echo(f"Creating {educators + students} users ({'shared password' if password else f'{workers} hashing workers'})...")
+    educator_ids = insert_returning_ids(User, _new_users('educator', educators, offset, workers, password))
+    student_ids = insert_returning_ids(User, _new_users('student', students, offset + educators, workers, password))
+    counts['users'] = len(educator_ids) + len(student_ids)
+
+    echo(f"Creating {courses} courses...")
+    codes = Course.generate_enrollment_codes(courses)
+    now = datetime.utcnow()
+    course_rows = [
+        {
+            'course_name': f"Seeded Course {offset + n}",
+            'course_code': f"SD{(offset + n) % 10000:04d}",
+            'block_section': f"BLOCK {n % 50 + 1}",
+            'description': "Synthetic course created by flask seed",
+            'educator_id': educator_ids[n % len(educator_ids)],
+            'enrollment_code': code,
+            'created_at': now - timedelta(days=rng.randint(days, days + 60)),
+        }
+        for n, code in enumerate(codes)
+    ]
+    course_ids = insert_returning_ids(Course, course_rows)
+    course_educator = {course_id: row['educator_id'] for course_id, row in zip(course_ids, course_rows)}
+    counts['courses'] = len(course_ids)
+
+    echo(f"Enrolling {students} students in {courses_per_student} courses each...")
+    enrollments = [
+        (course_id, student_id, course_educator[course_id])
+        for student_id in student_ids
+        for course_id in rng.sample(course_ids, courses_per_student)
+    ]
+    counts['enrollments'] = insert_rows(Enrollment, (
+        {
+            'course_id': course_id,
+            'student_id': student_id,
+            'enrolled_at': now - timedelta(days=rng.randint(days, days + 30)),
+        }
+        for course_id, student_id, _ in enrollments
+    ))
+
+    echo(f"Recording {len(enrollments) * days} attendance rows over {days} days...")
+    counts['attendance'] = insert_rows(AttendanceRecord, attendance_rows(enrollments, days, rng))
+    db.session.commit()
+
+    rebuild_daily_summary()
+    rebuild_enrollment_attendance()
+    invalidate_fragments(SITE_SCOPE)
+    return counts
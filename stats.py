@@ -0,0 +1,250 @@
+from database import db
+from models import User, Course, Enrollment, AttendanceRecord, ContactMessage, DailySummary
+from sqlalchemy import event, select, func, case, delete, inspect, type_coerce
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import sqlite, postgresql
+from collections import Counter
+from datetime import datetime, timedelta
+
+# ==========================================
+# ADMIN STATISTICS
+# ==========================================
+# daily_summary holds per-day changes of each dashboard figure:
+#   users.<role>, courses, enrollments, attendance.<status>, messages, messages.unread
+# ORM hooks collect +1/-1 deltas during a flush and upsert them in the same
+# transaction; Core writes call apply_summary_deltas() themselves.
+# Totals are one grouped SUM over O(days) rows; trends are the rows by day.
+#
+# Rows with no timestamp (users) and all incremental changes land on the
+# day of the write; attendance lands on the attendance date.
+# 'flask stats --rebuild' recomputes the table from the fact tables.
+
+BUILT_METRIC = 'summary.built'  # written by a rebuild; incremental rows alone are not trusted
+TREND_DAYS = 30
+
+UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _today():
+    return datetime.utcnow().date()
+
+
+def apply_summary_deltas(connection, deltas):
+    """Add {(day, metric): change} to daily_summary in one statement where possible"""
+    rows = [{'day': day, 'metric': metric, 'value': value}
+            for (day, metric), value in deltas.items() if value]
+    if not rows:
+        return
+
+    table = DailySummary.__table__
+    make_insert = UPSERT_DIALECTS.get(connection.dialect.name)
+
+    if make_insert:
+        stmt = make_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['day', 'metric'],
+            set_={'value': table.c.value + stmt.excluded.value}
+        )
+        connection.execute(stmt)
+    else:
+        for row in rows:
+            updated = connection.execute(
+                table.update()
+                .where(table.c.day == row['day'], table.c.metric == row['metric'])
+                .values(value=table.c.value + row['value'])
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert(), row)
+
+
+# ==========================================
+# INCREMENTAL UPDATES
+# ==========================================
+
+def _count(target, metric, change, day=None):
+    session = inspect(target).session
+    deltas = session.info.setdefault('summary_deltas', Counter())
+    deltas[(day or _today(), metric)] += change
+
+
+def _history(target, name):
+    history = getattr(inspect(target).attrs, name).history
+    return list(history.deleted or ()), list(history.added or ())
+
+
+# (metric, day) pairs one row counts towards; day None means the day of the write
+COUNTED = {
+    User: lambda user: [(f'users.{user.role}', None)],
+    Course: lambda course: [('courses', None)],
+    Enrollment: lambda enrollment: [('enrollments', None)],
+    AttendanceRecord: lambda record: [(f'attendance.{record.status}', record.date)],
+    ContactMessage: lambda message: [('messages', None)] + ([] if message.is_read else [('messages.unread', None)]),
+}
+
+
+def _counted(change):
+    def listener(mapper, connection, target):
+        for metric, day in COUNTED[mapper.class_](target):
+            _count(target, metric, change, day)
+    return listener
+
+
+for _model in COUNTED:
+    event.listen(_model, 'after_insert', _counted(1))
+    event.listen(_model, 'after_delete', _counted(-1))
+
+
+@event.listens_for(User, 'after_update')
+def _user_role_changed(mapper, connection, target):
+    old_roles, new_roles = _history(target, 'role')
+    if old_roles and new_roles:
+        _count(target, f'users.{old_roles[0]}', -1)
+        _count(target, f'users.{target.role}', 1)
+
+
+@event.listens_for(AttendanceRecord, 'after_update')
+def _attendance_changed(mapper, connection, target):
+    old_statuses, new_statuses = _history(target, 'status')
+    old_dates, new_dates = _history(target, 'date')
+    if new_statuses or new_dates:
+        old_status = old_statuses[0] if old_statuses else target.status
+        old_date = old_dates[0] if old_dates else target.date
+        _count(target, f'attendance.{old_status}', -1, day=old_date)
+        _count(target, f'attendance.{target.status}', 1, day=target.date)
+
+
+@event.listens_for(ContactMessage, 'after_update')
+def _message_read(mapper, connection, target):
+    was_read, is_read = _history(target, 'is_read')
+    if is_read and bool(was_read and was_read[0]) != bool(target.is_read):
+        _count(target, 'messages.unread', -1 if target.is_read else 1)
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_deltas(db_session, flush_context):
+    deltas = db_session.info.pop('summary_deltas', None)
+    if deltas:
+        apply_summary_deltas(db_session.connection(), deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_deltas(db_session):
+    db_session.info.pop('summary_deltas', None)
+
+
+# ==========================================
+# REBUILD
+# ==========================================
+
+def _by_day(column):
+    # DATE(x) works on SQLite and PostgreSQL; coerce so SQLite's string comes back as a date
+    return type_coerce(func.date(column), db.Date)
+
+
+def rebuild_daily_summary():
+    """Recompute daily_summary from the fact tables; return the number of rows written"""
+    today = _today()
+    deltas = Counter()
+
+    for role, total in db.session.execute(select(User.role, func.count()).group_by(User.role)):
+        deltas[(today, f'users.{role}')] += total
+
+    grouped = [
+        ('courses', Course.created_at, None),
+        ('enrollments', Enrollment.enrolled_at, None),
+        ('messages', ContactMessage.created_at, None),
+        ('messages.unread', ContactMessage.created_at, ContactMessage.is_read.is_not(True)),
+    ]
+    for metric, column, condition in grouped:
+        stmt = select(_by_day(column), func.count()).group_by(_by_day(column))
+        if condition is not None:
+            stmt = stmt.where(condition)
+        for day, total in db.session.execute(stmt):
+            deltas[(day or today, metric)] += total
+
+    for day, status, total in db.session.execute(
+        select(AttendanceRecord.date, AttendanceRecord.status, func.count())
+        .group_by(AttendanceRecord.date, AttendanceRecord.status)
+    ):
+        deltas[(day, f'attendance.{status}')] += total
+
+    deltas[(today, BUILT_METRIC)] = 1
+
+    db.session.info.pop('summary_deltas', None)
+    connection = db.session.connection()
+    connection.execute(delete(DailySummary))
+    apply_summary_deltas(connection, deltas)
+    db.session.commit()
+    return len([value for value in deltas.values() if value])
+
+
+# ==========================================
+# QUERIES
+# ==========================================
+
+def summary_totals():
+    """{metric: total} from daily_summary in one grouped query"""
+    return dict(db.session.execute(
+        select(DailySummary.metric, func.sum(DailySummary.value)).group_by(DailySummary.metric)
+    ).all())
+
+
+def live_totals():
+    """The dashboard figures straight from the fact tables, in one statement"""
+    users = select(
+        func.count(),
+        func.count(case((User.role == 'student', 1))),
+        func.count(case((User.role == 'educator', 1))),
+    ).subquery()
+    row = db.session.execute(select(
+        *users.c,
+        select(func.count(Course.id)).scalar_subquery(),
+        select(func.count(Enrollment.id)).scalar_subquery(),
+        select(func.count(ContactMessage.id)).scalar_subquery(),
+        select(func.count(ContactMessage.id)).where(ContactMessage.is_read.is_not(True)).scalar_subquery(),
+    )).one()
+    users_total, students, educators, courses, enrollments, messages, unread = row
+    return {
+        'users.student': students,
+        'users.educator': educators,
+        'users.admin': users_total - students - educators,
+        'courses': courses,
+        'enrollments': enrollments,
+        'messages': messages,
+        'messages.unread': unread,
+    }
+
+
+def dashboard_stats():
+    """Figures for the admin dashboard: the summary table once built, else one live query"""
+    totals = summary_totals()
+    if not totals.get(BUILT_METRIC):
+        totals = live_totals()
+
+    users = {role: totals.get(f'users.{role}', 0) for role in ('admin', 'educator', 'student')}
+    return {
+        'total_users': sum(users.values()),
+        'total_students': users['student'],
+        'total_educators': users['educator'],
+        'total_courses': totals.get('courses', 0),
+        'total_enrollments': totals.get('enrollments', 0),
+        'total_messages': totals.get('messages', 0),
+        'unread_messages': totals.get('messages.unread', 0),
+    }
+
+
+def daily_series(metrics, days=TREND_DAYS):
+    """{metric: [(day, change), ...]} for the last N days, oldest first"""
+    since = _today() - timedelta(days=days - 1)
+    series = {metric: [] for metric in metrics}
+    rows = db.session.execute(
+        select(DailySummary.day, DailySummary.metric, DailySummary.value)
+        .where(DailySummary.metric.in_(list(metrics)), DailySummary.day >= since)
+        .order_by(DailySummary.day)
+    )
+    for day, metric, value in rows:
+        series[metric].append((day, value))
+    return series
@@ -0,0 +1,131 @@
+"""Every route's SQL must be served by an index (SQLite EXPLAIN QUERY PLAN)
+
+Runs each route case of benchmarks/harness.py (every GET under every role,
+plus the write routes) through the Flask test client on the 1x benchmark
+dataset, captures the statements it executes and fails on any plan step
+that reads a whole table ("SCAN <table>" without an index). A case that
+answers with a server error fails too, since its plans are incomplete.
+"""
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from harness import ROUTE_CONTEXT, load_app, prepare, route_cases, login  # noqa: E402
+
+SCAN_STEP = re.compile(r'^SCAN (\w+)')
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+# (endpoint, table) scans that are expected, and why
+ALLOWED_SCANS = {
+    # Page totals of the unfiltered admin lists: a count capped at
+    # COUNT_ESTIMATE_CAP rows (pagination.estimate_count)
+    ('admin_users', 'user'): "capped total",
+    ('admin_courses', 'course'): "capped total",
+    ('admin_messages', 'contact_message'): "capped total",
+    # One row per (day, metric): the summary table is small by design (stats.py)
+    ('admin_home', 'daily_summary'): "summary totals",
+}
+
+# Cases known to answer 500, and why; one that starts working fails the test
+# until it is removed from here
+KNOWN_SERVER_ERRORS = {
+    'POST student_join_course [student]': "redirects to the 'student_courses' endpoint, which does not exist",
+}
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    cwd = os.getcwd()
+    app = load_app(str(tmp_path_factory.mktemp('query-plans')))
+    prepare(app, 1)
+    yield app
+    os.chdir(cwd)
+
+
+@pytest.fixture(scope='module')
+def captured(app):
+    """Statements run by the request thread, as (sql, parameters)"""
+    from sqlalchemy import event
+    from database import db
+
+    main_thread = threading.get_ident()
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        # Report and preview workers run queries of their own
+        if threading.get_ident() == main_thread and not executemany \
+                and statement.lstrip().upper().startswith(EXPLAINED):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+    yield statements
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def full_scans(app, statements):
+    """[(table, plan step, sql)] for the statements whose plan reads a whole table"""
+    from database import db
+
+    scans = []
+    with app.app_context():
+        tables = set(db.metadata.tables)
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                    step = row[-1]
+                    match = SCAN_STEP.match(step)
+                    if match and match.group(1) in tables and ' INDEX ' not in step:
+                        scans.append((match.group(1), step, ' '.join(statement.split())))
+    return scans
+
+
+def test_routes_use_indexes(app, captured):
+    from flask import url_for
+
+    clients = {}
+    failures = []
+    for case in route_cases(app):
+        client = clients.get(case.role)
+        if client is None or case.fresh_client:
+            client = app.test_client()
+            login(client, case.role)
+            if not case.fresh_client:
+                clients[case.role] = client
+
+        with app.app_context():
+            spec = case.setup(ROUTE_CONTEXT, 0)
+        with app.test_request_context():
+            url = url_for(case.endpoint, **spec.get('path', {}), **case.query)
+
+        captured.clear()
+        response = client.open(url, method=case.method, data=spec.get('data'),
+                               json=spec.get('json'), headers=spec.get('headers'))
+        status = response.status_code
+        response.close()
+
+        if case.name in KNOWN_SERVER_ERRORS:
+            if status < 500:
+                failures.append(f"{case.name}: HTTP {status}, no longer broken; remove it from KNOWN_SERVER_ERRORS")
+        elif status >= 500:
+            failures.append(f"{case.name}: HTTP {status}")
+
+        for table, step, statement in full_scans(app, list(captured)):
+            if (case.endpoint, table) not in ALLOWED_SCANS:
+                failures.append(f"{case.name}: {step}\n    {statement[:300]}")
+
+    assert not failures, "Server errors or full table scans:\n" + '\n'.join(failures)
+
+
+def test_main_route_queries_use_indexes(app):
+    """The hand-written route queries of 'flask indexes --verify' agree"""
+    from commands import full_scans as command_full_scans
+
+    with app.app_context():
+        assert command_full_scans() == {}
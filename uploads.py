@@ -0,0 +1,213 @@
+from flask import current_app
+from database import db
+from models import LearningMaterial
+from materials import adopt_material, release_unused
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+# ==========================================
+# CHUNKED MATERIAL UPLOADS
+# ==========================================
+# An upload session lives in instance/uploads/<upload_id>/ (session.json + data).
+# Chunks are appended in order, each request writing straight to disk, so a
+# dropped connection only loses the chunk in flight and the client resumes
+# from the "received" offset. Every chunk must carry its SHA-256
+# (X-Chunk-SHA256) and is dropped unless it matches, so each stored byte has
+# been verified. Finalize checks the size and, when the client sent one, the
+# whole-file SHA-256, moves the file into the material store and adds the
+# LearningMaterial in one commit.
+
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # suggested to clients
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_MATERIAL_SIZE = 512 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # seconds since the last chunk
+
+_upload_id = re.compile(r'^[0-9a-f]{32}$')
+_sha256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(ValueError):
+    """Rejected upload request; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadSession:
+    """One in-progress upload"""
+    __slots__ = ('upload_id', 'lesson_plan_id', 'educator_id', 'filename', 'size', 'sha256', 'created_at')
+
+    def __init__(self, upload_id, lesson_plan_id, educator_id, filename, size, sha256=None, created_at=None):
+        self.upload_id = upload_id
+        self.lesson_plan_id = lesson_plan_id
+        self.educator_id = educator_id
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.created_at = created_at or time.time()
+
+    @property
+    def directory(self):
+        return os.path.join(upload_root(), self.upload_id)
+
+    @property
+    def data_path(self):
+        return os.path.join(self.directory, 'data')
+
+    @property
+    def received(self):
+        return os.path.getsize(self.data_path)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def status(self):
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'size': self.size,
+            'received': self.received,
+            'chunk_size': UPLOAD_CHUNK_SIZE,
+        }
+
+
+def upload_root():
+    return os.path.join(current_app.instance_path, 'uploads')
+
+
+def create_upload(lesson_plan_id, educator_id, filename, size, sha256=None):
+    """Start an upload session and return it"""
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError("size must be a positive number of bytes.")
+    if size > MAX_MATERIAL_SIZE:
+        raise UploadError(f"Files are limited to {MAX_MATERIAL_SIZE // (1024 * 1024)} MB.", 413)
+    if sha256 is not None and not _sha256.match(str(sha256).lower()):
+        raise UploadError("sha256 must be 64 hex characters.")
+
+    purge_expired_uploads()
+
+    session = UploadSession(uuid.uuid4().hex, lesson_plan_id, educator_id, filename, size,
+                            sha256.lower() if sha256 else None)
+    os.makedirs(session.directory)
+    open(session.data_path, 'wb').close()
+    with open(os.path.join(session.directory, 'session.json'), 'w') as f:
+        json.dump(session.to_dict(), f)
+    return session
+
+
+def load_upload(upload_id):
+    """Return the UploadSession, or None if it does not exist (or is being finalized)"""
+    if not _upload_id.match(upload_id):
+        return None
+    try:
+        with open(os.path.join(upload_root(), upload_id, 'session.json')) as f:
+            return UploadSession(**json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def write_chunk(session, offset, stream, length, chunk_sha256):
+    """Append length bytes from stream at offset and return the new received size"""
+    if not chunk_sha256 or not _sha256.match(chunk_sha256.lower()):
+        raise UploadError("X-Chunk-SHA256 (the chunk's SHA-256 in hex) is required.")
+
+    received = session.received
+    if offset != received:
+        # Client is out of step (e.g. a retried chunk already landed): tell it where to resume
+        raise UploadError(f"Expected offset {received}.", 409)
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks are limited to {MAX_CHUNK_SIZE // (1024 * 1024)} MB.", 413)
+    if offset + length > session.size:
+        raise UploadError("Chunk goes past the declared file size.", 416)
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(session.data_path, 'r+b') as out:
+        out.seek(offset)
+        while written < length:
+            chunk = stream.read(min(1024 * 1024, length - written))
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            written += len(chunk)
+
+        # Keep only whole, verified chunks so a resume never builds on a torn write
+        if written != length or digest.hexdigest() != chunk_sha256.lower():
+            out.truncate(offset)
+            raise UploadError("Chunk was incomplete or failed its checksum; resend it.", 422)
+
+    return offset + written
+
+
+def finalize_upload(session, sha256=None):
+    """Verify the file and attach it to the lesson plan; return the new LearningMaterial"""
+    # Claim the session so a double-submitted finalize cannot attach the file twice
+    claimed = os.path.join(session.directory, 'session.finalizing')
+    try:
+        os.rename(os.path.join(session.directory, 'session.json'), claimed)
+    except OSError:
+        raise UploadError("Upload is already being finalized.", 409)
+
+    try:
+        if session.received != session.size:
+            raise UploadError(f"Received {session.received} of {session.size} bytes.", 409)
+
+        digest = hashlib.sha256()
+        with open(session.data_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        expected = (sha256 or session.sha256 or '').lower()
+        if expected and expected != content_hash:
+            # The data is unusable; the client has to start over
+            shutil.rmtree(session.directory, ignore_errors=True)
+            raise UploadError("Checksum mismatch; the upload was discarded.", 422)
+    except UploadError:
+        if os.path.exists(claimed):
+            os.rename(claimed, os.path.join(session.directory, 'session.json'))
+        raise
+
+    filepath = adopt_material(session.data_path, session.filename, content_hash)
+    material = LearningMaterial(
+        lesson_plan_id=session.lesson_plan_id,
+        filename=session.filename,
+        filepath=filepath
+    )
+    db.session.add(material)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        release_unused([filepath])
+        raise
+    finally:
+        shutil.rmtree(session.directory, ignore_errors=True)
+
+    return material
+
+
+def cancel_upload(session):
+    shutil.rmtree(session.directory, ignore_errors=True)
+
+
+def purge_expired_uploads():
+    """Remove sessions with no chunk written for UPLOAD_SESSION_TTL seconds"""
+    root = upload_root()
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for name in os.listdir(root):
+        data_path = os.path.join(root, name, 'data')
+        try:
+            if os.path.getmtime(data_path) < cutoff:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        except OSError:
+            continue